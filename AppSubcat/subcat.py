@@ -14,9 +14,22 @@ async def main():
 
     headless = True
     session_name = None
+    # continue the latest session, skipping finished subcategories and pages
+    resume = False
+    # add 'parquet' for fast loading outputs with all columns, requires pyarrow
+    output_formats = ('xlsx',)
+    # replay the table download request for pages after the first, without rendering them in the browser
+    direct_download = False
+    # keep only the 'first' or 'latest' downloaded row of parts listed on several pages or subcategories
+    dedupe = None
+    # split subcategories with more pages by manufacturer into shards of about this many pages, None to never split
+    shard_threshold = None
     crawler_runner = AsyncDataCrawlerRunner(
         start_urls, base_download_dir,
-        headless=headless, session_name=session_name
+        headless=headless, session_name=session_name, resume=resume, output_formats=output_formats,
+        direct_download=direct_download,
+        dedupe=dedupe,
+        shard_threshold=shard_threshold,
     )
 
     await crawler_runner.crawl_all()
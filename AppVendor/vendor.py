@@ -1,5 +1,8 @@
 from dkcrawlerv2 import AsyncDataCrawlerRunner, VendorSubCategoryCrawler
 from dkcrawlerv2.utils import read_urls
+from dkcrawlerv2.cache import DiscoveryCache
+from dkcrawlerv2.pacing import AdaptiveController
+from dkcrawlerv2.retry import RetryPolicy
 import asyncio
 import os
 
@@ -14,7 +17,24 @@ async def main():
     target_vendor_only = True
     in_stock_only = True
     headless = True
+    # continue the latest session, skipping finished subcategories and pages
+    resume = False
+    # add 'parquet' for fast loading outputs with all columns, requires pyarrow
+    output_formats = ('xlsx',)
+    # replay the table download request for pages after the first, without rendering them in the browser
+    direct_download = False
+    # keep only the 'first' or 'latest' downloaded row of parts listed on several pages or subcategories
+    dedupe = None
+    # split subcategories with more pages by manufacturer into shards of about this many pages, None to never split
+    shard_threshold = None
+    # reuse subcategories discovered within the last day, set force_refresh to rediscover
+    discovery_ttl = 24 * 3600
+    force_refresh = False
     log_file_path = os.path.join(base_download_dir, f'{vendor_name}.log')
+    # concurrency and request delay adapt to the site within these bounds, shared by discovery and download
+    pacer = AdaptiveController(min_concurrency=1, max_concurrency=6, min_delay=0.2, max_delay=10.0)
+    # exponential backoff, session retry budget and circuit breaker, shared by discovery and download
+    retry_policy = RetryPolicy(attempts=5, base_delay=2.0, max_delay=60.0)
 
     vendor_crawler = VendorSubCategoryCrawler(
         vendor_url,
@@ -22,13 +42,25 @@ async def main():
         target_vendor_only=target_vendor_only,
         in_stock_only=in_stock_only,
         headless=headless,
+        cache=DiscoveryCache(ttl=discovery_ttl),
+        force_refresh=force_refresh,
+        pacer=pacer,
+        retry_policy=retry_policy,
     )
     subcat_urls = await vendor_crawler.crawl()
 
     crawler_runner = AsyncDataCrawlerRunner(
         subcat_urls, base_download_dir,
         headless=headless, session_name=None,
-        in_stock_only=in_stock_only
+        in_stock_only=in_stock_only,
+        subcat_url_info=vendor_crawler.subcat_url_info,
+        resume=resume,
+        output_formats=output_formats,
+        direct_download=direct_download,
+        dedupe=dedupe,
+        shard_threshold=shard_threshold,
+        pacer=pacer,
+        retry_policy=retry_policy,
     )
     await crawler_runner.crawl_all()
     crawler_runner.combine_subcat_data()
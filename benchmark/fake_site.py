@@ -0,0 +1,305 @@
+"""
+Local stand-in for the DigiKey product pages, used by the offline benchmarks.
+Serves listing pages with the data-testid hooks of the Selector enum, pagination through the page query parameter,
+CSV table downloads, and vendor / category pages for discovery. Latency and failures can be injected.
+"""
+import csv
+import io
+import math
+import random
+import threading
+import time
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+COLUMNS = [
+    'Datasheet', 'Image', 'DK Part #', 'Mfr Part #', 'Manufacturer', 'Series', 'Packaging',
+    'Product Status', 'Stock', 'Price', '@ qty', 'Min Qty', 'Description',
+]
+MANUFACTURERS = ['Assmann WSW', 'CNC Tech', 'Adam Tech', 'B&K Precision', 'Sunon Fans']
+PACKAGINGS = ['Bulk', 'Tray', 'Tape & Reel (TR)', 'Box']
+
+PAGE_SCRIPT = '''
+function go(params) {
+    const url = new URL(location.href);
+    for (const [key, value] of Object.entries(params)) {
+        if (value === null) { url.searchParams.delete(key); } else { url.searchParams.set(key, value); }
+    }
+    location.href = url.toString();
+}
+function __footerDomainSelect(domain) { document.querySelector('.domain-suggest').remove(); }
+function applyFilters() {
+    const params = {page: '1'};
+    if (document.querySelector('[data-testid="filter--2-option-5"]').checked) { params.stock = '1'; }
+    const manufacturers = document.querySelectorAll('[data-testid^="filter-1-option-"]:checked');
+    if (manufacturers.length > 0) { params.mfr = Array.from(manufacturers, e => e.dataset.value).join(','); }
+    go(params);
+}
+function show(id) { document.getElementById(id).style.display = 'block'; }
+'''
+
+
+def default_catalog(subcategory_count=6, min_items=150, max_items=2500, seed=0):
+    """
+    Categories with subcategories of random size, the last subcategory is shared by two categories.
+    """
+    rng = random.Random(seed)
+    subcategories = {
+        f'bench-subcategory-{i}': {'id': 1000 + i, 'item_count': rng.randint(min_items, max_items)}
+        for i in range(subcategory_count)
+    }
+    names = list(subcategories)
+    half = len(names) // 2
+    categories = {
+        'bench-category-a': names[:half] + names[-1:],
+        'bench-category-b': names[half:],
+    }
+    return categories, subcategories
+
+
+class FakeDigikeySite:
+    def __init__(self, categories=None, subcategories=None, latency=0.0, jitter=0.0,
+                 failure_rate=0.0, repeat_page_rate=0.0, host='127.0.0.1', port=0, seed=0):
+        if categories is None or subcategories is None:
+            categories, subcategories = default_catalog()
+        self.categories = categories
+        self.subcategories = subcategories
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.repeat_page_rate = repeat_page_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.request_count = 0
+        self.download_count = 0
+        self.failure_count = 0
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def subcategory_urls(self, vendor=None):
+        query = f'?{urlencode({"vendor": vendor})}' if vendor else ''
+        return [
+            f'{self.base_url}/en/products/filter/{name}/{info["id"]}{query}'
+            for name, info in self.subcategories.items()
+        ]
+
+    def vendor_url(self, vendor='bench-vendor'):
+        return f'{self.base_url}/en/supplier-centers/{vendor}'
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        self.request_count += 1
+        delay = self.latency + self.jitter * self.random()
+        if delay > 0:
+            time.sleep(delay)
+
+        split = urlsplit(request.path)
+        path = split.path.rstrip('/')
+        params = dict(parse_qsl(split.query))
+        parts = path.split('/')
+
+        if self.failure_rate > 0 and self.random() < self.failure_rate:
+            self.failure_count += 1
+            return self.send(request, '<html><body>Service Unavailable</body></html>', status=503)
+        if path.startswith('/download/en/products/filter/'):
+            return self.send_table(request, parts[-2], params)
+        if path.startswith('/en/products/filter/'):
+            return self.send(request, self.listing_page(parts[-2], params))
+        if path.startswith('/en/products/category/'):
+            return self.send(request, self.category_page(parts[-1], params))
+        if path.startswith('/en/supplier-centers/'):
+            return self.send(request, self.vendor_page())
+        if path == '/en/products':
+            return self.send(request, self.products_page())
+        return self.send(request, '<html><body>Not Found</body></html>', status=404)
+
+    @staticmethod
+    def send(request, body, status=200, content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    @staticmethod
+    def part_indices(subcategory_item_count, params):
+        # Manufacturer facet keeps every part of the chosen manufacturers
+        if 'mfr' in params:
+            manufacturers = {int(m) for m in params['mfr'].split(',')}
+            return [i for i in range(subcategory_item_count) if i % len(MANUFACTURERS) in manufacturers]
+        return range(subcategory_item_count)
+
+    def page_state(self, subcategory, params):
+        item_count = len(self.part_indices(self.subcategories[subcategory]['item_count'], params))
+        page_size = int(params.get('pageSize', 25))
+        max_page = max(1, math.ceil(item_count / page_size))
+        page_num = min(max(1, int(params.get('page', 1))), max_page)
+        if 1 < page_num and self.repeat_page_rate > 0 and self.random() < self.repeat_page_rate:
+            # the real site sometimes re-serves the previous page after clicking next
+            page_num -= 1
+        return item_count, page_size, max_page, page_num
+
+    @staticmethod
+    def part_row(subcategory, index):
+        rng = random.Random(f'{subcategory}-{index}')
+        stock = rng.choice([0, rng.randint(1, 250000)])
+        price = rng.uniform(0.05, 120)
+        return {
+            'Datasheet': 'https://example.com/datasheet.pdf',
+            'Image': '',
+            'DK Part #': f'{subcategory.upper()}-{index:06d}-ND',
+            'Mfr Part #': f'MPN-{index:06d}',
+            'Manufacturer': MANUFACTURERS[index % len(MANUFACTURERS)],
+            'Series': f'S{index % 17}',
+            'Packaging': PACKAGINGS[index % len(PACKAGINGS)],
+            'Product Status': 'Active',
+            'Stock': f'{stock:,}',
+            'Price': f'{price:.5f}',
+            '@ qty': '1',
+            'Min Qty': str(rng.choice([1, 1, 10, 100])),
+            'Description': f'Benchmark part {index}',
+        }
+
+    def page_rows(self, subcategory, params, page_size, page_num):
+        indices = self.part_indices(self.subcategories[subcategory]['item_count'], params)
+        start = (page_num - 1) * page_size
+        return [self.part_row(subcategory, i) for i in indices[start:start + page_size]]
+
+    def send_table(self, request, subcategory, params):
+        item_count, page_size, max_page, page_num = self.page_state(subcategory, params)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.page_rows(subcategory, params, page_size, page_num))
+        self.download_count += 1
+        headers = {'Content-Disposition': f'attachment; filename="{subcategory}_{page_num}.csv"'}
+        self.send(request, buffer.getvalue(), content_type='text/csv; charset=utf-8', headers=headers)
+
+    @staticmethod
+    def html(title, body):
+        return (
+            f'<!DOCTYPE html><html><head><title>{escape(title)}</title><script>{PAGE_SCRIPT}</script></head>'
+            f'<body>{body}</body></html>'
+        )
+
+    def listing_page(self, subcategory, params):
+        item_count, page_size, max_page, page_num = self.page_state(subcategory, params)
+        in_stock = params.get('stock') == '1'
+        sorted_asc = params.get('sort') == '-100-asc'
+        rows = self.page_rows(subcategory, params, page_size, page_num)
+        start = (page_num - 1) * page_size
+
+        table_rows = ''.join(
+            '<tr data-testid="data-table-0-row">'
+            + ''.join(f'<td>{escape(row[column])}</td>' for column in COLUMNS)
+            + '</tr>'
+            for row in rows
+        )
+        page_buttons = ''.join(
+            f'<button value="{p}" onclick="go({{page: \'{p}\'}})"{" disabled" if p == page_num else ""}>{p}</button>'
+            for p in range(max(1, page_num - 2), min(max_page, page_num + 2) + 1)
+        )
+        remove_filters = (
+            '<button data-testid="filter-box-remove-all" onclick="go({stock: null, mfr: null, page: \'1\'})">'
+            'Remove All</button>'
+            if in_stock or 'mfr' in params else ''
+        )
+        subcategory_item_count = self.subcategories[subcategory]['item_count']
+        # applied filters show as checked options, like on the real site
+        manufacturers = {int(m) for m in params['mfr'].split(',')} if 'mfr' in params else set()
+        manufacturer_options = ''.join(
+            f'<label><input type="checkbox" data-testid="filter-1-option-{i}" data-value="{i}"'
+            f'{" checked" if i in manufacturers else ""}>{escape(name)} '
+            f'({len(self.part_indices(subcategory_item_count, {"mfr": str(i)})):,})</label>'
+            for i, name in enumerate(MANUFACTURERS)
+        )
+        body = f'''
+        <div class="cookie-wrapper"><a class="secondary button" onclick="this.parentNode.remove()">OK</a></div>
+        <div class="domain-suggest"><div class="domain-suggest__flag" onclick="__footerDomainSelect('com')">USA</div></div>
+        <div data-atag="tr-minQty"><span><div>Min Qty</div><div>{escape(rows[0]['Min Qty']) if rows else ''}</div></span></div>
+        <div id="filters">
+            <label><input type="checkbox" data-testid="filter--2-option-5"{" checked" if in_stock else ""}>In Stock</label>
+            {manufacturer_options}
+            <span data-testid="product-count-remaining">{item_count:,} Remaining</span>
+            <button data-testid="apply-all-button" onclick="applyFilters()">Apply All</button>
+            {remove_filters}
+        </div>
+        <span data-testid="product-count">{item_count} Results</span>
+        <div data-testid="per-page-selector"><div onclick="show('page-sizes')">{page_size} per page</div></div>
+        <div id="page-sizes" style="display: none">
+            <button data-testid="per-page-100" onclick="go({{pageSize: '100', page: '1'}})">100</button>
+        </div>
+        <div data-testid="per-page-selector-container">{start + 1} - {start + len(rows)} of {item_count:,}</div>
+        <button data-testid="sort--100-asc" onclick="go({{sort: '-100-asc', page: '1'}})"{" disabled" if sorted_asc else ""}>
+            <svg width="12" height="12"><rect width="12" height="12"></rect></svg>
+        </button>
+        <button data-testid="download-table-popup-trigger-button" onclick="show('download-popup')">Download</button>
+        <div id="download-popup" style="display: none">
+            <button data-testid="download-table-button"
+                onclick="location.href = '/download' + location.pathname + location.search">Download Table</button>
+        </div>
+        <table><tbody>{table_rows}</tbody></table>
+        <div data-testid="pagination-container">{page_buttons}</div>
+        <button data-testid="btn-next-page" onclick="go({{page: '{min(page_num + 1, max_page)}'}})">Next</button>
+        '''
+        return self.html(subcategory, body)
+
+    def subcategory_links(self, names, query=''):
+        return ''.join(
+            f'<a data-testid="subcategories-items" '
+            f'href="/en/products/filter/{name}/{self.subcategories[name]["id"]}{query}">{name}</a>'
+            for name in names
+        )
+
+    def category_page(self, category, params):
+        query = f'?{urlencode({"vendor": params["vendor"]})}' if 'vendor' in params else ''
+        return self.html(category, self.subcategory_links(self.categories.get(category, []), query))
+
+    def vendor_page(self):
+        links = ''.join(
+            f'<li><a href="/en/products/category/{category}?vendor=bench-vendor">{category}</a></li>'
+            for category in self.categories
+        )
+        return self.html('vendor', f'<ul id="product-categories">{links}</ul>')
+
+    def products_page(self):
+        return self.html('products', self.subcategory_links(list(self.subcategories)))
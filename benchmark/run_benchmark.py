@@ -0,0 +1,206 @@
+"""
+Offline throughput benchmark of the crawlers against the local FakeDigikeySite.
+Reports pages per minute, the concurrency scaling curve of the runner and peak memory.
+
+    python benchmark/run_benchmark.py --latency 0.05 --concurrency 1 2 3 4 --page-workers 1 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from benchmark.fake_site import FakeDigikeySite, default_catalog
+from dkcrawlerv2 import AsyncDataCrawler, AsyncDataCrawlerRunner, VendorSubCategoryCrawler
+from dkcrawlerv2.utils import get_file_list, jsonify
+from dkcrawlerv2.pacing import AdaptiveController
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class PeakMemory:
+    """
+    Samples RSS of this process and its browser child processes, falls back to the Python heap without psutil.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss / 1024 / 1024
+
+    def run(self):
+        while self.running:
+            self.peak_mb = max(self.peak_mb, self.sample())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        if psutil is None:
+            tracemalloc.start()
+        else:
+            self.running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if psutil is None:
+            self.peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        else:
+            self.running = False
+            self.thread.join()
+
+
+def pages_per_minute(pages, elapsed):
+    return round(pages / elapsed * 60, 1) if elapsed > 0 else None
+
+
+async def bench_data_crawler(site, work_dir, page_workers, headless, direct_download=False):
+    url = site.subcategory_urls()[0]
+    download_dir = tempfile.mkdtemp(dir=work_dir)
+    crawler = AsyncDataCrawler(
+        url, download_dir, headless=headless, page_workers=page_workers, direct_download=direct_download,
+        storage_state_path=None,
+    )
+    with PeakMemory() as memory:
+        start_time = time.perf_counter()
+        await crawler.crawl()
+        elapsed = time.perf_counter() - start_time
+    return {
+        'benchmark': 'AsyncDataCrawler',
+        'page_workers': page_workers,
+        'direct_download': direct_download,
+        'pages': len(crawler.downloaded_pages),
+        'elapsed_seconds': round(elapsed, 2),
+        'pages_per_minute': pages_per_minute(len(crawler.downloaded_pages), elapsed),
+        'peak_memory_mb': round(memory.peak_mb, 1),
+    }
+
+
+async def bench_runner(site, work_dir, max_concurrency, page_workers, headless):
+    download_dir = tempfile.mkdtemp(dir=work_dir)
+    # fixed concurrency for the scaling curve
+    pacer = AdaptiveController(
+        min_concurrency=max_concurrency, max_concurrency=max_concurrency, initial_concurrency=max_concurrency
+    )
+    runner = AsyncDataCrawlerRunner(
+        site.subcategory_urls(), download_dir, headless=headless, page_workers=page_workers, pacer=pacer,
+        # the local site's cookies must not replace the consent state saved for the live site
+        storage_state_path=None,
+    )
+    with PeakMemory() as memory:
+        start_time = time.perf_counter()
+        await runner.crawl_all()
+        elapsed = time.perf_counter() - start_time
+    pages = len(get_file_list(runner.download_dir, suffix='.csv'))
+    return {
+        'benchmark': 'AsyncDataCrawlerRunner',
+        'max_concurrency': max_concurrency,
+        'page_workers': page_workers,
+        'pages': pages,
+        'elapsed_seconds': round(elapsed, 2),
+        'pages_per_minute': pages_per_minute(pages, elapsed),
+        'peak_memory_mb': round(memory.peak_mb, 1),
+    }
+
+
+async def bench_discovery(site, max_concurrency, headless):
+    crawler = VendorSubCategoryCrawler(site.vendor_url(), headless=headless, max_concurrency=max_concurrency)
+    with PeakMemory() as memory:
+        start_time = time.perf_counter()
+        subcat_urls = await crawler.crawl()
+        elapsed = time.perf_counter() - start_time
+    return {
+        'benchmark': 'VendorSubCategoryCrawler',
+        'max_concurrency': max_concurrency,
+        'subcategories': len(subcat_urls),
+        'elapsed_seconds': round(elapsed, 2),
+        'peak_memory_mb': round(memory.peak_mb, 1),
+    }
+
+
+async def run(args):
+    categories, subcategories = default_catalog(
+        subcategory_count=args.subcategories, min_items=args.min_items, max_items=args.max_items
+    )
+    site = FakeDigikeySite(
+        categories, subcategories, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, repeat_page_rate=args.repeat_page_rate,
+    )
+    work_dir = tempfile.mkdtemp(prefix='dkcrawler_bench_')
+    results = []
+    with site:
+        for page_workers in args.page_workers:
+            results.append(await bench_data_crawler(site, work_dir, page_workers, args.headless))
+        if args.direct_download:
+            results.append(await bench_data_crawler(site, work_dir, 1, args.headless, direct_download=True))
+        for max_concurrency in args.concurrency:
+            results.append(await bench_runner(site, work_dir, max_concurrency, 1, args.headless))
+        for max_concurrency in args.concurrency:
+            results.append(await bench_discovery(site, max_concurrency, args.headless))
+        server_stats = {
+            'requests': site.request_count,
+            'downloads': site.download_count,
+            'injected_failures': site.failure_count,
+        }
+    if not args.keep_downloads:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'params': vars(args), 'results': results, 'server': server_stats}
+
+
+def print_table(results):
+    columns = ['benchmark', 'max_concurrency', 'page_workers', 'direct_download', 'pages', 'subcategories',
+               'elapsed_seconds', 'pages_per_minute', 'peak_memory_mb']
+    print(' | '.join(columns))
+    for result in results:
+        print(' | '.join(str(result.get(column, '')) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subcategories', type=int, default=4)
+    parser.add_argument('--min-items', type=int, default=150)
+    parser.add_argument('--max-items', type=int, default=1200)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random extra latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--repeat-page-rate', type=float, default=0.0,
+                        help='fraction of listing pages that re-serve the previous page')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--page-workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--direct-download', action='store_true',
+                        help='also benchmark replaying the download request without the browser')
+    parser.add_argument('--headed', dest='headless', action='store_false')
+    parser.add_argument('--keep-downloads', action='store_true')
+    parser.add_argument('--output', default='bench_output.json', help='JSON report path')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_table(report['results'])
+    with open(args.output, 'w') as f:
+        f.write(jsonify(report))
+    print(f'Report written to {os.path.realpath(args.output)}')
+
+
+if __name__ == '__main__':
+    main()
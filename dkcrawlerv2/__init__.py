@@ -1,3 +1,23 @@
-from dkcrawlerv2.crawlers.all_subcat_crawler import AllSubCategoryCrawler
-from dkcrawlerv2.crawlers.vendor_subcat_crawler import VendorSubCategoryCrawler
-from dkcrawlerv2.crawlers.data_crawler import AsyncDataCrawler, AsyncDataCrawlerRunner
\ No newline at end of file
+import importlib
+
+# crawlers are imported on first access, so that importing the package does not load Playwright and pandas
+_lazy_attributes = {
+    'AllSubCategoryCrawler': 'dkcrawlerv2.crawlers.all_subcat_crawler',
+    'VendorSubCategoryCrawler': 'dkcrawlerv2.crawlers.vendor_subcat_crawler',
+    'AsyncDataCrawler': 'dkcrawlerv2.crawlers.data_crawler',
+    'AsyncDataCrawlerRunner': 'dkcrawlerv2.crawlers.data_crawler',
+}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
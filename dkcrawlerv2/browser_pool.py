@@ -0,0 +1,215 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright, Browser, BrowserContext, Error as PlaywrightError
+from dkcrawlerv2.utils import set_up_logger, jsonify
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PROCESS_ERRORS = (psutil.Error,) if psutil is not None else ()
+
+# main processes of the browsers Playwright launches, their own children have other names like "Web Content"
+BROWSER_PROCESS_NAMES = ('firefox', 'chrome', 'chromium', 'headless_shell', 'msedge', 'webkit')
+
+
+def is_browser_process(process):
+    try:
+        name = process.name().lower()
+    except PROCESS_ERRORS:
+        return False
+    return any(browser_name in name for browser_name in BROWSER_PROCESS_NAMES)
+
+
+def browser_process_trees(processes):
+    """
+    Browser processes among processes and all of their descendants, other processes like the Playwright driver
+    or the combine workers are left out.
+    """
+    found = {}
+    for process in processes:
+        if process.pid in found or not is_browser_process(process):
+            continue
+        found[process.pid] = process
+        try:
+            descendants = process.children(recursive=True)
+        except PROCESS_ERRORS:
+            continue
+        for descendant in descendants:
+            found[descendant.pid] = descendant
+    return list(found.values())
+
+
+class BrowserSlot:
+    def __init__(self, index: int, browser: Browser):
+        self.index = index
+        self.browser = browser
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Pool of launched browsers shared by crawl jobs. Each job gets its own fresh BrowserContext.
+    A browser is retired once it has served max_pages_per_browser pages, or once the browser
+    processes use more than max_memory_mb (requires psutil), and relaunched when its last context closes.
+    Only the process trees of the browsers count towards max_memory_mb.
+    """
+
+    def __init__(self, size=3, headless=True, browser_type='firefox',
+                 max_pages_per_browser=1000, max_memory_mb=None, logger=None):
+        self.size = size
+        self.headless = headless
+        self.browser_type = browser_type
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.logger = logger or set_up_logger(self.__class__.__name__)
+
+        self.playwright = None
+        self.slots = []
+        self.context_slots = {}
+        self.lock = asyncio.Lock()
+
+        if self.max_memory_mb is not None and psutil is None:
+            self.logger.warning('psutil is not installed, memory limit of browser pool is ignored. ')
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def launch_browser(self):
+        browser_type = getattr(self.playwright, self.browser_type)
+        return await browser_type.launch(headless=self.headless)
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        for index in range(self.size):
+            browser = await self.launch_browser()
+            self.slots.append(BrowserSlot(index, browser))
+        self.logger.info(f'Launched {self.size} {self.browser_type} browsers in pool. ')
+
+    async def close(self):
+        for slot in self.slots:
+            await slot.browser.close()
+        self.slots = []
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+        self.logger.info('Closed all browsers in pool. ')
+
+    @staticmethod
+    def child_processes():
+        if psutil is None:
+            return None
+        return psutil.Process().children(recursive=True)
+
+    def browser_memory_mb(self):
+        children = self.child_processes()
+        if children is None:
+            return None
+        rss = 0
+        for process in browser_process_trees(children):
+            try:
+                rss += process.memory_info().rss
+            except PROCESS_ERRORS:
+                pass
+        return rss / 1024 / 1024
+
+    def check_memory(self):
+        if self.max_memory_mb is None:
+            return
+        memory_mb = self.browser_memory_mb()
+        if memory_mb is None or memory_mb <= self.max_memory_mb:
+            return
+        # retire the browser that served the most pages, it is most likely the one leaking memory
+        candidates = [slot for slot in self.slots if not slot.retired]
+        if len(candidates) > 0:
+            slot = max(candidates, key=lambda s: s.pages_served)
+            slot.retired = True
+            msg = {
+                'browser': slot.index,
+                'action': 'retired',
+                'reason': f'Browser memory {memory_mb:.0f}MB exceeds limit {self.max_memory_mb}MB',
+            }
+            self.logger.info(jsonify(msg))
+
+    def check_connected(self):
+        for slot in self.slots:
+            if not slot.retired and not slot.browser.is_connected():
+                slot.retired = True
+                msg = {
+                    'browser': slot.index,
+                    'action': 'retired',
+                    'reason': 'Browser disconnected',
+                }
+                self.logger.info(jsonify(msg))
+
+    async def recycle(self, slot: BrowserSlot):
+        try:
+            await slot.browser.close()
+        except PlaywrightError as ex:
+            self.logger.info(f'Failed to close browser {slot.index}: {ex!r}')
+        slot.browser = await self.launch_browser()
+        slot.pages_served = 0
+        slot.retired = False
+        self.logger.info(f'Relaunched browser {slot.index}. ')
+
+    async def acquire_slot(self):
+        while True:
+            async with self.lock:
+                self.check_connected()
+                for slot in self.slots:
+                    if slot.retired and slot.active_contexts == 0:
+                        await self.recycle(slot)
+                available = [slot for slot in self.slots if not slot.retired]
+                if len(available) > 0:
+                    slot = min(available, key=lambda s: s.active_contexts)
+                    slot.active_contexts += 1
+                    return slot
+            # every browser is retired and still busy, wait for a context to be released
+            await asyncio.sleep(1)
+
+    async def release_slot(self, slot: BrowserSlot):
+        async with self.lock:
+            slot.active_contexts -= 1
+            self.check_connected()
+            if slot.retired and slot.active_contexts == 0:
+                await self.recycle(slot)
+
+    def record_pages(self, context: BrowserContext, page_count=1):
+        """
+        Called by crawlers after downloading pages with a context from this pool.
+        """
+        slot = self.context_slots.get(id(context))
+        if slot is None:
+            return
+        slot.pages_served += page_count
+        if not slot.retired and slot.pages_served >= self.max_pages_per_browser:
+            slot.retired = True
+            msg = {
+                'browser': slot.index,
+                'action': 'retired',
+                'reason': f'Browser served {slot.pages_served} pages',
+            }
+            self.logger.info(jsonify(msg))
+        self.check_memory()
+
+    @asynccontextmanager
+    async def new_context(self, **kwargs):
+        slot = await self.acquire_slot()
+        try:
+            # a crashed browser or an unreadable storage state fails here, the slot is released all the same
+            context = await slot.browser.new_context(**kwargs)
+            self.context_slots[id(context)] = slot
+            try:
+                yield context
+            finally:
+                self.context_slots.pop(id(context), None)
+                await context.close()
+        finally:
+            await self.release_slot(slot)
@@ -0,0 +1,50 @@
+import os
+import json
+import time
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.dkcrawlerv2', 'discovery_cache')
+
+
+class DiscoveryCache:
+    """
+    Persistent cache of discovered subcategory URLs and product counts, keyed by root URL and crawler flags.
+    clock returns the current time in seconds, time.time unless a test replaces it.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=24 * 3600, clock=time.time):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.clock = clock
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def cache_path(self, url, **flags):
+        key = json.dumps({'url': url, 'flags': flags}, sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.json')
+
+    def get(self, url, **flags):
+        """
+        Returns the cached subcat_url_info, or None when missing or older than ttl.
+        """
+        path = self.cache_path(url, **flags)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        if self.clock() - entry['timestamp'] > self.ttl:
+            return None
+        return entry['subcat_url_info']
+
+    def set(self, url, subcat_url_info, **flags):
+        entry = {
+            'url': url,
+            'flags': flags,
+            'timestamp': self.clock(),
+            'subcat_url_info': subcat_url_info,
+        }
+        path = self.cache_path(url, **flags)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, indent=4)
+        os.replace(tmp_path, path)
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+class CrawlManifest:
+    """
+    On-disk checkpoint of a crawl session, records progress of every subcategory so that
+    an interrupted session can be resumed without re-downloading finished pages.
+    Every job keeps its entry in manifest.json of its own folder, so that any shard worker can resume it,
+    and a page only rewrites that small file, at most every save_interval seconds.
+    """
+
+    def __init__(self, session_dir, save_interval=2.0):
+        self.session_dir = session_dir
+        self.save_interval = save_interval
+        self.entries = {}
+        self.saved_at = {}
+        self.dirty = set()
+
+    def entry_path(self, key):
+        return os.path.join(self.session_dir, *key.split('/'), MANIFEST_FILE_NAME)
+
+    def load(self, key):
+        path = self.entry_path(key)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return None
+
+    def save(self, key):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries[key], f)
+        os.replace(tmp_path, path)
+        self.saved_at[key] = time.time()
+        self.dirty.discard(key)
+
+    def flush(self, key=None):
+        """
+        Save pages recorded since the last save, of one job or of all jobs.
+        """
+        for dirty_key in ([key] if key is not None else list(self.dirty)):
+            if dirty_key in self.dirty:
+                self.save(dirty_key)
+
+    def subcategory(self, key):
+        if key not in self.entries:
+            self.entries[key] = self.load(key) or {
+                'url': None,
+                'item_count': None,
+                'max_page': None,
+                'pages': {},
+                'crawled': False,
+                'combined': False,
+                'updated_at': None,
+            }
+        return self.entries[key]
+
+    def keys(self):
+        """
+        Keys of all jobs of the session with a manifest on disk or in memory.
+        """
+        keys = set(self.entries)
+        for dirpath, dirnames, filenames in os.walk(self.session_dir):
+            if MANIFEST_FILE_NAME in filenames and os.path.realpath(dirpath) != os.path.realpath(self.session_dir):
+                keys.add(os.path.relpath(dirpath, self.session_dir).replace(os.sep, '/'))
+        return sorted(keys)
+
+    def total_item_count(self):
+        """
+        Product count of all subcategories of the session, shards are counted by their subcategory.
+        """
+        return sum(self.item_count(key) or 0 for key in self.keys() if '/' not in key)
+
+    def update(self, key, **fields):
+        entry = self.subcategory(key)
+        entry.update(fields)
+        entry['updated_at'] = time.time()
+        self.save(key)
+
+    def record_start(self, key, url, item_count, max_page, resume=True):
+        """
+        Returns whether an existing checkpoint was discarded, because the crawl doesn't resume
+        or because the checkpoint no longer fits the product count.
+        """
+        # another worker may have crawled the job since this one read its entry
+        self.entries.pop(key, None)
+        self.dirty.discard(key)
+        entry = self.subcategory(key)
+        discarded = entry['item_count'] is not None and (not resume or entry['item_count'] != item_count)
+        if discarded:
+            # items moved between pages since the checkpoint was taken, old pages can't be reused
+            entry['pages'] = {}
+            entry.pop('shards', None)
+            entry['crawled'] = False
+            entry['combined'] = False
+        self.update(key, url=url, item_count=item_count, max_page=max_page)
+        return discarded
+
+    def record_page(self, key, page_num, file_path):
+        entry = self.subcategory(key)
+        entry['pages'][str(page_num)] = file_path
+        entry['updated_at'] = time.time()
+        self.dirty.add(key)
+        if time.time() - self.saved_at.get(key, 0) >= self.save_interval:
+            self.save(key)
+
+    def record_crawled(self, key):
+        self.update(key, crawled=True)
+
+    def record_combined(self, key):
+        self.update(key, combined=True)
+
+    def is_combined(self, key):
+        return self.subcategory(key).get('combined', False)
+
+    def is_crawled(self, key):
+        return self.subcategory(key).get('crawled', False)
+
+    def item_count(self, key):
+        return self.subcategory(key).get('item_count')
+
+    def downloaded_pages(self, key):
+        pages = self.subcategory(key).get('pages', {})
+        return {int(page_num): file_path for page_num, file_path in pages.items() if os.path.exists(file_path)}
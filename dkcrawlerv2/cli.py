@@ -0,0 +1,158 @@
+"""
+Command line entry point, installed as the dkcrawler console script.
+Every command imports only what it needs: Playwright for discover, pandas for combine, both for crawl.
+
+    dkcrawler discover https://www.digikey.com/en/supplier-centers/assmann-wsw -o subcat_urls.txt
+    dkcrawler crawl subcat_urls.txt -d downloads
+    dkcrawler resume subcat_urls.txt -d downloads
+    dkcrawler combine downloads/session1
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+
+def read_start_urls(sources):
+    """
+    URLs given on the command line and URLs listed in the given files.
+    """
+    from dkcrawlerv2.utils import read_urls
+    urls = []
+    for source in sources:
+        if os.path.isfile(source):
+            urls.extend(read_urls(source))
+        else:
+            urls.append(source)
+    return urls
+
+
+def discover(args):
+    from dkcrawlerv2.crawlers.vendor_subcat_crawler import VendorSubCategoryCrawler
+    from dkcrawlerv2.cache import DiscoveryCache
+
+    vendor_crawler = VendorSubCategoryCrawler(
+        args.vendor_url,
+        headless=args.headless,
+        target_vendor_only=not args.all_vendors,
+        in_stock_only=args.in_stock_only,
+        cache=DiscoveryCache(),
+        force_refresh=args.force_refresh,
+    )
+    subcat_urls = asyncio.run(vendor_crawler.crawl())
+    if args.output is None:
+        print('\n'.join(subcat_urls))
+    else:
+        with open(args.output, 'w') as f:
+            f.write('\n'.join(subcat_urls) + '\n')
+        print(f'Wrote {len(subcat_urls)} subcategory URLs to {args.output}')
+
+
+def crawl(args, resume=False):
+    start_urls = read_start_urls(args.urls)
+    if len(start_urls) == 0:
+        sys.exit('No start URLs given. ')
+    os.makedirs(args.download_dir, exist_ok=True)
+    runner_kwargs = {
+        'headless': args.headless,
+        'in_stock_only': args.in_stock_only,
+        'session_name': args.session_name,
+        'resume': resume,
+        'output_formats': tuple(args.formats),
+        'direct_download': args.direct_download,
+        'dedupe': args.dedupe,
+        'shard_threshold': args.shard_threshold,
+    }
+
+    if args.workers > 1:
+        from dkcrawlerv2.sharding import ShardedCrawl
+        sharded_crawl = ShardedCrawl(start_urls, args.download_dir, workers=args.workers, **runner_kwargs)
+        sharded_crawl.run()
+        sharded_crawl.combine_subcat_data()
+        return
+
+    from dkcrawlerv2.crawlers.data_crawler import AsyncDataCrawlerRunner
+    crawler_runner = AsyncDataCrawlerRunner(start_urls, args.download_dir, **runner_kwargs)
+    asyncio.run(crawler_runner.crawl_all())
+    crawler_runner.combine_subcat_data()
+
+
+def combine(args):
+    from dkcrawlerv2.postprocess import check_output_formats, combine_pages, combine_subcategories
+    from dkcrawlerv2.utils import get_file_list
+
+    check_output_formats(args.formats)
+    for name in sorted(os.listdir(args.session_dir)):
+        job_dir = os.path.join(args.session_dir, name)
+        if not os.path.isdir(job_dir):
+            continue
+        # reused subcategories of incremental sessions and failed jobs have no pages to combine
+        if len(get_file_list(job_dir, '.csv')) == 0:
+            print(f'Skipped {name}, no downloaded pages')
+            continue
+        # job folders are named {subcategory}_{product id}
+        subcategory = name.rsplit('_', 1)[0]
+        report = combine_pages(job_dir, subcategory, args.formats, args.dedupe, args.chunk_size)
+        print(f'Combined {report["row_count"]} rows of {subcategory}')
+        for alert in report['alerts']:
+            print(alert)
+    report = combine_subcategories(args.session_dir, args.formats, args.dedupe, args.chunk_size)
+    print('Exported combined data to\n' + '\n'.join(report['out_paths'].values()))
+
+
+def add_crawl_arguments(parser):
+    parser.add_argument('urls', nargs='+', help='subcategory URLs, or files listing one URL per line')
+    parser.add_argument('-d', '--download-dir', default='downloads')
+    parser.add_argument('--session-name', default=None)
+    parser.add_argument('--workers', type=int, default=1, help='crawl in this many sharded worker processes')
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], choices=['xlsx', 'parquet'])
+    parser.add_argument('--dedupe', choices=['first', 'latest'], default=None)
+    parser.add_argument('--direct-download', action='store_true',
+                        help='replay the table download request instead of rendering every page')
+    parser.add_argument('--shard-threshold', type=int, default=None,
+                        help='split subcategories with more pages by manufacturer into shards of about this many pages')
+    parser.add_argument('--include-out-of-stock', dest='in_stock_only', action='store_false')
+    parser.add_argument('--headed', dest='headless', action='store_false')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='dkcrawler', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    discover_parser = subparsers.add_parser('discover', help='list the subcategory URLs of a vendor')
+    discover_parser.add_argument('vendor_url')
+    discover_parser.add_argument('-o', '--output', default=None, help='file to write the URLs to, stdout if omitted')
+    discover_parser.add_argument('--all-vendors', action='store_true',
+                                 help='keep subcategories listing parts of other vendors too')
+    discover_parser.add_argument('--include-out-of-stock', dest='in_stock_only', action='store_false')
+    discover_parser.add_argument('--force-refresh', action='store_true', help='ignore cached discovery results')
+    discover_parser.add_argument('--headed', dest='headless', action='store_false')
+    discover_parser.set_defaults(func=discover)
+
+    crawl_parser = subparsers.add_parser('crawl', help='download and combine the data of subcategories')
+    add_crawl_arguments(crawl_parser)
+    crawl_parser.set_defaults(func=crawl)
+
+    resume_parser = subparsers.add_parser('resume', help='continue the latest session of the download folder')
+    add_crawl_arguments(resume_parser)
+    resume_parser.set_defaults(func=lambda args: crawl(args, resume=True))
+
+    combine_parser = subparsers.add_parser('combine', help='combine the downloaded pages of a session again')
+    combine_parser.add_argument('session_dir')
+    combine_parser.add_argument('--formats', nargs='+', default=['xlsx'], choices=['xlsx', 'parquet'])
+    combine_parser.add_argument('--dedupe', choices=['first', 'latest'], default=None)
+    combine_parser.add_argument('--chunk-size', type=int, default=None,
+                                help='stream the data in chunks of this many rows instead of combining in memory')
+    combine_parser.set_defaults(func=combine)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
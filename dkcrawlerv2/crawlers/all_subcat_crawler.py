@@ -1,15 +1,22 @@
-import asyncio
 from playwright.async_api import async_playwright
 from dkcrawlerv2.utils import set_up_logger
+from dkcrawlerv2.network import NetworkProfile, RequestBlocker, DEFAULT_PROFILE
+from dkcrawlerv2.cache import DiscoveryCache
+from dkcrawlerv2.pacing import AdaptiveController
 from urllib.parse import urljoin
 
 
 class AllSubCategoryCrawler:
-    def __init__(self, url, headless=True, log_file_path=None):
+    def __init__(self, url, headless=True, log_file_path=None, network_profile: NetworkProfile = DEFAULT_PROFILE,
+                 cache: DiscoveryCache = None, force_refresh=False, pacer: AdaptiveController = None):
         self.url = url
         self.headless = headless
         self.log_file_path = log_file_path
+        self.cache = cache
+        self.force_refresh = force_refresh
+        self.request_blocker = RequestBlocker(network_profile)
         self.logger = set_up_logger(self.__class__.__name__, self.log_file_path)
+        self.pacer = pacer or AdaptiveController(logger=self.logger)
 
     async def scroll_to_bottom(self, page):
         y_offset = 0
@@ -19,7 +26,7 @@ class AllSubCategoryCrawler:
             y_offset_js = '() => window.pageYOffset;'
             old_y_offset = await page.evaluate(y_offset_js)
             y_offset += offset_step
-            await asyncio.sleep(1)
+            await self.pacer.pause()
             await page.evaluate(f"window.scrollTo(0, {y_offset});")
             scroll_times += 1
             self.logger.info(f'Scroll down by {offset_step} pixels. Scrolled {scroll_times} times. ')
@@ -29,9 +36,16 @@ class AllSubCategoryCrawler:
                 break
 
     async def crawl(self):
+        if self.cache is not None and not self.force_refresh:
+            cached_info = self.cache.get(self.url)
+            if cached_info is not None:
+                self.logger.info(f'Loaded {len(cached_info)} subcategory URLs from discovery cache. ')
+                return [item['url'] for item in cached_info]
+
         async with async_playwright() as playwright:
             browser = await playwright.chromium.launch(headless=self.headless)
             context = await browser.new_context()
+            await self.request_blocker.attach(context)
             page = await context.new_page()
             await page.goto(self.url)
             await self.scroll_to_bottom(page)
@@ -42,9 +56,13 @@ class AllSubCategoryCrawler:
             subcat_urls_out = '\n'.join(subcat_urls)
 
             self.logger.info(f'Extracted subcategory URLs: \n{subcat_urls_out}')
+            self.logger.info(f'Network traffic: {self.request_blocker.stats_msg()}')
             if self.log_file_path is not None:
                 self.logger.info(f'Log file exported to {self.log_file_path}')
 
             await context.close()
             await browser.close()
+            if self.cache is not None:
+                # product counts are not shown on the products page
+                self.cache.set(self.url, [{'url': url, 'product_count': None} for url in subcat_urls])
             return subcat_urls
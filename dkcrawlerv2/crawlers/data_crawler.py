@@ -2,15 +2,62 @@ import asyncio
 from enum import Enum
 import os
 import re
-from playwright.async_api import async_playwright, Page
+import shutil
+from typing import Optional
+from playwright.async_api import async_playwright, Page, BrowserContext
 from playwright._impl._api_types import TimeoutError
+from dkcrawlerv2.browser_pool import BrowserPool
+from dkcrawlerv2.scheduler import WorkQueue
+from dkcrawlerv2.network import NetworkProfile, RequestBlocker, DEFAULT_PROFILE
+from dkcrawlerv2.checkpoint import CrawlManifest
+from dkcrawlerv2.metrics import MetricsRecorder, timed_step
+from dkcrawlerv2.pacing import AdaptiveController
+from dkcrawlerv2.postprocess import (
+    combine_pages, combine_subcategories, diff_parts, check_output_formats, check_dedupe_policy,
+    get_part_numbers, OUTPUT_FORMATS
+)
+from concurrent.futures import ProcessPoolExecutor
 from dkcrawlerv2.utils import (
-    get_file_list, concat_data, set_up_logger, remove_url_qs,
-    get_batches, get_latest_session_index, jsonify, parse_int, retry_on_exception
+    set_up_logger, remove_url_qs, update_url_qs, read_data,
+    get_batches, get_latest_session_index, jsonify, parse_int
 )
-import pandas as pd
+from dkcrawlerv2.retry import RetryPolicy, RetryBudget, CircuitBreaker, retry_on_exception
+from dkcrawlerv2.storage import PartStore
+from dkcrawlerv2.dedupe import PartDeduplicator
+from dkcrawlerv2.validation import PageValidator
+from dkcrawlerv2.direct_download import DirectDownloader, DownloadRequestRecorder, DownloadTemplate
+import json
 import math
 
+# consent and domain choice, shared by all browser contexts
+DEFAULT_STORAGE_STATE_PATH = os.path.join(os.path.expanduser('~'), '.dkcrawlerv2', 'storage_state.json')
+
+# listing state encoded in the URL: 100 items per page, sorted by MFR part number ascending
+# unverified guesses at the site's parameter names, so the preconfigured_url option is off by default
+PRECONFIGURED_QS = {'pageSize': 100, 'sort': '-100-asc'}
+IN_STOCK_QS = {'stock': 1}
+
+# how long to wait for the cookie and domain banners of a context without saved state
+POPUP_TIMEOUT_MS = 5000
+
+CHECK_ROW_COUNT_JS = '''
+function checkRowCount() {
+    let product_count = parseInt(document.querySelector('[data-testid="product-count"]').textContent);
+    let row_count = document.querySelectorAll('[data-testid="data-table-0-row"]').length;
+    if (product_count < 100) {
+        return row_count === product_count;
+    } else {
+        return row_count === 100;
+    }
+}
+'''
+
+CHECK_PAGE_ROWS_JS = '''
+function checkPageRows(expected_row_count) {
+    return document.querySelectorAll('[data-testid="data-table-0-row"]').length === expected_row_count;
+}
+'''
+
 
 class Selector(str, Enum):
     cookie_ok = 'div.cookie-wrapper a.secondary.button',
@@ -32,44 +79,185 @@ class Selector(str, Enum):
     product_count = '[data-testid="product-count"]'
     usa_domain = '''div.domain-suggest__flag[onclick="__footerDomainSelect('com')"]'''
     product_count_remaining = '[data-testid="product-count-remaining"]'
+    # options of the Manufacturer filter, used to shard oversized subcategories
+    shard_facet_options = '[data-testid^="filter-1-option-"]'
+
+
+def get_job_key(url: str):
+    """
+    Folder and manifest key of a subcategory URL, {subcategory}_{product id}.
+    """
+    url_split = remove_url_qs(url).split('/')
+    return f'{url_split[-2].replace("-", "_")}_{url_split[-1]}'
+
+
+class ShardJob:
+    """
+    Work item for one facet shard of an oversized subcategory.
+    """
+
+    def __init__(self, url: str, shard: str, parent_key: str):
+        self.url = url
+        self.shard = shard
+        self.parent_key = parent_key
+
+    def __str__(self):
+        return f'{self.parent_key}/shard_{self.shard}: {self.url}'
 
 
 class AsyncDataCrawler:
-    def __init__(self, start_url: str, base_download_dir: str, headless=True, in_stock_only=True):
+    def __init__(self, start_url: str, base_download_dir: str, headless=True, in_stock_only=True,
+                 browser_pool: BrowserPool = None, page_workers=1, request_blocker: RequestBlocker = None,
+                 manifest: CrawlManifest = None, resume=False, previous_manifest: CrawlManifest = None,
+                 metrics: MetricsRecorder = None, pacer: AdaptiveController = None,
+                 retry_policy: RetryPolicy = None, direct_download=False, direct_workers=4,
+                 part_store: PartStore = None, deduplicator: PartDeduplicator = None,
+                 validate_pages=True, max_repairs=2, preconfigured_url=False,
+                 storage_state_path=DEFAULT_STORAGE_STATE_PATH, shard_threshold=None, shard: str = None):
         self.start_url = start_url
         self.base_download_dir = base_download_dir
         self.headless = headless
         self.in_stock_only = in_stock_only
+        self.browser_pool = browser_pool
+        self.page_workers = page_workers
+        self.request_blocker = request_blocker or RequestBlocker(DEFAULT_PROFILE)
+        self.manifest = manifest
+        # only resumed crawls reuse the pages of the checkpoint
+        self.resume = resume
+        self.previous_manifest = previous_manifest
+        self.metrics = metrics or MetricsRecorder()
+        self.part_store = part_store
+        self.deduplicator = deduplicator
+        self.duplicate_pages = set()
+        self.validate_pages = validate_pages
+        self.validator: PageValidator = None
+        self.invalid_pages = {}
+        self.max_repairs = max_repairs
+        self.repair_attempts = {}
+        self.unchanged = False
         self.use_next_page_alt = False
+        self.preconfigured_url = preconfigured_url
+        self.storage_state_path = storage_state_path
+        self.storage_state_loaded = False
+        self.direct_download = direct_download
+        self.direct_workers = direct_workers
+        self.download_template: DownloadTemplate = None
+        self.template_verified = False
+        self.shard_threshold = shard_threshold
+        self.shard = shard
+        self.shards = {}
 
         url_split = remove_url_qs(start_url).split('/')
         self.subcategory = url_split[-2].replace('-', '_')
         self.product_id = url_split[-1]
-        self.download_dir = os.path.join(base_download_dir, f'{self.subcategory}_{self.product_id}')
+        self.job_key = get_job_key(start_url)
+        self.download_dir = os.path.join(base_download_dir, self.job_key)
+        log_name = self.subcategory
+        if self.shard is not None:
+            # shard pages go to a subfolder, so that combining the subcategory folder merges all shards
+            self.job_key = f'{self.job_key}/shard_{self.shard}'
+            self.download_dir = os.path.join(self.download_dir, f'shard_{self.shard}')
+            log_name = f'{self.subcategory}_shard_{self.shard}'
         os.makedirs(self.download_dir, exist_ok=True)
 
+        self.item_count = 0
         self.max_page = 0
+        self.filtered = False
         self.downloaded_pages = set()
 
         self.log_file_path = os.path.join(self.download_dir, f'{self.subcategory}.log')
-        self.logger = set_up_logger(self.subcategory, self.log_file_path)
+        self.logger = set_up_logger(log_name, self.log_file_path, append=resume)
+        self.pacer = pacer or AdaptiveController(logger=self.logger)
+        self.retry_policy = retry_policy or RetryPolicy(breaker=CircuitBreaker(logger=self.logger))
 
-    async def config_page(self, page: Page):
+    async def set_viewport(self, page: Page):
         viewport_size = {'width': 1920, 'height': 1080}
         await page.set_viewport_size(viewport_size)
         self.logger.info(f'Set viewport size to: {viewport_size}')
 
-        try:
-            await page.click(Selector.cookie_ok)
-        except TimeoutError:
-            pass
+    def entry_url(self):
+        """
+        Start URL with in-stock filter, page size and sort encoded, so that the listing needs no clicks.
+        """
+        if not self.preconfigured_url:
+            return self.start_url
+        params = dict(PRECONFIGURED_QS, **IN_STOCK_QS) if self.in_stock_only else PRECONFIGURED_QS
+        return update_url_qs(self.start_url, **params)
+
+    def context_options(self):
+        options = {'accept_downloads': True}
+        if self.storage_state_path is not None and os.path.exists(self.storage_state_path):
+            options['storage_state'] = self.storage_state_path
+        return options
 
+    async def save_storage_state(self, context: BrowserContext):
+        if self.storage_state_path is None:
+            return
+        storage_state = await context.storage_state()
+        os.makedirs(os.path.dirname(self.storage_state_path), exist_ok=True)
+        tmp_path = f'{self.storage_state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(storage_state, f)
+        os.replace(tmp_path, self.storage_state_path)
+
+    async def dismiss_popups(self, page: Page):
+        """
+        Click the cookie and domain banners. Without a saved storage state they are expected and may render
+        after load, so wait for them briefly, otherwise click only the ones already present.
+        """
+        for selector in (Selector.cookie_ok, Selector.usa_domain):
+            if self.storage_state_loaded:
+                element = await page.query_selector(selector)
+            else:
+                try:
+                    element = await page.wait_for_selector(selector, timeout=POPUP_TIMEOUT_MS)
+                except TimeoutError:
+                    element = None
+            if element is None:
+                continue
+            try:
+                await element.click(timeout=2000)
+            except TimeoutError:
+                pass
+
+    async def is_preconfigured(self, page: Page):
+        """
+        Whether the state encoded in the URL took effect: full pages, sorted, and in-stock filtered if required.
+        """
+        await self.dismiss_popups(page)
         try:
-            await page.click(Selector.usa_domain, timeout=5000)
-        except TimeoutError:
-            pass
+            # an ignored sort parameter shows first, fail fast instead of waiting for the rows
+            await page.wait_for_selector(Selector.mfpn_sorted, timeout=2000)
+            await page.wait_for_function(CHECK_ROW_COUNT_JS, timeout=10000)
+            product_count = parse_int(await page.text_content(Selector.product_count, timeout=5000))
+        except (TimeoutError, ValueError):
+            return False
+        # the in-stock filter is skipped by the clicks when it would leave nothing to crawl
+        if product_count <= 1:
+            return False
+        if self.in_stock_only and await page.query_selector(Selector.remove_filters) is None:
+            return False
+        return True
+
+    @timed_step('config_page')
+    async def config_page(self, page: Page):
+        await self.set_viewport(page)
+        if self.preconfigured_url and await self.is_preconfigured(page):
+            self.logger.info('Filter, page size and sort taken from the URL. ')
+        else:
+            if self.preconfigured_url:
+                self.logger.info('URL-encoded listing state did not take effect, configure by clicking. ')
+                await page.goto(self.start_url)
+            await self.config_page_by_clicks(page)
+            await self.save_storage_state(page.context)
+        # the in-stock filter is skipped when it would leave nothing to crawl, page jumps must keep what was applied
+        self.filtered = self.in_stock_only and await page.query_selector(Selector.remove_filters) is not None
 
-        if self.in_stock_only:
+    async def config_page_by_clicks(self, page: Page):
+        await self.dismiss_popups(page)
+
+        # shard URLs were taken from the filtered listing, clicking the in-stock option again would clear it
+        if self.in_stock_only and self.shard is None:
             await page.click(Selector.in_stock)
             product_count_remaining = await page.text_content(Selector.product_count_remaining)
             product_count_remaining = parse_int(product_count_remaining)
@@ -87,19 +275,7 @@ class AsyncDataCrawler:
         self.logger.info('Set page size to 100 item per page. ')
 
         try:
-            await page.wait_for_function(
-                '''
-                function checkRowCount() {
-                    let product_count = parseInt(document.querySelector('[data-testid="product-count"]').textContent);
-                    let row_count = document.querySelectorAll('[data-testid="data-table-0-row"]').length;
-                    if (product_count < 100) {
-                        return row_count === product_count;
-                    } else {
-                        return row_count === 100;
-                    }
-                }
-                '''
-            )
+            await page.wait_for_function(CHECK_ROW_COUNT_JS)
         except TimeoutError:
             pass
 
@@ -107,15 +283,27 @@ class AsyncDataCrawler:
         await page.wait_for_selector(Selector.mfpn_sorted)
         self.logger.info('Sort items by MFR Part# ascending. ')
 
+    @timed_step('download', paced=True)
     async def download(self, page: Page, filename: str):
-        async with page.expect_download() as download_info:
-            await page.click(Selector.download_popup)
-            await page.click(Selector.download_btn)
-        download = await download_info.value
+        if self.direct_download and self.download_template is None:
+            with DownloadRequestRecorder(page) as recorder:
+                download = await self.click_download(page)
+            self.download_template = await recorder.template(download.url)
+            self.logger.info(f'Captured download request: {jsonify(self.download_template.to_dict())}')
+        else:
+            download = await self.click_download(page)
         file_path = os.path.join(self.download_dir, filename)
         file_path = os.path.realpath(file_path)
         self.logger.info(f'\nDownloaded {file_path}')
         await download.save_as(file_path)
+        return file_path
+
+    @staticmethod
+    async def click_download(page: Page):
+        async with page.expect_download() as download_info:
+            await page.click(Selector.download_popup)
+            await page.click(Selector.download_btn)
+        return await download_info.value
 
     @staticmethod
     async def scroll_up_down(page):
@@ -124,12 +312,14 @@ class AsyncDataCrawler:
         for offset in [pos_offset, neg_offset]:
             await page.evaluate(f"window.scrollTo(0, {offset});")
 
+    @retry_on_exception(attempts=3, delay=2.0)
+    @timed_step('go_next_page')
     async def go_next_page(self, page: Page, cur_page: int, use_next_page_alt: bool):
         try:
             async with page.expect_navigation(wait_until='networkidle'):
                 if use_next_page_alt:
                     await page.click(Selector.next_page_alt)
-                    await page.wait_for_timeout(2000)
+                    await self.pacer.pause()
                 else:
                     await page.click(Selector.next_page)
                 await page.wait_for_selector(Selector.next_page_rendered.format(cur_page))
@@ -137,59 +327,460 @@ class AsyncDataCrawler:
         except TimeoutError:
             pass
 
-    def combine_pages(self):
-        in_files = get_file_list(self.download_dir, suffix='.csv')
-        out_path = os.path.join(self.download_dir, f'{self.subcategory}_all.xlsx')
-        out_path = os.path.realpath(out_path)
-        combined_df = concat_data(in_files)
-        if any(combined_df['Stock'].astype(str).str.contains('.', regex=False)):
-            alert = 'ALERT!\nColumn "Stock" contains decimal numbers.\nColumn misaligned.\nFix data mannually. '
+    @timed_step('goto_page_number', paced=True)
+    async def goto_page_number(self, page: Page, configured_url: str, page_num: int):
+        """
+        Jump straight to page_num of the configured listing, returns whether the jump took effect
+        and the page still shows the filtered product count in full pages sorted by MFR part number.
+        """
+        try:
+            await page.goto(update_url_qs(configured_url, page=page_num), wait_until='networkidle')
+            cur_page = int(await page.text_content(Selector.cur_page))
+            if cur_page != page_num:
+                return False
+            # a jump that dropped the sort or page size would download rows of other pages
+            await page.wait_for_selector(Selector.mfpn_sorted, timeout=2000)
+            await page.wait_for_function(CHECK_PAGE_ROWS_JS, arg=self.page_row_count(page_num), timeout=10000)
+            # a jump that dropped the filter still shows full sorted pages, but of unfiltered parts
+            product_count = parse_int(await page.text_content(Selector.product_count, timeout=5000))
+        except (TimeoutError, ValueError):
+            return False
+        if product_count != self.item_count:
+            return False
+        if self.filtered and await page.query_selector(Selector.remove_filters) is None:
+            return False
+        return True
+
+    def page_row_count(self, page_num: int):
+        return max(min(100, self.item_count - (page_num - 1) * 100), 0)
+
+    async def crawl_page_range(self, page: Page, configured_url: str, page_nums):
+        for page_num in page_nums:
+            if page_num in self.downloaded_pages:
+                continue
+            if not await self.goto_page_number(page, configured_url, page_num):
+                self.logger.warning(
+                    f'Failed to jump to page {page_num} of the configured listing, '
+                    f'leave remaining pages to serial crawl. '
+                )
+                return
+            await self.download_page(page=page, logger=self.logger)
+
+    async def crawl_parallel(self, context: BrowserContext, page: Page):
+        """
+        Download pages across page_workers tabs, each tab jumps to the pages of its own range.
+        """
+        configured_url = page.url
+        if 1 not in self.downloaded_pages:
+            await self.download_page(page=page, logger=self.logger)
+        remaining_pages = [p for p in range(1, self.max_page + 1) if p not in self.downloaded_pages]
+        if len(remaining_pages) == 0:
+            return
+
+        range_size = math.ceil(len(remaining_pages) / self.page_workers)
+        page_ranges = list(get_batches(remaining_pages, batch_size=range_size))
+        tabs = [page]
+        for _ in page_ranges[1:]:
+            tab = await context.new_page()
+            await self.set_viewport(tab)
+            tabs.append(tab)
+        self.logger.info(f'Download {len(remaining_pages)} pages with {len(tabs)} tabs in parallel. ')
+
+        await asyncio.gather(*[
+            self.crawl_page_range(tab, configured_url, page_range)
+            for tab, page_range in zip(tabs, page_ranges)
+        ])
+        for tab in tabs[1:]:
+            await tab.close()
+
+        if len(self.downloaded_pages) < self.max_page:
+            # fall back to clicking through from the first page
+            await page.goto(self.entry_url())
+            await self.config_page(page)
+
+    @timed_step('direct_download', paced=True)
+    async def download_direct(self, downloader: DirectDownloader, page_num: int):
+        file_path = os.path.join(self.download_dir, f'{self.subcategory}_{page_num}.csv')
+        file_path = await downloader.fetch(page_num, os.path.realpath(file_path))
+        self.on_page_downloaded(None, page_num, file_path)
+        return file_path
+
+    async def crawl_direct(self, context: BrowserContext, page: Page):
+        """
+        Download the first page in the browser to capture its download request, then replay the request
+        for the remaining pages without rendering them. Stops at the first failed replay, leaving the
+        remaining pages to the browser.
+        """
+        if self.download_template is None:
+            try:
+                cur_page = int(await page.text_content(Selector.cur_page))
+                file_path = await self.download(page, f'{self.subcategory}_{cur_page}.csv')
+            except TimeoutError as ex:
+                self.logger.warning(f'Failed to capture download request, download in browser: {ex!r}')
+                return
+            self.on_page_downloaded(page, cur_page, file_path)
+
+        downloader = DirectDownloader(context, self.download_template)
+        remaining_pages = [p for p in range(1, self.max_page + 1) if p not in self.downloaded_pages]
+        if len(remaining_pages) > 0 and not self.template_verified:
+            try:
+                self.template_verified = await self.verify_template(downloader, remaining_pages[0])
+            except Exception as ex:
+                self.logger.warning(f'Direct download failed, fall back to browser: {ex!r}')
+                self.template_verified = False
+            if not self.template_verified:
+                self.direct_download = False
+                return
+            remaining_pages = remaining_pages[1:]
+        for page_nums in get_batches(remaining_pages, batch_size=self.direct_workers):
+            results = await asyncio.gather(
+                *[self.download_direct(downloader, page_num) for page_num in page_nums],
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if len(errors) > 0:
+                self.logger.warning(f'Direct download failed, fall back to browser: {errors[0]!r}')
+                self.direct_download = False
+                return
+        self.logger.info(f'Downloaded {len(remaining_pages)} pages by direct requests. ')
+
+    async def verify_template(self, downloader: DirectDownloader, page_num: int):
+        """
+        Replay page_num and compare its first parts with a page downloaded in the browser.
+        A request that ignores the page parameter returns the same table for every page, it must not be trusted.
+        """
+        if len(self.downloaded_pages) == 0:
+            return False
+        reference_page = min(self.downloaded_pages)
+        reference_path = os.path.join(self.download_dir, f'{self.subcategory}_{reference_page}.csv')
+        file_path = os.path.join(self.download_dir, f'{self.subcategory}_{page_num}.csv')
+        file_path = await downloader.fetch(page_num, os.path.realpath(file_path))
+        reference_parts = get_part_numbers(read_data(reference_path))[:10]
+        if get_part_numbers(read_data(file_path))[:10] == reference_parts:
+            os.remove(file_path)
+            self.logger.warning(
+                f'Replayed page {page_num} repeats page {reference_page}, '
+                f'the download request ignores the page number, fall back to browser. '
+            )
+            return False
+        self.on_page_downloaded(None, page_num, file_path)
+        return True
+
+    def combine_pages(self, output_formats=('xlsx',), dedupe=None):
+        report = combine_pages(self.download_dir, self.subcategory, output_formats, dedupe)
+        self.log_combine_report(report)
+
+    def log_combine_report(self, report: dict):
+        for alert in report['alerts']:
             self.logger.warning(alert)
-        combined_df['Stock'] = combined_df['Stock'].astype(str).str.replace(',', '')
-        combined_df['Stock'] = pd.to_numeric(combined_df['Stock'], errors='coerce')
-        combined_df['Subcategory'] = self.subcategory
-        combined_df.to_excel(out_path, index=False)
-        self.logger.info(f'{self.subcategory} data combined and saved at: \n{out_path}')
+        if report['duplicate_count'] > 0:
+            self.logger.info(f'Dropped {report["duplicate_count"]} duplicate parts. ')
+        if report['realigned_rows'] > 0:
+            self.logger.info(f'Realigned {report["realigned_rows"]} rows with shifted columns. ')
+        out_paths = '\n'.join(report['out_paths'].values())
+        self.logger.info(f'{self.subcategory} data combined and saved at: \n{out_paths}')
 
     def all_pages_downloaded(self, cur_page: int):
         return len(self.downloaded_pages) == self.max_page or cur_page == self.max_page
 
     async def crawl(self):
+        self.metrics.subcategory_started(self.job_key)
+        try:
+            await self.crawl_browser()
+        finally:
+            if self.manifest is not None:
+                self.manifest.flush(self.job_key)
+            self.metrics.subcategory_finished(self.job_key)
+
+    async def crawl_browser(self):
+        context_options = self.context_options()
+        self.storage_state_loaded = 'storage_state' in context_options
+        if self.browser_pool is not None:
+            async with self.browser_pool.new_context(**context_options) as context:
+                await self.crawl_context(context)
+            self.logger.info('Crawl finished, released browser context to pool. ')
+            return
+
         async with async_playwright() as playwright:
             browser = await playwright.firefox.launch(headless=self.headless)
-            context = await browser.new_context(accept_downloads=True)
-            page = await context.new_page()
+            context = await browser.new_context(**context_options)
+            await self.crawl_context(context)
+            await context.close()
+            await browser.close()
+            self.logger.info('Crawl finished, closing browser and browser context. ')
 
-            await page.goto(self.start_url)
-            await self.config_page(page)
+    async def crawl_context(self, context: BrowserContext):
+        await self.request_blocker.attach(context)
+        page = await context.new_page()
+
+        await page.goto(self.entry_url())
+        await self.config_page(page)
+
+        page_nav = await page.text_content(Selector.page_nav)
+        item_count = int(re.findall(r"of (.+)", page_nav)[0].replace(",", ""))
+        self.item_count = item_count
+        self.max_page = math.ceil(item_count / 100)
+        self.logger.info(f"Calculated {self.max_page} max page")
+        if self.validate_pages:
+            self.validator = PageValidator(item_count)
+        self.load_checkpoint(item_count)
+
+        if self.is_unchanged(item_count):
+            self.unchanged = True
+            self.logger.info(f'Product count {item_count} unchanged since previous session, skip downloading. ')
+            return
+
+        if self.shard is None and self.shard_threshold is not None and self.max_page > self.shard_threshold:
+            self.shards = self.saved_shards() or await self.discover_shards(page)
+            if len(self.shards) > 0:
+                self.logger.info(f'Split {self.max_page} pages into {len(self.shards)} shards. ')
+                return
+
+        await self.crawl_pages(context, page)
+        await self.repair_pages(page)
+
+    async def crawl_pages(self, context: BrowserContext, page: Page):
+        if self.direct_download:
+            await self.crawl_direct(context, page)
+            if len(self.downloaded_pages) == self.max_page:
+                return
 
-            page_nav = await page.text_content(Selector.page_nav)
-            item_count = int(re.findall(r"of (.+)", page_nav)[0].replace(",", ""))
-            self.max_page = math.ceil(item_count / 100)
-            self.logger.info(f"Calculated {self.max_page} max page")
+        # resumed crawls jump straight to the missing pages instead of clicking through finished ones
+        if (self.page_workers > 1 and self.max_page > 1) or len(self.downloaded_pages) > 0:
+            await self.crawl_parallel(context, page)
+            if len(self.downloaded_pages) == self.max_page:
+                return
 
-            while True:
-                cur_page = await self.download_page(page=page, logger=self.logger)
-                self.logger.info(f"Download succeeded without retry")
+        while True:
+            cur_page = await self.download_page(page=page, logger=self.logger)
+            self.logger.info(f"Download succeeded without retry")
 
-                if self.all_pages_downloaded(cur_page):
+            if self.all_pages_downloaded(cur_page):
+                break
+
+            await self.go_next_page(page=page, cur_page=cur_page, use_next_page_alt=self.use_next_page_alt)
+
+    def saved_shards(self):
+        # shards found by an interrupted session are crawled again without another discovery
+        if self.manifest is None:
+            return {}
+        return self.manifest.subcategory(self.job_key).get('shards') or {}
+
+    @staticmethod
+    async def read_facet_counts(page: Page):
+        """
+        Product counts shown next to the options of the shard facet, empty if any of them can't be read.
+        """
+        counts = []
+        for option in await page.query_selector_all(Selector.shard_facet_options):
+            text = await option.evaluate("e => (e.closest('label') || e).textContent")
+            match = re.search(r'\(([\d,]+)\)', text)
+            if match is None:
+                return []
+            counts.append(parse_int(match.group(1)))
+        return counts
+
+    @staticmethod
+    def group_facet_options(counts, max_items):
+        """
+        Group option indices, largest option first, into shards of at most max_items products.
+        An option with more products is a shard of its own.
+        """
+        groups = []
+        for index in sorted(range(len(counts)), key=lambda i: -counts[i]):
+            for group in groups:
+                if group['count'] + counts[index] <= max_items:
+                    group['count'] += counts[index]
+                    group['options'].append(index)
                     break
+            else:
+                groups.append({'count': counts[index], 'options': [index]})
+        return [sorted(group['options']) for group in groups]
 
-                await self.go_next_page(page, cur_page, self.use_next_page_alt)
+    async def discover_shards(self, page: Page):
+        """
+        Split the subcategory into shards of about shard_threshold pages by the options of the Manufacturer
+        filter, grouped by the counts shown in the filter panel. Returns {shard: url}, or no shards unless
+        the shards cover every product of the subcategory.
+        """
+        counts = await self.read_facet_counts(page)
+        if len(counts) < 2:
+            self.logger.warning('No option counts in the filter panel, crawl without sharding. ')
+            return {}
+        groups = self.group_facet_options(counts, self.shard_threshold * 100)
+        if len(groups) < 2:
+            return {}
 
-            await context.close()
-            await browser.close()
-            self.logger.info('Crawl finished, closing browser and browser context. ')
+        configured_url = page.url
+        shards = {}
+        shard_count = 0
+        try:
+            for i, option_indices in enumerate(groups):
+                if i > 0:
+                    await page.goto(configured_url)
+                options = await page.query_selector_all(Selector.shard_facet_options)
+                for option_index in option_indices:
+                    await options[option_index].click()
+                async with page.expect_navigation():
+                    await page.click(Selector.apply_all)
+                shard_count += parse_int(await page.text_content(Selector.product_count))
+                shards[str(i)] = page.url
+        except (TimeoutError, ValueError, IndexError) as ex:
+            self.logger.warning(f'Failed to read shards from the filter panel, crawl without sharding: {ex!r}')
+            shards = {}
+        else:
+            if shard_count != self.item_count:
+                self.logger.warning(
+                    f'Shards cover {shard_count} of {self.item_count} products, crawl without sharding. '
+                )
+                shards = {}
+
+        if len(shards) == 0:
+            await page.goto(self.entry_url())
+            await self.config_page(page)
+        return shards
+
+    def pages_to_repair(self):
+        bad_pages = self.duplicate_pages | self.invalid_pages.keys()
+        return sorted(p for p in bad_pages if self.repair_attempts.get(p, 0) < self.max_repairs)
 
-    @retry_on_exception(attempts=5, delay=10.0)
+    async def repair_pages(self, page: Page):
+        """
+        Jump to pages that failed validation or only repeated other pages, and download just those again.
+        """
+        while True:
+            page_nums = self.pages_to_repair()
+            if len(page_nums) == 0:
+                break
+            self.logger.info(f'Repair pages {page_nums}')
+            for page_num in page_nums:
+                self.repair_attempts[page_num] = self.repair_attempts.get(page_num, 0) + 1
+            self.downloaded_pages.difference_update(page_nums)
+            await self.crawl_page_range(page, page.url, page_nums)
+            # pages that couldn't be reached keep their previous download
+            self.downloaded_pages.update(page_nums)
+
+        bad_pages = sorted(self.duplicate_pages | self.invalid_pages.keys())
+        if len(bad_pages) > 0:
+            bad_page_msg = {
+                'subcategory': self.subcategory,
+                'action': 'kept after repair',
+                'invalid_pages': {str(p): problems for p, problems in self.invalid_pages.items()},
+                'duplicate_pages': sorted(self.duplicate_pages),
+            }
+            self.logger.error(jsonify(bad_page_msg))
+            if self.manifest is not None:
+                self.manifest.update(self.job_key, bad_pages=bad_pages)
+
+    def previous_artifact_paths(self):
+        """
+        Existing {subcategory}_all files of the previous session, by output format.
+        """
+        if self.previous_manifest is None:
+            return {}
+        previous_dir = os.path.join(self.previous_manifest.session_dir, self.job_key)
+        artifact_paths = {
+            output_format: os.path.join(previous_dir, f'{self.subcategory}_all.{output_format}')
+            for output_format in OUTPUT_FORMATS
+        }
+        return {output_format: path for output_format, path in artifact_paths.items() if os.path.exists(path)}
+
+    def is_unchanged(self, item_count: int):
+        if self.previous_manifest is None:
+            return False
+        return (
+            self.previous_manifest.is_combined(self.job_key)
+            and self.previous_manifest.item_count(self.job_key) == item_count
+            and len(self.previous_artifact_paths()) > 0
+        )
+
+    def load_checkpoint(self, item_count: int):
+        if self.manifest is None:
+            return
+        if self.manifest.record_start(self.job_key, self.start_url, item_count, self.max_page, resume=self.resume):
+            self.remove_page_files()
+            if self.resume:
+                self.logger.info(f'Product count changed to {item_count}, discarded downloaded pages. ')
+            else:
+                self.logger.info('Not resuming, discarded pages downloaded by an earlier run of the session. ')
+        checkpoint_pages = self.manifest.downloaded_pages(self.job_key)
+        if len(checkpoint_pages) > 0:
+            self.downloaded_pages.update(checkpoint_pages.keys())
+            for page_num, file_path in sorted(checkpoint_pages.items()):
+                self.check_page(page_num, file_path)
+            self.logger.info(f'Resumed {len(checkpoint_pages)} downloaded pages from checkpoint. ')
+
+    def remove_page_files(self):
+        # combine_pages reads every CSV of the folder and its shard folders, discarded pages would be merged
+        for filename in os.listdir(self.download_dir):
+            path = os.path.join(self.download_dir, filename)
+            if filename.endswith('.csv'):
+                os.remove(path)
+            elif self.shard is None and filename.startswith('shard_') and os.path.isdir(path):
+                shutil.rmtree(path)
+
+    def on_page_downloaded(self, page: Optional[Page], page_num: int, file_path: str):
+        self.downloaded_pages.add(page_num)
+        self.metrics.page_downloaded(self.job_key, page_num, os.path.getsize(file_path))
+        # direct downloads don't render pages in the browser
+        if self.browser_pool is not None and page is not None:
+            self.browser_pool.record_pages(page.context)
+        if self.manifest is not None:
+            self.manifest.record_page(self.job_key, page_num, file_path)
+        if self.part_store is not None:
+            self.part_store.add_page(self.subcategory, page_num, file_path).add_done_callback(self.log_ingest_error)
+        self.check_page(page_num, file_path)
+
+    def check_page(self, page_num: int, file_path: str):
+        """
+        Validate a downloaded page and track its parts for duplicates, bad pages are left for repair_pages.
+        """
+        if self.validator is None and self.deduplicator is None:
+            return
+        try:
+            df = read_data(file_path)
+        except Exception as ex:
+            df = None
+            problems = [f'unreadable: {ex!r}']
+        else:
+            problems = self.validator.validate(page_num, df) if self.validator is not None else []
+
+        if len(problems) > 0:
+            self.logger.warning(f'Page {page_num} failed validation: {jsonify(problems)}')
+            self.invalid_pages[page_num] = problems
+        else:
+            self.invalid_pages.pop(page_num, None)
+        if df is not None:
+            self.track_duplicates(page_num, df)
+
+    def track_duplicates(self, page_num: int, df):
+        if self.deduplicator is None:
+            return
+        try:
+            part_numbers = get_part_numbers(df)
+        except KeyError as ex:
+            self.logger.warning(f'Failed to read part numbers of page {page_num}: {ex!r}')
+            return
+        page_key = page_num if self.shard is None else f'{self.shard}/{page_num}'
+        if self.deduplicator.add_page(self.subcategory, page_key, part_numbers):
+            self.logger.warning(f'Page {page_num} only repeats parts of other pages, probably re-served by the site. ')
+            self.duplicate_pages.add(page_num)
+        else:
+            self.duplicate_pages.discard(page_num)
+
+    def log_ingest_error(self, future):
+        if future.exception() is not None:
+            self.logger.error(f'Failed to store page in part store: {future.exception()!r}')
+
+    @retry_on_exception(attempts=5, delay=2.0)
     async def download_page(self, page: Page, logger):
         self.use_next_page_alt = False
         cur_page = int(await page.text_content(Selector.cur_page, timeout=60 * 1000))
         if cur_page not in self.downloaded_pages:
             logger.info({'Current Page': cur_page, 'Max Page': self.max_page})
             filename = f'{self.subcategory}_{cur_page}.csv'
-            await self.download(page, filename)
-            self.downloaded_pages.add(cur_page)
+            file_path = await self.download(page, filename)
+            self.on_page_downloaded(page, cur_page, file_path)
         else:
             logger.warning(f'Page {cur_page} has already been downloaded. ')
             self.use_next_page_alt = True
@@ -198,62 +789,325 @@ class AsyncDataCrawler:
 
 
 class AsyncDataCrawlerRunner:
-    def __init__(self, start_urls, base_download_dir, headless=True, in_stock_only=True, session_name=None):
+    def __init__(self, start_urls, base_download_dir, headless=True, in_stock_only=True, session_name=None,
+                 max_pages_per_browser=1000, max_memory_mb=None, subcat_url_info=None, page_workers=1,
+                 network_profile: NetworkProfile = DEFAULT_PROFILE, resume=False, combine_workers=2,
+                 incremental=False, previous_session=None, output_formats=('xlsx',), metrics=True,
+                 max_concurrency=6, pacer: AdaptiveController = None, retry_policy: RetryPolicy = None,
+                 direct_download=False, worker_name=None, part_store=False, dedupe=None,
+                 combine_chunk_size=50000, validate_pages=True, preconfigured_url=False,
+                 storage_state_path=DEFAULT_STORAGE_STATE_PATH, shard_threshold=None):
         self.start_urls = start_urls
+        self.subcat_url_info = subcat_url_info or []
         self.base_download_dir = base_download_dir
         self.headless = headless
         self.in_stock_only = in_stock_only
-        self.max_concurrency = 3
+        self.pacer = pacer
+        self.page_workers = page_workers
+        self.direct_download = direct_download
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.browser_pool = None
+        self.request_blocker = RequestBlocker(network_profile)
+        self.resume = resume
+        self.combine_workers = combine_workers
+        self.combine_executor = None
+        self.pending_combines = []
+        self.incremental = incremental
+        self.diff_reports = {}
+        self.work_queue = None
+        # shard workers share the session folder and the per-job manifests, each keeps its own log and metrics
+        self.worker_name = worker_name
+        file_suffix = f'_{worker_name}' if worker_name else ''
+        check_output_formats(output_formats)
+        self.output_formats = tuple(output_formats)
+        check_dedupe_policy(dedupe)
+        self.dedupe = dedupe
+        self.deduplicator = PartDeduplicator(dedupe) if dedupe is not None else None
+        # data with more rows than this is combined in chunks of this size instead of in memory
+        self.combine_chunk_size = combine_chunk_size
+        self.validate_pages = validate_pages
+        self.preconfigured_url = preconfigured_url
+        self.storage_state_path = storage_state_path
+        # subcategories with more pages are split into facet shards of about this many pages, off with None
+        self.shard_threshold = shard_threshold
+        self.shard_groups = {}
 
-        session_index = get_latest_session_index(self.base_download_dir) + 1
+        session_index = get_latest_session_index(self.base_download_dir)
+        if not (self.resume and session_index > 0):
+            session_index += 1
         self.session_name = session_name or f'session{session_index}'
         self.download_dir = os.path.realpath(
             os.path.join(self.base_download_dir, self.session_name)
         )
         os.makedirs(self.download_dir, exist_ok=True)
+        self.manifest = CrawlManifest(self.download_dir)
 
-        log_file_path = os.path.join(self.download_dir, f'{self.session_name}.log')
-        self.logger = set_up_logger(self.session_name, log_file_path)
+        self.previous_manifest = None
+        if self.incremental:
+            if previous_session is None and session_index > 1:
+                previous_session = f'session{session_index - 1}'
+            previous_session_dir = os.path.join(self.base_download_dir, str(previous_session))
+            if previous_session is not None and os.path.isdir(previous_session_dir):
+                self.previous_manifest = CrawlManifest(previous_session_dir)
+
+        log_name = f'{self.session_name}{file_suffix}'
+        log_file_path = os.path.join(self.download_dir, f'{log_name}.log')
+        self.logger = set_up_logger(log_name, log_file_path, append=self.resume)
+        metrics_file_path = os.path.join(self.download_dir, f'{log_name}_metrics.jsonl') if metrics else None
+        self.metrics = MetricsRecorder(metrics_file_path, name=log_name)
+        # indexed copy of all parts of the session, next to the Excel and parquet outputs
+        self.part_store = PartStore(
+            os.path.join(self.download_dir, 'parts.sqlite'), keep=self.dedupe or 'latest'
+        ) if part_store else None
+        self.pacer = self.pacer or AdaptiveController(max_concurrency=max_concurrency, logger=self.logger)
+        self.max_concurrency = self.pacer.max_concurrency
+        # one retry budget and circuit breaker for all crawlers of the session
+        self.retry_policy = retry_policy or RetryPolicy(
+            budget=RetryBudget(), breaker=CircuitBreaker(logger=self.logger)
+        )
 
         params = {
             'start_urls': self.start_urls,
             'download_dir': self.download_dir,
             'headless': self.headless,
             'max_concurrency': self.max_concurrency,
+            'initial_concurrency': self.pacer.concurrency,
+            'page_workers': self.page_workers,
+            'direct_download': self.direct_download,
+            'worker_name': self.worker_name,
+            'part_store': self.part_store.path if self.part_store else None,
+            'dedupe': self.dedupe,
+            'combine_chunk_size': self.combine_chunk_size,
+            'validate_pages': self.validate_pages,
+            'preconfigured_url': self.preconfigured_url,
+            'storage_state_path': self.storage_state_path,
+            'shard_threshold': self.shard_threshold,
+            'max_pages_per_browser': self.max_pages_per_browser,
+            'max_memory_mb': self.max_memory_mb,
+            'network_profile': network_profile.to_dict(),
+            'resume': self.resume,
+            'combine_workers': self.combine_workers,
+            'incremental': self.incremental,
+            'previous_manifest': self.previous_manifest.session_dir if self.previous_manifest else None,
+            'output_formats': self.output_formats,
         }
         pretty_params = jsonify(params)
         self.logger.info(
             f'CrawlerRunner initialized with params:\n{pretty_params}'
         )
 
+    def new_crawler(self, url: str, **kwargs):
+        return AsyncDataCrawler(
+            url, self.download_dir, self.headless, self.in_stock_only,
+            browser_pool=self.browser_pool, page_workers=self.page_workers,
+            request_blocker=self.request_blocker, manifest=self.manifest, resume=self.resume,
+            previous_manifest=self.previous_manifest, metrics=self.metrics, pacer=self.pacer,
+            retry_policy=self.retry_policy, direct_download=self.direct_download, part_store=self.part_store,
+            deduplicator=self.deduplicator, validate_pages=self.validate_pages,
+            preconfigured_url=self.preconfigured_url, storage_state_path=self.storage_state_path, **kwargs
+        )
+
+    async def run_crawl_job(self, item):
+        if isinstance(item, ShardJob):
+            return await self.create_shard_job(item)
+        return await self.create_crawl_job(item)
+
     async def create_crawl_job(self, url: str):
-        crawler = AsyncDataCrawler(url, self.download_dir, self.headless, self.in_stock_only)
+        """
+        Crawl one subcategory, returns the future of its background combine job, if any.
+        """
+        crawler = self.new_crawler(url, shard_threshold=self.shard_threshold)
+        if self.resume and self.manifest.is_combined(crawler.job_key):
+            self.logger.info(f'Skipped finished crawl job for URL: {url}')
+            return
+
         self.logger.info(f'Created crawl job for URL: {url}')
         try:
-            await crawler.crawl()
+            if not (self.resume and self.manifest.is_crawled(crawler.job_key)):
+                await crawler.crawl()
+            if len(crawler.shards) > 0:
+                return self.queue_shards(crawler)
+            self.manifest.record_crawled(crawler.job_key)
         except TimeoutError as ex:
             error_msg = {
                 'url': url,
                 'error': 'Timeout exceeded.',
-                'msg': 'Retry crawling with AppSubCat'
+                'msg': 'Retry crawling with AppSubCat, or rerun with resume=True'
             }
             self.logger.error(jsonify(error_msg))
             self.logger.error("==========Full Error Message==========")
             self.logger.error(ex)
             self.logger.error("======================================")
-        crawler.combine_pages()
+        if crawler.unchanged:
+            self.reuse_previous_artifact(crawler)
+            return
+        # combine in the background so this slot can start the next crawl right away
+        combine_future = asyncio.ensure_future(self.combine_job(crawler))
+        self.pending_combines.append(combine_future)
+        return combine_future
+
+    def queue_shards(self, crawler: AsyncDataCrawler):
+        """
+        Put the shards of an oversized subcategory into the work queue,
+        returns the future of the combine job that merges them once all shards are crawled.
+        """
+        self.manifest.update(crawler.job_key, shards=crawler.shards)
+        done = asyncio.Event()
+        self.shard_groups[crawler.job_key] = {'pending': len(crawler.shards), 'done': done}
+        for shard, shard_url in crawler.shards.items():
+            self.work_queue.put(ShardJob(shard_url, shard, crawler.job_key))
+        self.logger.info(f'Queued {len(crawler.shards)} shards for URL: {crawler.start_url}')
+        combine_future = asyncio.ensure_future(self.combine_shards(crawler, done))
+        self.pending_combines.append(combine_future)
+        return combine_future
+
+    async def create_shard_job(self, job: ShardJob):
+        crawler = self.new_crawler(job.url, shard=job.shard)
+        self.logger.info(f'Created shard job {job}')
+        try:
+            if not (self.resume and self.manifest.is_crawled(crawler.job_key)):
+                await crawler.crawl()
+            self.manifest.record_crawled(crawler.job_key)
+        except TimeoutError as ex:
+            error_msg = {
+                'url': job.url,
+                'shard': f'{job.parent_key}/shard_{job.shard}',
+                'error': 'Timeout exceeded.',
+                'msg': 'Rerun with resume=True'
+            }
+            self.logger.error(jsonify(error_msg))
+            self.logger.error(ex)
+        finally:
+            group = self.shard_groups[job.parent_key]
+            group['pending'] -= 1
+            if group['pending'] == 0:
+                group['done'].set()
+
+    async def combine_shards(self, crawler: AsyncDataCrawler, done: asyncio.Event):
+        """
+        Merge the shard folders of a subcategory into one {subcategory}_all output, after the last shard.
+        """
+        await done.wait()
+        shard_keys = [f'{crawler.job_key}/shard_{shard}' for shard in crawler.shards]
+        if all(self.manifest.is_crawled(key) for key in shard_keys):
+            self.manifest.record_crawled(crawler.job_key)
+        await self.combine_job(crawler)
+
+    def chunk_size_for(self, row_count):
+        if self.combine_chunk_size is None or row_count <= self.combine_chunk_size:
+            return None
+        return self.combine_chunk_size
+
+    async def combine_job(self, crawler: AsyncDataCrawler):
+        loop = asyncio.get_running_loop()
+        item_count = crawler.item_count or self.manifest.item_count(crawler.job_key) or 0
+        try:
+            with self.metrics.timed('combine_pages', subcategory=crawler.job_key):
+                report = await loop.run_in_executor(
+                    self.combine_executor, combine_pages,
+                    crawler.download_dir, crawler.subcategory, self.output_formats, self.dedupe,
+                    self.chunk_size_for(item_count)
+                )
+        except Exception as ex:
+            error_msg = {
+                'url': crawler.start_url,
+                'error': 'Failed to combine pages.',
+                'msg': repr(ex),
+            }
+            self.logger.error(jsonify(error_msg))
+            return
+        crawler.log_combine_report(report)
+        if self.manifest.is_crawled(crawler.job_key):
+            self.manifest.record_combined(crawler.job_key)
+
+        previous_artifact_paths = crawler.previous_artifact_paths()
+        common_formats = [f for f in ('parquet', 'xlsx') if f in previous_artifact_paths and f in report['out_paths']]
+        if len(common_formats) > 0:
+            diff_format = common_formats[0]
+            diff_path = os.path.join(crawler.download_dir, f'{crawler.subcategory}_diff.xlsx')
+            try:
+                with self.metrics.timed('diff_parts', subcategory=crawler.job_key):
+                    diff_report = await loop.run_in_executor(
+                        self.combine_executor, diff_parts,
+                        report['out_paths'][diff_format], previous_artifact_paths[diff_format], diff_path
+                    )
+            except Exception as ex:
+                self.logger.error(jsonify({'url': crawler.start_url, 'error': 'Failed to diff.', 'msg': repr(ex)}))
+                return
+            self.diff_reports[crawler.job_key] = diff_report
+            crawler.logger.info(f'Diff against previous session: {jsonify(diff_report)}')
+
+    def reuse_previous_artifact(self, crawler: AsyncDataCrawler):
+        previous_artifact_paths = crawler.previous_artifact_paths()
+        for previous_artifact_path in previous_artifact_paths.values():
+            out_path = os.path.join(crawler.download_dir, os.path.basename(previous_artifact_path))
+            shutil.copy2(previous_artifact_path, out_path)
+            self.logger.info(f'Reused unchanged {crawler.subcategory} data from {previous_artifact_path}')
+        if self.part_store is not None and len(previous_artifact_paths) > 0:
+            self.part_store.add_page(crawler.subcategory, None, list(previous_artifact_paths.values())[0])
+        self.manifest.update(crawler.job_key, reused_from=list(previous_artifact_paths.values()))
+        self.manifest.record_combined(crawler.job_key)
+        self.diff_reports[crawler.job_key] = {'unchanged': True}
 
     async def crawl_all(self):
-        tasks = [self.create_crawl_job(url) for url in self.start_urls]
-        for task_batch in get_batches(tasks, batch_size=self.max_concurrency):
-            await asyncio.gather(*task_batch)
+        await self.run_jobs(self.run_crawl_job, self.sort_urls_by_product_count())
+
+    async def run_jobs(self, handler, items):
+        """
+        Run handler for every item with a shared browser pool and combine executor.
+        The handler may put more items into self.work_queue while it runs.
+        """
+        self.browser_pool = BrowserPool(
+            size=self.pacer.concurrency,
+            headless=self.headless,
+            max_pages_per_browser=self.max_pages_per_browser,
+            max_memory_mb=self.max_memory_mb,
+            logger=self.logger,
+        )
+        self.work_queue = WorkQueue(
+            handler,
+            name=f'{self.session_name}_crawl_queue',
+            logger=self.logger,
+            controller=self.pacer,
+        )
+        self.combine_executor = ProcessPoolExecutor(max_workers=self.combine_workers)
+        self.pending_combines = []
+        async with self.browser_pool:
+            await self.work_queue.run(items)
+        self.browser_pool = None
+        self.logger.info(f'All crawl jobs of {self.session_name} finished. ')
+
+        self.logger.info(f'Waiting for {len(self.pending_combines)} pending combine jobs. ')
+        await asyncio.gather(*self.pending_combines)
+        self.combine_executor.shutdown()
+        self.combine_executor = None
+        if self.incremental:
+            self.logger.info(f'Changes since previous session: {jsonify(self.diff_reports)}')
+        if self.deduplicator is not None:
+            self.logger.info(f'Duplicate parts: {jsonify(self.deduplicator.report())}')
+        self.manifest.flush()
+        if self.part_store is not None:
+            self.part_store.flush()
+            self.logger.info(f'Stored {self.part_store.count()} parts in {self.part_store.path}')
+        self.logger.info(f'Network traffic: {self.request_blocker.stats_msg()}')
+        self.logger.info(f'Retries: {jsonify(self.retry_policy.stats())}')
+        self.logger.info(f'Crawl metrics: {self.metrics.write_summary()}')
+
+    def sort_urls_by_product_count(self):
+        """
+        Longest jobs first, so that a large subcategory does not start last and run alone.
+        URLs without a known product count keep their original order at the end.
+        """
+        product_counts = {item['url']: item['product_count'] for item in self.subcat_url_info}
+        return sorted(self.start_urls, key=lambda url: -product_counts.get(url, 0))
 
     def combine_subcat_data(self):
-        in_files = get_file_list(self.download_dir, suffix='all.xlsx')
-        out_path = os.path.join(self.download_dir, 'combine.xlsx')
-        df = concat_data(in_files)
-        df.to_excel(out_path)
+        report = combine_subcategories(
+            self.download_dir, self.output_formats, self.dedupe, self.chunk_size_for(self.manifest.total_item_count())
+        )
+        out_paths = '\n'.join(report['out_paths'].values())
         self.logger.info(
-            f'Combined common-column data of all subcategories. \n'
-            f'Exported combined data to {out_path}'
+            f'Combined data of all subcategories with the union of their {report["column_count"]} columns. \n'
+            f'Exported combined data to {out_paths}'
         )
@@ -1,23 +1,44 @@
 import asyncio
-import re
+import time
 from playwright.async_api import async_playwright
 from playwright._impl._page import Page
 from dkcrawlerv2.utils import set_up_logger, jsonify, remove_url_qs, parse_int
+from dkcrawlerv2.network import NetworkProfile, RequestBlocker, DEFAULT_PROFILE
+from dkcrawlerv2.scheduler import WorkQueue
+from dkcrawlerv2.cache import DiscoveryCache
+from dkcrawlerv2.pacing import AdaptiveController
+from dkcrawlerv2.retry import RetryPolicy, CircuitBreaker, retry_on_exception
 from urllib.parse import urljoin
-import random
 
 
 class VendorSubCategoryCrawler:
-    def __init__(self, vendor_url, headless=True, log_file_path=None, target_vendor_only=True, in_stock_only=True):
+    def __init__(self, vendor_url, headless=True, log_file_path=None, target_vendor_only=True, in_stock_only=True,
+                 network_profile: NetworkProfile = DEFAULT_PROFILE, max_concurrency=3, retry_attempts=3,
+                 cache: DiscoveryCache = None, force_refresh=False, pacer: AdaptiveController = None,
+                 retry_policy: RetryPolicy = None):
         self.vendor_url = vendor_url
         self.headless = headless
         self.log_file_path = log_file_path
         self.target_vendor_only = target_vendor_only
         self.in_stock_only = in_stock_only
+        self.cache = cache
+        self.force_refresh = force_refresh
 
         self.vendor_name = self.vendor_url.split('/')[-1]
         self.logger = set_up_logger(self.vendor_name, self.log_file_path)
+        self.pacer = pacer or AdaptiveController(
+            max_concurrency=max_concurrency, initial_concurrency=max_concurrency, logger=self.logger
+        )
+        self.retry_policy = retry_policy or RetryPolicy(
+            attempts=retry_attempts, breaker=CircuitBreaker(logger=self.logger)
+        )
         self.subcat_url_info = []
+        self.visited_urls = set()
+        self.collected_urls = set()
+        self.failed_urls = []
+        self.page_pool = None
+        self.work_queue = None
+        self.request_blocker = RequestBlocker(network_profile)
         self.selectors = {
             'cookie_ok': 'div.cookie-wrapper a.secondary.button',
             'in-stock': '[data-testid="filter--2-option-5"]',
@@ -27,11 +48,25 @@ class VendorSubCategoryCrawler:
             'product_count_remaining': '[data-testid="product-count-remaining"]',
         }
 
+    def cache_flags(self):
+        return {'in_stock_only': self.in_stock_only, 'target_vendor_only': self.target_vendor_only}
+
     async def crawl(self):
+        if self.cache is not None and not self.force_refresh:
+            cached_info = self.cache.get(self.vendor_url, **self.cache_flags())
+            if cached_info is not None:
+                self.subcat_url_info = cached_info
+                self.logger.info(f'Loaded {len(cached_info)} subcategory URLs from discovery cache. ')
+                return [item['url'] for item in self.subcat_url_info]
+
         self.subcat_url_info = []
+        self.visited_urls = set()
+        self.collected_urls = set()
+        self.failed_urls = []
         async with async_playwright() as playwright:
             browser = await playwright.chromium.launch(headless=self.headless)
             context = await browser.new_context()
+            await self.request_blocker.attach(context)
             page = await context.new_page()
             await page.set_viewport_size({'width': 1920, 'height': 1080})
             await page.goto(self.vendor_url)
@@ -40,91 +75,155 @@ class VendorSubCategoryCrawler:
             cat_urls = [await el.get_attribute('href') for el in cat_elems]
             cat_urls = [urljoin(self.vendor_url, url) for url in cat_urls]
 
-            subcat_urls = []
+            self.page_pool = asyncio.Queue()
+            self.page_pool.put_nowait(page)
+            for _ in range(self.pacer.max_concurrency - 1):
+                worker_page = await context.new_page()
+                await worker_page.set_viewport_size({'width': 1920, 'height': 1080})
+                self.page_pool.put_nowait(worker_page)
+
+            self.work_queue = WorkQueue(
+                self.parse_url,
+                name=f'{self.vendor_name}_discovery_queue',
+                logger=self.logger,
+                controller=self.pacer,
+            )
             for url in cat_urls:
-                subcat_urls += await self.parse_subcat(page, url)
-            random.shuffle(subcat_urls)
+                self.enqueue(url)
+            await self.work_queue.run()
 
             await context.close()
             await browser.close()
+            self.logger.info(f'Network traffic: {self.request_blocker.stats_msg()}')
+            self.logger.info(f'Retries: {jsonify(self.retry_policy.stats())}')
             self.subcat_url_info = sorted(self.subcat_url_info, key=lambda item: item['product_count'], reverse=True)
+            self.cache_result()
             sorted_subcat_urls = [item['url'] for item in self.subcat_url_info]
             return sorted_subcat_urls
 
-    async def parse_subcat(self, page: Page, cat_url):
+    def cache_result(self):
+        if len(self.failed_urls) > 0:
+            # subcategories below the failed nodes are missing, a cached result would hide them until it expires
+            self.logger.warning(f'{len(self.failed_urls)} category nodes failed, discovery result not cached. ')
+        elif self.cache is not None:
+            self.cache.set(self.vendor_url, self.subcat_url_info, **self.cache_flags())
+
+    def enqueue(self, url):
+        if url in self.visited_urls:
+            return
+        self.visited_urls.add(url)
+        self.work_queue.put(url)
+
+    async def parse_url(self, url):
+        page = await self.page_pool.get()
         try:
-            await page.goto(cat_url)
-            cur_url = page.url
-
-            processing_msg = {
-                'url': cur_url,
-                'action': 'processing'
+            sub_urls = await self.parse_subcat(page=page, cat_url=url)
+        except Exception as ex:
+            error_msg = {
+                'url': url,
+                'action': 'ignored',
+                'reason': f'{ex!r} after retries. ',
             }
-            self.logger.info(jsonify(processing_msg))
-
-            await asyncio.sleep(1)
-            final_subcat_urls = []
-            if 'filter' in cur_url:
-                min_qty = await page.text_content('[data-atag="tr-minQty"] > span > div:last-child')
-                if min_qty == 'Non-Stock' and self.in_stock_only:
-                    ignored_msg = {
-                        'url': cur_url,
-                        'action': 'ignored',
-                        'reason': f'All products are non-stock in this subcategory for {self.vendor_name}.'
-                    }
-                    self.logger.info(jsonify(ignored_msg))
-                    return []
-                else:
-                    if not self.target_vendor_only:
-                        # remove query string to select all vendors for the subcategory
-                        cur_url = remove_url_qs(cur_url)
-                        await page.goto(cur_url)
-
-                    if self.in_stock_only:
-                        await page.click(self.selectors['in-stock'])
-                        product_count_remaining = await page.text_content(self.selectors['product_count_remaining'])
-                        product_count_remaining = parse_int(product_count_remaining)
-
-                        if product_count_remaining <= 1:
-                            await page.click(self.selectors['in-stock'])
-                        else:
-                            await page.click(self.selectors['apply-all'])
-                            await page.wait_for_selector(self.selectors['remove-filters'])
-                            self.logger.info('Select only in-stock items. ')
-
-                    product_count = await page.text_content(self.selectors['product-count'])
-                    product_count = parse_int(product_count)
-                    url_info = {'url': cur_url, 'product_count': product_count}
-                    self.subcat_url_info.append(url_info)
-                    self.logger.info(f'Collected {jsonify(url_info)}')
-                    return final_subcat_urls
-
-            elif 'products/detail' in cur_url:
+            self.logger.error(jsonify(error_msg))
+            self.failed_urls.append(url)
+            return
+        finally:
+            self.page_pool.put_nowait(page)
+
+        for sub_url in sub_urls:
+            self.enqueue(sub_url)
+
+    async def paced_goto(self, page: Page, url):
+        """
+        Navigate to url and feed the latency of the navigation alone to the pacer.
+        The pause and the clicks of a tree node are left out, otherwise every rise in delay
+        would raise the measured latency and the pacer could never recover.
+        """
+        start_time = time.perf_counter()
+        try:
+            await page.goto(url)
+        except Exception:
+            self.pacer.record(time.perf_counter() - start_time, ok=False)
+            raise
+        self.pacer.record(time.perf_counter() - start_time, ok=True)
+
+    @retry_on_exception(attempts=3, delay=2.0)
+    async def parse_subcat(self, page: Page, cat_url):
+        """
+        Parse one node of the category tree, returns the URLs of its child nodes.
+        """
+        await self.paced_goto(page, cat_url)
+        cur_url = page.url
+
+        processing_msg = {
+            'url': cur_url,
+            'action': 'processing'
+        }
+        self.logger.info(jsonify(processing_msg))
+
+        await self.pacer.pause()
+        if 'filter' in cur_url:
+            min_qty = await page.text_content('[data-atag="tr-minQty"] > span > div:last-child')
+            if min_qty == 'Non-Stock' and self.in_stock_only:
                 ignored_msg = {
                     'url': cur_url,
                     'action': 'ignored',
-                    'reason': f"Current URL is a product detail page. "
+                    'reason': f'All products are non-stock in this subcategory for {self.vendor_name}.'
                 }
                 self.logger.info(jsonify(ignored_msg))
                 return []
-            else:
-                subcat_elems = await page.query_selector_all('[data-testid="subcategories-items"]')
-                subcat_urls = [urljoin(self.vendor_url, await el.get_attribute('href'))
-                               for el in subcat_elems]
 
-                further_processing_msg = {
-                    'url': cur_url,
-                    'action': 'Further processing of sub urls. ',
-                    'sub_urls': subcat_urls,
-                }
-                self.logger.info(jsonify(further_processing_msg))
-                for url in subcat_urls:
-                    urls = await self.parse_subcat(page, url)
-                    final_subcat_urls += urls
-                return final_subcat_urls
-
-        except TimeoutError:
-            retry_delay = 10
-            self.logger.error(f'TimeoutError, retry in {retry_delay}s. ')
-            await asyncio.sleep(retry_delay)
-            return self.parse_subcat(page, cat_url)
+            if not self.target_vendor_only:
+                # remove query string to select all vendors for the subcategory
+                cur_url = remove_url_qs(cur_url)
+
+            # several tree nodes can lead to the same subcategory
+            if cur_url in self.collected_urls:
+                self.logger.info(jsonify({'url': cur_url, 'action': 'ignored', 'reason': 'Already collected. '}))
+                return []
+
+            if not self.target_vendor_only:
+                await page.goto(cur_url)
+
+            if self.in_stock_only:
+                await page.click(self.selectors['in-stock'])
+                product_count_remaining = await page.text_content(self.selectors['product_count_remaining'])
+                product_count_remaining = parse_int(product_count_remaining)
+
+                if product_count_remaining <= 1:
+                    await page.click(self.selectors['in-stock'])
+                else:
+                    await page.click(self.selectors['apply-all'])
+                    await page.wait_for_selector(self.selectors['remove-filters'])
+                    self.logger.info('Select only in-stock items. ')
+
+            product_count = await page.text_content(self.selectors['product-count'])
+            product_count = parse_int(product_count)
+            url_info = {'url': cur_url, 'product_count': product_count}
+            if cur_url in self.collected_urls:
+                return []
+            self.collected_urls.add(cur_url)
+            self.subcat_url_info.append(url_info)
+            self.logger.info(f'Collected {jsonify(url_info)}')
+            return []
+
+        elif 'products/detail' in cur_url:
+            ignored_msg = {
+                'url': cur_url,
+                'action': 'ignored',
+                'reason': f"Current URL is a product detail page. "
+            }
+            self.logger.info(jsonify(ignored_msg))
+            return []
+        else:
+            subcat_elems = await page.query_selector_all('[data-testid="subcategories-items"]')
+            subcat_urls = [urljoin(self.vendor_url, await el.get_attribute('href'))
+                           for el in subcat_elems]
+
+            further_processing_msg = {
+                'url': cur_url,
+                'action': 'Further processing of sub urls. ',
+                'sub_urls': subcat_urls,
+            }
+            self.logger.info(jsonify(further_processing_msg))
+            return subcat_urls
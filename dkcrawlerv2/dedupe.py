@@ -0,0 +1,88 @@
+from dkcrawlerv2.postprocess import check_dedupe_policy
+
+
+class PartDeduplicator:
+    """
+    Tracks DigiKey part numbers of the pages of a session as they are downloaded.
+    Every part number maps to a small integer id of the page that owns it: the first page it was seen on
+    with keep='first', the latest one with keep='latest'.
+    A page whose parts all belong to other pages of the same subcategory is most likely the site
+    re-serving a page, it is flagged for re-fetching and takes none of them.
+    """
+
+    def __init__(self, keep='first'):
+        check_dedupe_policy(keep)
+        self.keep = keep
+        self.seen = {}
+        self.pages = []
+        self.page_ids = {}
+        # rows, duplicates and cross-subcategory duplicates of every page id, replaced when a page is re-fetched
+        self.page_counts = {}
+        self.counts = {}
+
+    def page_id(self, subcategory, page_num):
+        key = (subcategory, page_num)
+        if key not in self.page_ids:
+            self.page_ids[key] = len(self.pages)
+            self.pages.append(key)
+        return self.page_ids[key]
+
+    def subcategory_counts(self, subcategory):
+        if subcategory not in self.counts:
+            self.counts[subcategory] = {
+                'rows': 0,
+                'duplicates': 0,
+                'cross_subcategory_duplicates': 0,
+                'duplicate_pages': [],
+            }
+        return self.counts[subcategory]
+
+    def add_page(self, subcategory, page_num, part_numbers):
+        """
+        Record the part numbers of a page, returns whether the page only repeats parts of its own subcategory.
+        """
+        page_id = self.page_id(subcategory, page_num)
+        counts = self.subcategory_counts(subcategory)
+        if page_id in self.page_counts:
+            # a re-fetched page gives up the parts of its previous download
+            for part_number in [p for p, owner_id in self.seen.items() if owner_id == page_id]:
+                del self.seen[part_number]
+
+        owner_ids = [self.seen.get(part_number) for part_number in part_numbers]
+        duplicates = 0
+        cross_subcategory_duplicates = 0
+        for owner_id in owner_ids:
+            if owner_id is None:
+                continue
+            duplicates += 1
+            if self.pages[owner_id][0] != subcategory:
+                cross_subcategory_duplicates += 1
+        is_duplicate_page = len(part_numbers) > 0 and duplicates - cross_subcategory_duplicates == len(part_numbers)
+        for part_number, owner_id in zip(part_numbers, owner_ids):
+            # a re-served page takes no parts from the page it repeats
+            if owner_id is None or (self.keep == 'latest' and not is_duplicate_page):
+                self.seen[part_number] = page_id
+
+        page_counts = {
+            'rows': len(part_numbers),
+            'duplicates': duplicates,
+            'cross_subcategory_duplicates': cross_subcategory_duplicates,
+        }
+        previous_counts = self.page_counts.get(page_id, {})
+        self.page_counts[page_id] = page_counts
+        for name, count in page_counts.items():
+            counts[name] += count - previous_counts.get(name, 0)
+        if is_duplicate_page and page_num not in counts['duplicate_pages']:
+            counts['duplicate_pages'].append(page_num)
+        elif not is_duplicate_page and page_num in counts['duplicate_pages']:
+            # re-fetched page came back right
+            counts['duplicate_pages'].remove(page_num)
+        return is_duplicate_page
+
+    def report(self):
+        return {
+            'unique_parts': len(self.seen),
+            'subcategories': {
+                subcategory: counts for subcategory, counts in self.counts.items() if counts['duplicates'] > 0
+            },
+        }
@@ -0,0 +1,111 @@
+import json
+from playwright.async_api import Page, Request, BrowserContext
+from dkcrawlerv2.utils import update_url_qs
+
+# set by the HTTP client itself, or sent from the context's cookie jar
+SKIPPED_HEADERS = ('cookie', 'content-length', 'host', 'connection', 'accept-encoding')
+
+
+class DirectDownloadError(Exception):
+    pass
+
+
+class DownloadTemplate:
+    """
+    The request behind the download table button, replayable for any page number of the configured listing.
+    """
+
+    def __init__(self, method: str, url: str, headers: dict = None, post_data: str = None, page_param='page'):
+        self.method = method
+        self.url = url
+        self.headers = {
+            key: value for key, value in (headers or {}).items()
+            if key.lower() not in SKIPPED_HEADERS and not key.startswith(':')
+        }
+        self.post_data = post_data
+        self.page_param = page_param
+
+    @classmethod
+    async def from_request(cls, request: Request):
+        headers = await request.all_headers()
+        return cls(request.method, request.url, headers, request.post_data)
+
+    def for_page(self, page_num: int):
+        """
+        URL and body of the request for page_num.
+        """
+        url = update_url_qs(self.url, **{self.page_param: page_num})
+        post_data = self.post_data
+        if post_data:
+            try:
+                body = json.loads(post_data)
+            except ValueError:
+                body = None
+            if isinstance(body, dict) and self.page_param in body:
+                body[self.page_param] = page_num
+                post_data = json.dumps(body)
+        return url, post_data
+
+    def to_dict(self):
+        return {'method': self.method, 'url': self.url, 'page_param': self.page_param}
+
+
+class DownloadRequestRecorder:
+    """
+    Records the requests a page sends while the download button is clicked, to find the one behind the download.
+    """
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.requests = []
+
+    def on_request(self, request: Request):
+        self.requests.append(request)
+
+    # Playwright marks its handlers with an attribute, which builtins like list.append can't take
+    def __enter__(self):
+        self.page.on('request', self.on_request)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.page.remove_listener('request', self.on_request)
+
+    async def template(self, download_url: str):
+        for request in reversed(self.requests):
+            if request.url == download_url:
+                return await DownloadTemplate.from_request(request)
+        return DownloadTemplate('GET', download_url)
+
+
+class DirectDownloader:
+    """
+    Replays a captured download request through the context's HTTP client, which shares the cookies of the
+    configured browser session and keeps connections alive between pages.
+    """
+
+    def __init__(self, context: BrowserContext, template: DownloadTemplate, timeout=60 * 1000):
+        self.context = context
+        self.template = template
+        self.timeout = timeout
+
+    async def fetch(self, page_num: int, file_path: str):
+        url, post_data = self.template.for_page(page_num)
+        response = await self.context.request.fetch(
+            url, method=self.template.method, headers=self.template.headers, data=post_data,
+            timeout=self.timeout,
+        )
+        try:
+            if not response.ok:
+                raise DirectDownloadError(f'HTTP {response.status} for page {page_num}')
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' in content_type:
+                raise DirectDownloadError(f'Got an HTML page instead of a table for page {page_num}')
+            body = await response.body()
+            if len(body) == 0:
+                raise DirectDownloadError(f'Empty table for page {page_num}')
+        finally:
+            await response.dispose()
+
+        with open(file_path, 'wb') as f:
+            f.write(body)
+        return file_path
@@ -0,0 +1,115 @@
+import json
+import time
+import functools
+import logging
+from contextlib import contextmanager
+from dkcrawlerv2.utils import set_up_logger, jsonify
+
+
+class MetricsRecorder:
+    """
+    Per-step timings and counters of a crawl session, written as JSON lines through a queue-backed logger.
+    Without metrics_file_path the metrics are only kept in memory for the summary.
+    """
+
+    def __init__(self, metrics_file_path=None, name='metrics'):
+        self.metrics_file_path = metrics_file_path
+        self.step_durations = {}
+        self.counters = {}
+        self.subcategories = {}
+        self.json_logger = None
+        if self.metrics_file_path is not None:
+            self.json_logger = set_up_logger(
+                f'{name}_jsonl', self.metrics_file_path, append=True,
+                formatter=logging.Formatter('%(message)s'), console=False,
+            )
+
+    def record(self, event: str, **fields):
+        if self.json_logger is not None:
+            self.json_logger.info(json.dumps({'time': time.time(), 'event': event, **fields}))
+
+    @contextmanager
+    def timed(self, step: str, **fields):
+        start_time = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            self.step_durations.setdefault(step, []).append(duration)
+            self.record('step', step=step, seconds=round(duration, 3), ok=ok, **fields)
+
+    def count(self, counter: str, value=1, **fields):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+        self.record('count', counter=counter, value=value, **fields)
+
+    def subcategory_started(self, subcategory: str):
+        self.subcategories[subcategory] = {'start_time': time.time(), 'end_time': None, 'pages': 0, 'bytes': 0}
+
+    def page_downloaded(self, subcategory: str, page_num: int, byte_count: int):
+        stats = self.subcategories.setdefault(
+            subcategory, {'start_time': time.time(), 'end_time': None, 'pages': 0, 'bytes': 0}
+        )
+        stats['pages'] += 1
+        stats['bytes'] += byte_count
+        self.count('bytes_downloaded', byte_count, subcategory=subcategory, page=page_num)
+
+    def subcategory_finished(self, subcategory: str):
+        if subcategory in self.subcategories:
+            self.subcategories[subcategory]['end_time'] = time.time()
+
+    def summary(self):
+        steps = {}
+        for step, durations in self.step_durations.items():
+            sorted_durations = sorted(durations)
+            steps[step] = {
+                'count': len(durations),
+                'total_seconds': round(sum(durations), 3),
+                'avg_seconds': round(sum(durations) / len(durations), 3),
+                'p95_seconds': round(sorted_durations[int(0.95 * (len(durations) - 1))], 3),
+                'max_seconds': round(sorted_durations[-1], 3),
+            }
+
+        subcategories = {}
+        for subcategory, stats in self.subcategories.items():
+            elapsed = (stats['end_time'] or time.time()) - stats['start_time']
+            subcategories[subcategory] = {
+                'pages': stats['pages'],
+                'bytes': stats['bytes'],
+                'elapsed_seconds': round(elapsed, 1),
+                'pages_per_minute': round(stats['pages'] / elapsed * 60, 2) if elapsed > 0 else None,
+            }
+        return {'steps': steps, 'counters': self.counters, 'subcategories': subcategories}
+
+    def write_summary(self):
+        summary = self.summary()
+        self.record('summary', **summary)
+        return jsonify(summary)
+
+
+def timed_step(step: str, paced=False):
+    """
+    Decorator for timing a crawler coroutine method with the crawler's MetricsRecorder.
+    The latency of paced steps is also fed to the crawler's pacer when it has one, only steps costing about
+    one request should be paced, so that the pacer compares like with like against its target latency.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            start_time = time.perf_counter()
+            ok = False
+            try:
+                with self.metrics.timed(step, subcategory=self.job_key):
+                    result = await func(self, *args, **kwargs)
+                ok = True
+                return result
+            finally:
+                pacer = getattr(self, 'pacer', None) if paced else None
+                if pacer is not None:
+                    pacer.record(time.perf_counter() - start_time, ok)
+        return wrapper
+    return decorator
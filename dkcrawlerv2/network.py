@@ -0,0 +1,105 @@
+from urllib.parse import urlsplit
+from playwright.async_api import BrowserContext, Route, Response
+from dkcrawlerv2.utils import jsonify
+
+
+def host_matches(host, domains):
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class NetworkProfile:
+    """
+    Allow and deny rules for requests made by crawler pages. Allow rules win over deny rules.
+    """
+
+    def __init__(self, blocked_resource_types=(), blocked_domains=(),
+                 allowed_resource_types=(), allowed_domains=()):
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.blocked_domains = set(blocked_domains)
+        self.allowed_resource_types = set(allowed_resource_types)
+        self.allowed_domains = set(allowed_domains)
+
+    def should_block(self, resource_type: str, url: str):
+        host = urlsplit(url).hostname or ''
+        if resource_type in self.allowed_resource_types or host_matches(host, self.allowed_domains):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        return host_matches(host, self.blocked_domains)
+
+    def to_dict(self):
+        return {
+            'blocked_resource_types': sorted(self.blocked_resource_types),
+            'blocked_domains': sorted(self.blocked_domains),
+            'allowed_resource_types': sorted(self.allowed_resource_types),
+            'allowed_domains': sorted(self.allowed_domains),
+        }
+
+
+# images, fonts, media and third-party tracking are never used by the crawlers,
+# stylesheets and first-party scripts are kept since the product table depends on them.
+# Consent vendors such as onetrust.com and cookielaw.org are kept too, the cookie banner that dismiss_popups
+# answers, and whose answer is saved with the storage state, may be rendered by their scripts
+DEFAULT_PROFILE = NetworkProfile(
+    blocked_resource_types=['image', 'media', 'font'],
+    blocked_domains=[
+        'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+        'googlesyndication.com', 'facebook.net', 'facebook.com', 'bing.com', 'linkedin.com',
+        'licdn.com', 'hotjar.com', 'demdex.net', 'omtrdc.net', 'adobedtm.com', 'everesttech.net',
+        'criteo.com', 'criteo.net', 'twitter.com', 'ads-twitter.com', 'quantserve.com',
+        'qualtrics.com', 'clarity.ms', 'bizible.com',
+    ],
+    allowed_resource_types=['document'],
+)
+
+# no filtering, same traffic as a regular browser
+NO_BLOCKING_PROFILE = NetworkProfile()
+
+
+class RequestBlocker:
+    """
+    Request interception layer shared by all crawlers, counts blocked requests and allowed response bytes.
+    Bytes of blocked requests are never transferred, so only their count is known.
+    """
+
+    def __init__(self, profile: NetworkProfile = DEFAULT_PROFILE):
+        self.profile = profile
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.blocked_by_domain = {}
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+
+    async def attach(self, context: BrowserContext):
+        await context.route('**/*', self.handle_route)
+        context.on('response', self.handle_response)
+
+    async def handle_route(self, route: Route):
+        request = route.request
+        if self.profile.should_block(request.resource_type, request.url):
+            host = urlsplit(request.url).hostname or ''
+            self.blocked_requests += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            self.blocked_by_domain[host] = self.blocked_by_domain.get(host, 0) + 1
+            await route.abort('blockedbyclient')
+        else:
+            self.allowed_requests += 1
+            await route.continue_()
+
+    def handle_response(self, response: Response):
+        content_length = response.headers.get('content-length')
+        if content_length is not None and content_length.isdigit():
+            self.allowed_bytes += int(content_length)
+
+    def stats(self):
+        top_domains = sorted(self.blocked_by_domain.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            'blocked_requests': self.blocked_requests,
+            'blocked_by_type': self.blocked_by_type,
+            'blocked_top_domains': dict(top_domains),
+            'allowed_requests': self.allowed_requests,
+            'allowed_bytes': self.allowed_bytes,
+        }
+
+    def stats_msg(self):
+        return jsonify(self.stats())
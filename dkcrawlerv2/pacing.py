@@ -0,0 +1,99 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dkcrawlerv2.utils import set_up_logger, jsonify
+
+
+class AdaptiveController:
+    """
+    Adapts concurrency and inter-request delay to the observed latency and error rate of the site.
+    Additive increase while the site is responsive, multiplicative decrease when it slows down or fails.
+    Shared by the runner and the discovery crawlers so that they back off together.
+    """
+
+    def __init__(self, min_concurrency=1, max_concurrency=6, initial_concurrency=3,
+                 min_delay=0.2, max_delay=10.0, initial_delay=1.0,
+                 target_latency=5.0, max_error_rate=0.1, window=20, logger=None):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(max(initial_concurrency, min_concurrency), max_concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min(max(initial_delay, min_delay), max_delay)
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.logger = logger or set_up_logger(self.__class__.__name__)
+
+        self.samples = deque(maxlen=window)
+        self.samples_since_adjust = 0
+        self.active = 0
+        self.condition = None
+
+    def record(self, latency: float, ok: bool = True):
+        self.samples.append((latency, ok))
+        self.samples_since_adjust += 1
+        if self.samples_since_adjust >= self.window // 2 and len(self.samples) >= self.window // 2:
+            self.adjust()
+
+    def adjust(self):
+        self.samples_since_adjust = 0
+        latencies = [latency for latency, ok in self.samples if ok]
+        error_rate = sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+        avg_latency = sum(latencies) / len(latencies) if len(latencies) > 0 else None
+
+        old_concurrency, old_delay = self.concurrency, self.delay
+        if error_rate > self.max_error_rate or avg_latency is None or avg_latency > 2 * self.target_latency:
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self.delay = min(self.max_delay, self.delay * 2)
+        elif error_rate == 0 and avg_latency < self.target_latency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.delay = max(self.min_delay, self.delay * 0.75)
+
+        if self.concurrency > old_concurrency:
+            self.wake_waiters()
+        if (old_concurrency, old_delay) != (self.concurrency, self.delay):
+            adjust_msg = {
+                'error_rate': round(error_rate, 3),
+                'avg_latency': round(avg_latency, 3) if avg_latency is not None else None,
+                'concurrency': self.concurrency,
+                'delay': round(self.delay, 3),
+            }
+            self.logger.info(f'Adjusted pacing: {jsonify(adjust_msg)}')
+
+    def wake_waiters(self):
+        # tasks waiting in acquire would otherwise only see the new slots once a running task releases one
+        if self.condition is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.notify_waiters())
+
+    async def notify_waiters(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+    async def pause(self):
+        await asyncio.sleep(self.delay)
+
+    async def acquire(self):
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.concurrency)
+            self.active += 1
+
+    async def release(self):
+        async with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
@@ -0,0 +1,304 @@
+import os
+import pandas as pd
+from pandas.errors import EmptyDataError
+from dkcrawlerv2.utils import get_file_list, concat_data, read_data
+from dkcrawlerv2.streaming import read_header, iter_chunks, XlsxStreamWriter, ParquetStreamWriter
+from dkcrawlerv2.schema import numeric_columns, normalize_numeric, STOCK
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+OUTPUT_FORMATS = ('xlsx', 'parquet')
+
+# header of the DigiKey part number column differs between versions of the table download
+DK_PART_COLUMNS = ['DK Part #', 'Digi-Key Part Number', 'DigiKey Part #', 'Digi-Key Part #']
+MFR_PART_COLUMNS = ['Mfr Part #', 'Manufacturer Part Number', 'Mfr. Part #']
+MANUFACTURER_COLUMNS = ['Manufacturer', 'Mfr']
+
+MISALIGNED_ALERT = 'ALERT!\n{} rows have misaligned columns that could not be realigned.\n' \
+                   'Their numeric values are left empty, check the downloaded pages. '
+
+# few distinct values repeated over many rows, stored as categories by the chunked combine
+CATEGORICAL_COLUMNS = ['Manufacturer', 'Mfr', 'Packaging', 'Series', 'Product Status', 'Subcategory']
+
+# which row of a duplicated part survives: the one downloaded first or latest
+DEDUPE_POLICIES = ('first', 'latest')
+
+
+def find_column(df, candidates):
+    for column in candidates:
+        if column in df.columns:
+            return column
+    raise KeyError(f'None of the columns {candidates} found in data. ')
+
+
+def check_output_formats(output_formats):
+    for output_format in output_formats:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f'Unknown output format "{output_format}", choose from {OUTPUT_FORMATS}. ')
+    if 'parquet' in output_formats and pyarrow is None:
+        raise ImportError('pyarrow is required for parquet output, install it with "pip install pyarrow". ')
+
+
+def check_dedupe_policy(dedupe):
+    if dedupe is not None and dedupe not in DEDUPE_POLICIES:
+        raise ValueError(f'Unknown dedupe policy "{dedupe}", choose from {DEDUPE_POLICIES}. ')
+
+
+def get_part_numbers(df):
+    return df[find_column(df, DK_PART_COLUMNS)].astype(str).tolist()
+
+
+def drop_duplicate_parts(df, dedupe):
+    """
+    Drop repeated DigiKey part numbers, rows are expected in download order. Returns the data and the dropped count.
+    """
+    if dedupe is None or len(df) == 0:
+        return df, 0
+    part_col = find_column(df, DK_PART_COLUMNS)
+    deduped_df = df.drop_duplicates(subset=part_col, keep='first' if dedupe == 'first' else 'last')
+    return deduped_df, len(df) - len(deduped_df)
+
+
+def infer_schema(in_files, extra_columns=()):
+    """
+    Union of the columns of all files in order of appearance, from their headers only.
+    """
+    columns = []
+    for file in in_files:
+        try:
+            header = read_header(file)
+        except EmptyDataError:
+            continue
+        columns.extend(column for column in header if column not in columns)
+    columns.extend(column for column in extra_columns if column not in columns)
+    return columns
+
+
+def parse_numeric(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+
+def normalize_chunk(df, columns):
+    """
+    Align a chunk to the schema: numeric, categorical or string columns.
+    """
+    df = df.reindex(columns=columns)
+    numeric_specs = numeric_columns(columns)
+    for column in columns:
+        series = df[column]
+        if column in numeric_specs:
+            df[column] = parse_numeric(series).astype(numeric_specs[column].dtype)
+        else:
+            series = series.where(series.isna(), series.astype(str))
+            df[column] = series.astype('category') if column in CATEGORICAL_COLUMNS else series
+    return df
+
+
+def open_stream_writer(out_path, columns, index=False):
+    if out_path.endswith('.parquet'):
+        numeric_specs = numeric_columns(columns)
+        return ParquetStreamWriter(
+            out_path, columns, CATEGORICAL_COLUMNS,
+            numeric_columns=[column for column, spec in numeric_specs.items() if not spec.integer],
+            integer_columns=[column for column, spec in numeric_specs.items() if spec.integer],
+        )
+    return XlsxStreamWriter(out_path, columns, index=index)
+
+
+def combine_chunked(in_files, out_paths, dedupe=None, chunk_size=50000, extra_columns=None, index=False):
+    """
+    Stream in_files in chunks of about chunk_size rows to every path of out_paths, so that memory is bounded
+    by the chunk size. extra_columns are set to a constant on every row.
+    With dedupe='latest', files are read newest first, so the output is in reverse download order.
+    """
+    extra_columns = extra_columns or {}
+    if dedupe == 'latest':
+        in_files = in_files[::-1]
+    columns = infer_schema(in_files, extra_columns.keys())
+    part_col = find_column(pd.DataFrame(columns=columns), DK_PART_COLUMNS) if dedupe is not None else None
+    writers = [open_stream_writer(out_path, columns, index) for out_path in out_paths]
+    seen_parts = set()
+    row_count = 0
+    duplicate_count = 0
+    realigned_rows = 0
+    misaligned_rows = 0
+    try:
+        for chunk in iter_chunks(in_files, chunk_size):
+            chunk, normalize_report = normalize_numeric(chunk)
+            realigned_rows += normalize_report['realigned_rows']
+            misaligned_rows += normalize_report['misaligned_rows']
+            for column, value in extra_columns.items():
+                chunk[column] = value
+            chunk = normalize_chunk(chunk, columns)
+            if part_col is not None:
+                keep = ~chunk[part_col].isin(seen_parts) & ~chunk[part_col].duplicated()
+                seen_parts.update(chunk.loc[keep, part_col])
+                duplicate_count += int((~keep).sum())
+                chunk = chunk[keep]
+            for writer in writers:
+                writer.write(chunk)
+            row_count += len(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    return {
+        'columns': columns,
+        'row_count': row_count,
+        'duplicate_count': duplicate_count,
+        'realigned_rows': realigned_rows,
+        'misaligned_rows': misaligned_rows,
+    }
+
+
+def write_parquet(df, out_path):
+    # mixed-type object columns can't be converted to arrow, keep them as strings
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    df.to_parquet(out_path, index=False)
+
+
+def write_xlsx(df, out_path, index=False):
+    """
+    Stream df to a write-only workbook, split across sheets at the Excel row limit.
+    """
+    writer = XlsxStreamWriter(out_path, df.columns, index=index)
+    try:
+        writer.write(df)
+    finally:
+        writer.close()
+
+
+def write_data(df, out_path, index=False):
+    if out_path.endswith('.parquet'):
+        write_parquet(df, out_path)
+    else:
+        write_xlsx(df, out_path, index=index)
+
+
+def combine_pages(download_dir: str, subcategory: str, output_formats=('xlsx',), dedupe=None, chunk_size=None):
+    """
+    Combine downloaded pages of a subcategory into {subcategory}_all.{format} for each output format.
+    Stock, price and quantity columns are parsed to numbers by the schema, realigning shifted rows.
+    With dedupe, only the first or latest downloaded row of every DigiKey part number is kept.
+    With chunk_size, pages are streamed to the outputs instead of combined in memory.
+    Module level and free of loggers so that it can run in a process pool, returns a report for the caller to log.
+    """
+    in_files = sorted(get_file_list(download_dir, suffix='.csv'), key=os.path.getmtime)
+    alerts = []
+    if chunk_size is not None:
+        out_paths = {
+            output_format: os.path.realpath(os.path.join(download_dir, f'{subcategory}_all.{output_format}'))
+            for output_format in output_formats
+        }
+        report = combine_chunked(
+            in_files, out_paths.values(), dedupe, chunk_size, extra_columns={'Subcategory': subcategory}
+        )
+        if report['misaligned_rows'] > 0:
+            alerts.append(MISALIGNED_ALERT.format(report['misaligned_rows']))
+        return {
+            'out_paths': out_paths,
+            'row_count': report['row_count'],
+            'duplicate_count': report['duplicate_count'],
+            'realigned_rows': report['realigned_rows'],
+            'alerts': alerts,
+        }
+
+    combined_df = concat_data(in_files, join='outer')
+    combined_df, duplicate_count = drop_duplicate_parts(combined_df, dedupe)
+    combined_df, normalize_report = normalize_numeric(combined_df)
+    if normalize_report['misaligned_rows'] > 0:
+        alerts.append(MISALIGNED_ALERT.format(normalize_report['misaligned_rows']))
+    combined_df['Subcategory'] = subcategory
+
+    out_paths = {}
+    for output_format in output_formats:
+        out_path = os.path.join(download_dir, f'{subcategory}_all.{output_format}')
+        out_path = os.path.realpath(out_path)
+        write_data(combined_df, out_path)
+        out_paths[output_format] = out_path
+    return {
+        'out_paths': out_paths,
+        'row_count': len(combined_df),
+        'duplicate_count': duplicate_count,
+        'realigned_rows': normalize_report['realigned_rows'],
+        'alerts': alerts,
+    }
+
+
+def combine_subcategories(download_dir: str, output_formats=('xlsx',), dedupe=None, chunk_size=None):
+    """
+    Combine {subcategory}_all files of a session into combine.{format}, with the union of all columns.
+    Reads the parquet files when available since they load much faster than Excel, in chunks with chunk_size.
+    With dedupe, parts listed in several subcategories are kept once.
+    """
+    input_format = 'parquet' if 'parquet' in output_formats else 'xlsx'
+    in_files = sorted(get_file_list(download_dir, suffix=f'all.{input_format}'), key=os.path.getmtime)
+    if chunk_size is not None:
+        out_paths = {
+            output_format: os.path.realpath(os.path.join(download_dir, f'combine.{output_format}'))
+            for output_format in output_formats
+        }
+        report = combine_chunked(in_files, out_paths.values(), dedupe, chunk_size, index=True)
+        return {
+            'out_paths': out_paths,
+            'row_count': report['row_count'],
+            'column_count': len(report['columns']),
+            'duplicate_count': report['duplicate_count'],
+        }
+    df = concat_data(in_files, join='outer')
+    df, duplicate_count = drop_duplicate_parts(df, dedupe)
+    out_paths = {}
+    for output_format in output_formats:
+        out_path = os.path.realpath(os.path.join(download_dir, f'combine.{output_format}'))
+        write_data(df, out_path, index=True)
+        out_paths[output_format] = out_path
+    return {
+        'out_paths': out_paths,
+        'row_count': len(df),
+        'column_count': len(df.columns),
+        'duplicate_count': duplicate_count,
+    }
+
+
+def diff_parts(new_path: str, old_path: str, out_path: str):
+    """
+    Per-part diff of two combined subcategory files, keyed by DigiKey part number.
+    Writes added, removed and stock-changed rows to one sheet each of out_path.
+    """
+    new_df = read_data(new_path)
+    old_df = read_data(old_path)
+    part_col = find_column(new_df, DK_PART_COLUMNS)
+    old_part_col = find_column(old_df, DK_PART_COLUMNS)
+    stock_col = find_column(new_df, STOCK.names)
+    old_stock_col = find_column(old_df, STOCK.names)
+    old_df = old_df.rename(columns={old_part_col: part_col, old_stock_col: stock_col})
+
+    added_df = new_df[~new_df[part_col].isin(old_df[part_col])]
+    removed_df = old_df[~old_df[part_col].isin(new_df[part_col])]
+    merged_df = new_df.merge(
+        old_df[[part_col, stock_col]], on=part_col, how='inner', suffixes=('', ' Previous')
+    )
+    stock_changed = merged_df[stock_col].fillna(-1) != merged_df[f'{stock_col} Previous'].fillna(-1)
+    stock_changed_df = merged_df[stock_changed]
+
+    writer = XlsxStreamWriter(out_path, added_df.columns, sheet_name='Added')
+    try:
+        writer.write(added_df)
+        writer.start_table(removed_df.columns, 'Removed')
+        writer.write(removed_df)
+        writer.start_table(stock_changed_df.columns, 'Stock Changed')
+        writer.write(stock_changed_df)
+    finally:
+        writer.close()
+    return {
+        'out_path': os.path.realpath(out_path),
+        'added': len(added_df),
+        'removed': len(removed_df),
+        'stock_changed': len(stock_changed_df),
+    }
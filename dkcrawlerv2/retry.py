@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import random
+import time
+from collections import deque
+from playwright.async_api import Error as PlaywrightError, Page
+from dkcrawlerv2.utils import set_up_logger, jsonify
+
+# the browser is gone, reloading the page can't help
+FATAL_ERROR_MESSAGES = (
+    'Target page, context or browser has been closed',
+    'Browser has been closed',
+    'Target closed',
+)
+
+
+class RetryBudget:
+    """
+    Retries allowed in a whole session, so that a degraded site can't make every job burn all of its attempts.
+    """
+
+    def __init__(self, max_retries=300):
+        self.max_retries = max_retries
+        self.used = 0
+
+    @property
+    def remaining(self):
+        return self.max_retries - self.used
+
+    def try_spend(self):
+        if self.used >= self.max_retries:
+            return False
+        self.used += 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Opens when the failure rate over the last window calls exceeds failure_rate_threshold.
+    While open, every caller waits for the cooldown, then calls go through again with a fresh window.
+    """
+
+    def __init__(self, failure_rate_threshold=0.5, window=20, min_calls=10, cooldown=60.0, logger=None):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.results = deque(maxlen=window)
+        self.opened_at = None
+        self.open_count = 0
+        self.logger = logger or set_up_logger(self.__class__.__name__)
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def record(self, ok: bool):
+        self.results.append(ok)
+        if self.is_open or len(self.results) < self.min_calls:
+            return
+        failure_rate = self.results.count(False) / len(self.results)
+        if failure_rate > self.failure_rate_threshold:
+            self.opened_at = time.monotonic()
+            self.open_count += 1
+            open_msg = {
+                'action': 'circuit opened',
+                'failure_rate': round(failure_rate, 3),
+                'pause_seconds': self.cooldown,
+            }
+            self.logger.warning(jsonify(open_msg))
+
+    async def wait_until_closed(self):
+        while self.is_open:
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0:
+                self.opened_at = None
+                self.results.clear()
+                self.logger.info('Circuit closed, resume crawling. ')
+                break
+            await asyncio.sleep(remaining)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, retryable error classification, a session retry budget
+    and a circuit breaker shared by all crawlers of a session.
+    """
+
+    def __init__(self, attempts=5, base_delay=2.0, max_delay=60.0,
+                 retryable_errors=(PlaywrightError, asyncio.TimeoutError, OSError, ValueError),
+                 budget: RetryBudget = None, breaker: CircuitBreaker = None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_errors = retryable_errors
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+
+    def is_retryable(self, ex: Exception):
+        if not isinstance(ex, self.retryable_errors):
+            return False
+        return not any(msg in str(ex) for msg in FATAL_ERROR_MESSAGES)
+
+    def should_retry(self, ex: Exception, cur_attempt: int):
+        return cur_attempt + 1 < self.attempts and self.is_retryable(ex) and self.budget.try_spend()
+
+    def backoff(self, cur_attempt: int):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** cur_attempt))
+
+    def record(self, ok: bool):
+        self.breaker.record(ok)
+
+    async def wait_until_closed(self):
+        await self.breaker.wait_until_closed()
+
+    def stats(self):
+        return {
+            'retries_used': self.budget.used,
+            'retries_remaining': self.budget.remaining,
+            'circuit_opened': self.breaker.open_count,
+        }
+
+
+def retry_on_exception(attempts: int = 5, delay: float = 2.0):
+    """
+    Decorator for retrying a crawler method on retryable exceptions, reloading the page between attempts.
+    Uses the crawler's retry_policy when it has one, capped at attempts for this method,
+    otherwise a policy built from attempts and delay.
+    """
+
+    def decorator(func):
+        default_policies = []
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            page: Page = kwargs["page"]
+            logger = kwargs.get("logger") or self.logger
+            policy = getattr(self, 'retry_policy', None)
+            if policy is None:
+                if len(default_policies) == 0:
+                    default_policies.append(RetryPolicy(attempts=attempts, base_delay=delay))
+                policy = default_policies[0]
+            metrics = getattr(self, 'metrics', None)
+            max_attempts = min(attempts, policy.attempts)
+
+            for cur_attempt in range(max_attempts):
+                await policy.wait_until_closed()
+                try:
+                    result = await func(self, *args, **kwargs)
+                    policy.record(ok=True)
+                    return result
+                except Exception as ex:
+                    policy.record(ok=False)
+                    if cur_attempt + 1 >= max_attempts or not policy.should_retry(ex, cur_attempt):
+                        raise
+                    retry_delay = policy.backoff(cur_attempt)
+                    logger.info(f"retried {cur_attempt + 1} times, retry in {retry_delay:.1f}s after {ex!r}")
+                    if metrics is not None:
+                        metrics.count('retries', step=func.__name__)
+                await asyncio.sleep(retry_delay)
+                try:
+                    await page.goto(page.url, timeout=60000)
+                    logger.info(f"reload page")
+                except PlaywrightError as ex:
+                    logger.info(f"failed to reload page: {ex!r}")
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from dkcrawlerv2.utils import set_up_logger, jsonify
+
+
+class WorkQueue:
+    """
+    Sliding-window scheduler: keeps max_concurrency handlers running until the queue is drained.
+    Handlers may put more items while the queue is running, now or after a delay. With a controller, the number
+    of running handlers follows the controller's current concurrency, up to its max_concurrency.
+    """
+
+    def __init__(self, handler, max_concurrency=3, name='WorkQueue', logger=None, controller=None):
+        self.handler = handler
+        self.controller = controller
+        self.max_concurrency = controller.max_concurrency if controller is not None else max_concurrency
+        self.name = name
+        self.logger = logger or set_up_logger(name)
+        self.queue = asyncio.Queue()
+        self.finished_count = 0
+        self.failed_count = 0
+        self.delayed_puts = set()
+
+    def put(self, item):
+        self.queue.put_nowait(item)
+
+    def put_later(self, item, delay: float):
+        """
+        Put item after delay, without holding a worker or a controller slot meanwhile.
+        The queue is not drained while delayed items are pending.
+        """
+        task = asyncio.ensure_future(self.delayed_put(item, delay))
+        self.delayed_puts.add(task)
+        task.add_done_callback(self.delayed_puts.discard)
+
+    async def delayed_put(self, item, delay: float):
+        await asyncio.sleep(delay)
+        self.put(item)
+
+    async def worker(self, worker_id: int):
+        while True:
+            item = await self.queue.get()
+            try:
+                if self.controller is not None:
+                    async with self.controller.slot():
+                        await self.handler(item)
+                else:
+                    await self.handler(item)
+                self.finished_count += 1
+            except Exception as ex:
+                self.failed_count += 1
+                error_msg = {
+                    'queue': self.name,
+                    'worker': worker_id,
+                    'item': str(item),
+                    'error': repr(ex),
+                }
+                self.logger.error(jsonify(error_msg))
+            finally:
+                self.queue.task_done()
+
+    async def run(self, items=()):
+        for item in items:
+            self.put(item)
+
+        start_time = time.time()
+        workers = [asyncio.create_task(self.worker(i)) for i in range(self.max_concurrency)]
+        try:
+            while True:
+                await self.queue.join()
+                if len(self.delayed_puts) == 0:
+                    break
+                await asyncio.wait(set(self.delayed_puts))
+        finally:
+            tasks = workers + list(self.delayed_puts)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        drained_msg = {
+            'queue': self.name,
+            'action': 'drained',
+            'finished': self.finished_count,
+            'failed': self.failed_count,
+            'elapsed_seconds': round(time.time() - start_time, 1),
+        }
+        self.logger.info(jsonify(drained_msg))
@@ -0,0 +1,159 @@
+import pandas as pd
+
+
+class NumericColumn:
+    """
+    A numeric column of the table download: its header in the known download versions, and whether its values
+    are whole counts, stored as nullable integers, or prices, stored as floats.
+    """
+
+    def __init__(self, names, integer=False):
+        self.names = list(names)
+        self.integer = integer
+        self.dtype = 'Int64' if integer else 'float64'
+
+    def find(self, columns):
+        for name in self.names:
+            if name in columns:
+                return name
+        return None
+
+
+STOCK = NumericColumn(['Stock', 'Quantity Available'], integer=True)
+
+# parsed by combine_pages, later reads get typed columns from parquet and numeric cells from Excel
+NUMERIC_SCHEMA = [
+    STOCK,
+    NumericColumn(['Price', 'Unit Price', 'Unit Price (USD)']),
+    NumericColumn(['@ qty', 'Price Break Qty'], integer=True),
+    NumericColumn(['Min Qty', 'Minimum Quantity', 'Minimum Quantity Orderable'], integer=True),
+]
+
+# cells the site fills in when there is no number, valid but empty
+MISSING_VALUES = [
+    '-', '--', 'N/A', 'Call', 'See Page', 'Non-Stock', 'Obsolete', 'Discontinued', 'Not Available',
+    'Not For New Designs', 'Last Time Buy', 'Backorder',
+]
+
+# leading number of a cell like "$1,234.50" or "12,000 - Immediate"
+NUMBER_PATTERN = r'^\s*\$?\s*(-?[\d,]*\.?\d+)'
+
+# a cell holding nothing but a number, as left behind in a neighbouring column by a shifted row
+CLEAN_NUMBER_PATTERN = r'^\s*\$?\s*[\d,]*\.?\d+\s*$'
+
+
+def numeric_columns(columns, schema=NUMERIC_SCHEMA):
+    """
+    {column: spec} of the columns described by schema.
+    """
+    found = {}
+    for spec in schema:
+        name = spec.find(columns)
+        if name is not None:
+            found[name] = spec
+    return found
+
+
+def parse_column(series, spec: NumericColumn):
+    """
+    Parse a column in one vectorized pass, returns the numbers and whether every value fits the spec.
+    Values that don't fit are left empty.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.astype(float)
+        is_missing = series.isna()
+    else:
+        text = series.astype('string').str.strip()
+        number = text.str.extract(NUMBER_PATTERN, expand=False).str.replace(',', '', regex=False)
+        values = pd.to_numeric(number, errors='coerce').astype(float)
+        is_missing = text.isna() | (text == '') | text.isin(MISSING_VALUES)
+    fits = values.notna() & (values >= 0)
+    if spec.integer:
+        fits &= values % 1 == 0
+    valid = (is_missing | fits).fillna(False).astype(bool)
+    return values.where(fits.fillna(False).astype(bool)), valid
+
+
+def is_clean_number(series, spec: NumericColumn):
+    """
+    Whether each value is a plain number fitting spec.
+    """
+    values, _ = parse_column(series, spec)
+    if pd.api.types.is_numeric_dtype(series):
+        return values.notna()
+    clean = series.astype('string').str.fullmatch(CLEAN_NUMBER_PATTERN).fillna(False).astype(bool)
+    return values.notna() & clean
+
+
+def has_shifted_neighbour(df, columns: dict, index):
+    """
+    Whether the rows of index hold, next to a numeric cell failing its spec, a plain number that would fit it.
+    Without such a number the failing cell is some text of the site rather than a shifted row.
+    """
+    evidence = pd.Series(False, index=index)
+    rows = df.loc[index]
+    for name, spec in columns.items():
+        failing = ~parse_column(rows[name], spec)[1]
+        if not failing.any():
+            continue
+        loc = df.columns.get_loc(name)
+        for neighbour in df.columns[max(loc - 1, 0):loc + 2]:
+            if neighbour != name:
+                evidence |= failing & is_clean_number(rows[neighbour], spec)
+    return evidence
+
+
+def parse_columns(df, columns: dict):
+    parsed = {}
+    valid = pd.Series(True, index=df.index)
+    for name, spec in columns.items():
+        parsed[name], column_valid = parse_column(df[name], spec)
+        valid &= column_valid
+    return parsed, valid
+
+
+def normalize_numeric(df, schema=NUMERIC_SCHEMA):
+    """
+    Parse the numeric columns of schema into typed columns.
+    Rows failing the schema are realigned when shifting their cells by one makes them fit, which undoes a cell
+    added before the first numeric column, or lost before it, by an unquoted separator in the download.
+    Returns the typed data and the counts of realigned and still misaligned rows, whose failing values are left empty.
+    A row only counts as misaligned when a plain number sits next to its failing cell, other failing values are
+    text the site put in a numeric column and are left empty without a report.
+    """
+    columns = numeric_columns(df.columns, schema)
+    if len(columns) == 0:
+        return df, {'realigned_rows': 0, 'misaligned_rows': 0}
+    df = df.copy()
+    parsed, valid = parse_columns(df, columns)
+
+    realigned_rows = 0
+    if not valid.all():
+        start = min(df.columns.get_loc(name) for name in columns)
+        # cells move between columns of different types
+        shiftable = df.columns[max(start - 1, 0):]
+        df[shiftable] = df[shiftable].astype(object)
+        for shift in (-1, 1):
+            invalid_index = valid.index[~valid]
+            if len(invalid_index) == 0 or start - shift < 0:
+                continue
+            # a lost cell moved the value of the first numeric column into the column before it
+            tail = list(df.columns[start - max(shift, 0):])
+            shifted = df.loc[invalid_index, tail].shift(shift, axis=1)
+            shifted_parsed, shifted_valid = parse_columns(shifted, columns)
+            fixed_index = shifted_valid.index[shifted_valid]
+            if len(fixed_index) == 0:
+                continue
+            df.loc[fixed_index, tail] = shifted.loc[fixed_index]
+            for name in columns:
+                parsed[name].loc[fixed_index] = shifted_parsed[name].loc[fixed_index]
+            valid.loc[fixed_index] = True
+            realigned_rows += len(fixed_index)
+
+    misaligned_rows = 0
+    if not valid.all():
+        misaligned_rows = int(has_shifted_neighbour(df, columns, valid.index[~valid]).sum())
+
+    for name, spec in columns.items():
+        df[name] = parsed[name].round().astype(spec.dtype) if spec.integer else parsed[name]
+    return df, {'realigned_rows': realigned_rows, 'misaligned_rows': misaligned_rows}
@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import sqlite3
+import multiprocessing
+from dkcrawlerv2.crawlers.data_crawler import AsyncDataCrawlerRunner, ShardJob, get_job_key
+from dkcrawlerv2.checkpoint import CrawlManifest
+from dkcrawlerv2.postprocess import combine_subcategories
+from dkcrawlerv2.utils import set_up_logger, get_latest_session_index, jsonify
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    Durable queue of subcategory URLs in a SQLite file, shared by shard workers on one machine, or on
+    several machines through a shared filesystem with working file locks.
+    A leased job goes back to pending when its worker stops renewing the lease.
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+            '''
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def set_setting(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+
+    def get_setting(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def add(self, urls, priorities=None):
+        """
+        Add URLs as pending jobs, jobs already in the queue keep their status.
+        """
+        priorities = priorities or {}
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO jobs (url, priority, status, updated_at) VALUES (?, ?, ?, ?)',
+            [(url, priorities.get(url) or 0, PENDING, now) for url in urls]
+        )
+
+    def requeue_failed(self):
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, attempts = 0, updated_at = ? WHERE status = ?', (PENDING, time.time(), FAILED)
+        )
+
+    def requeue_expired(self):
+        now = time.time()
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.execute(
+                '''
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    error = 'lease expired', worker = NULL, updated_at = ?
+                WHERE status = ? AND lease_expires < ?
+                ''',
+                (self.max_attempts, FAILED, PENDING, now, LEASED, now)
+            )
+
+    def lease(self, worker_id):
+        """
+        Lease the pending job with the highest priority, returns its URL or None.
+        """
+        self.requeue_expired()
+        now = time.time()
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute(
+                'SELECT url FROM jobs WHERE status = ? ORDER BY priority DESC, url LIMIT 1', (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                '''
+                UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE url = ?
+                ''',
+                (LEASED, worker_id, now + self.lease_seconds, now, row[0])
+            )
+        return row[0]
+
+    def heartbeat(self, worker_id, url):
+        """
+        Renew the lease, returns False if the job has been requeued to another worker meanwhile.
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            'UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE url = ? AND worker = ? AND status = ?',
+            (now + self.lease_seconds, now, url, worker_id, LEASED)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, worker_id, url):
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, error = NULL, updated_at = ? WHERE url = ? AND worker = ?',
+            (DONE, time.time(), url, worker_id)
+        )
+
+    def fail(self, worker_id, url, error):
+        self.conn.execute(
+            '''
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                error = ?, worker = NULL, updated_at = ?
+            WHERE url = ? AND worker = ?
+            ''',
+            (self.max_attempts, FAILED, PENDING, error, time.time(), url, worker_id)
+        )
+
+    def counts(self):
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def is_drained(self):
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+
+class ShardWorker:
+    """
+    One process of a sharded crawl: leases jobs from the queue and crawls them with its own
+    event loop, browser pool and AsyncDataCrawlerRunner, until the queue is drained.
+    Runner settings are read from the queue, so that workers on other machines only need its path.
+    """
+
+    def __init__(self, queue_path, worker_name=None, poll_interval=10.0):
+        self.queue_path = queue_path
+        self.worker_name = worker_name or f'{socket.gethostname()}_{os.getpid()}'
+        self.poll_interval = poll_interval
+        self.job_queue = None
+        self.runner = None
+        self.pending_finishes = []
+
+    async def run(self):
+        self.job_queue = JobQueue(self.queue_path)
+        settings = self.job_queue.get_setting('runner')
+        self.job_queue.lease_seconds = settings.pop('lease_seconds', self.job_queue.lease_seconds)
+        self.job_queue.max_attempts = settings.pop('max_attempts', self.job_queue.max_attempts)
+        # a job leased again after its worker died continues from that worker's checkpoint
+        settings['resume'] = True
+        self.runner = AsyncDataCrawlerRunner(
+            [], settings.pop('base_download_dir'), worker_name=self.worker_name, **settings
+        )
+        self.pending_finishes = []
+        try:
+            slots = range(self.runner.max_concurrency)
+            await self.runner.run_jobs(self.crawl_next_job, slots)
+            await asyncio.gather(*self.pending_finishes)
+        finally:
+            self.job_queue.close()
+        self.runner.logger.info(f'Shard worker {self.worker_name} finished. ')
+
+    async def crawl_next_job(self, slot):
+        if isinstance(slot, ShardJob):
+            # facet shards of an oversized subcategory stay with the worker holding its lease
+            await self.runner.create_shard_job(slot)
+            return
+
+        url = self.job_queue.lease(self.worker_name)
+        if url is None:
+            if not self.job_queue.is_drained():
+                # jobs leased by other workers come back if their worker dies, poll again without holding
+                # a pacer slot, which the facet shards of this worker's own jobs may need meanwhile
+                self.runner.work_queue.put_later(slot, self.poll_interval)
+            return
+
+        heartbeat = asyncio.ensure_future(self.heartbeat(url))
+        try:
+            combine_future = await self.runner.create_crawl_job(url)
+        except Exception as ex:
+            heartbeat.cancel()
+            self.job_queue.fail(self.worker_name, url, repr(ex))
+            raise
+        finally:
+            self.runner.work_queue.put(slot)
+        self.pending_finishes.append(asyncio.ensure_future(self.finish_job(url, combine_future, heartbeat)))
+
+    async def heartbeat(self, url):
+        while True:
+            await asyncio.sleep(self.job_queue.lease_seconds / 3)
+            if not self.job_queue.heartbeat(self.worker_name, url):
+                self.runner.logger.warning(f'Lost lease of {url}, it has been requeued. ')
+                return
+
+    async def finish_job(self, url, combine_future, heartbeat):
+        """
+        The job is done once its pages are combined, the lease is kept until then.
+        Crawl timeouts and combine errors are logged by the runner, the manifest tells whether the job finished.
+        """
+        try:
+            if combine_future is not None:
+                await combine_future
+            job_key = get_job_key(url)
+            if not self.runner.manifest.is_crawled(job_key):
+                self.job_queue.fail(self.worker_name, url, 'crawl incomplete')
+            elif not self.runner.manifest.is_combined(job_key):
+                self.job_queue.fail(self.worker_name, url, 'combine failed')
+            else:
+                self.job_queue.complete(self.worker_name, url)
+        finally:
+            heartbeat.cancel()
+
+
+def run_shard_worker(queue_path, worker_name=None, poll_interval=10.0):
+    asyncio.run(ShardWorker(queue_path, worker_name, poll_interval).run())
+
+
+class ShardedCrawl:
+    """
+    Fills the job queue of a session, starts worker processes on this machine and combines all
+    subcategories once every job is finished. Workers on other machines can join with run_shard_worker.
+    """
+
+    def __init__(self, start_urls, base_download_dir, workers=4, session_name=None, resume=False,
+                 subcat_url_info=None, lease_seconds=300, max_attempts=3, output_formats=('xlsx',),
+                 **runner_kwargs):
+        self.start_urls = start_urls
+        self.base_download_dir = base_download_dir
+        self.workers = workers
+        self.output_formats = tuple(output_formats)
+        self.dedupe = runner_kwargs.get('dedupe')
+        self.combine_chunk_size = runner_kwargs.get('combine_chunk_size', 50000)
+        product_counts = {item['url']: item['product_count'] for item in subcat_url_info or []}
+
+        session_index = get_latest_session_index(self.base_download_dir)
+        if not (resume and session_index > 0):
+            session_index += 1
+        self.session_name = session_name or f'session{session_index}'
+        self.download_dir = os.path.realpath(os.path.join(self.base_download_dir, self.session_name))
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.logger = set_up_logger(
+            self.session_name, os.path.join(self.download_dir, f'{self.session_name}.log'), append=resume
+        )
+
+        self.queue_path = os.path.join(self.download_dir, 'jobs.sqlite')
+        job_queue = JobQueue(self.queue_path, lease_seconds, max_attempts)
+        job_queue.set_setting('runner', {
+            'base_download_dir': self.base_download_dir,
+            'session_name': self.session_name,
+            'resume': resume,
+            'output_formats': self.output_formats,
+            'lease_seconds': lease_seconds,
+            'max_attempts': max_attempts,
+            **runner_kwargs,
+        })
+        # longest jobs first, as in AsyncDataCrawlerRunner.sort_urls_by_product_count
+        job_queue.add(self.start_urls, product_counts)
+        if resume:
+            job_queue.requeue_failed()
+        self.logger.info(f'Job queue {self.queue_path}: {jsonify(job_queue.counts())}')
+        job_queue.close()
+
+    def run(self):
+        processes = [
+            multiprocessing.get_context('spawn').Process(
+                target=run_shard_worker, args=(self.queue_path, f'worker{i}'), name=f'worker{i}'
+            )
+            for i in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                self.logger.warning(f'Shard {process.name} exited with code {process.exitcode}')
+
+        job_queue = JobQueue(self.queue_path)
+        counts = job_queue.counts()
+        job_queue.close()
+        self.logger.info(f'All shards of {self.session_name} finished: {jsonify(counts)}')
+        return counts
+
+    def combine_subcat_data(self):
+        total_item_count = CrawlManifest(self.download_dir).total_item_count()
+        chunk_size = self.combine_chunk_size
+        if chunk_size is not None and total_item_count <= chunk_size:
+            chunk_size = None
+        report = combine_subcategories(self.download_dir, self.output_formats, self.dedupe, chunk_size)
+        out_paths = '\n'.join(report['out_paths'].values())
+        self.logger.info(
+            f'Combined data of all subcategories with the union of their {report["column_count"]} columns. \n'
+            f'Exported combined data to {out_paths}'
+        )
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from dkcrawlerv2.postprocess import (
+    check_dedupe_policy, find_column, write_data, DK_PART_COLUMNS, MFR_PART_COLUMNS, MANUFACTURER_COLUMNS
+)
+from dkcrawlerv2.schema import STOCK, normalize_numeric
+from dkcrawlerv2.utils import read_data
+
+INDEXED_COLUMNS = ('mfr_part', 'manufacturer', 'subcategory')
+
+
+class PartStore:
+    """
+    SQLite database of the parts of a session, keyed by DigiKey part number.
+    Pages are parsed and upserted on a single background thread, in one transaction per batch_size rows,
+    so that ingestion never blocks the event loop. The full row of every part is kept as JSON next to
+    the indexed columns. A part seen again replaces the stored row with keep='latest', with keep='first' only
+    when it comes from the same page downloaded again.
+    """
+
+    def __init__(self, path, batch_size=1000, keep='latest'):
+        check_dedupe_policy(keep)
+        self.path = path
+        self.batch_size = batch_size
+        self.keep = keep
+        self.pending_rows = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PartStore')
+        # only used from the executor thread
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.executor.submit(self.create_tables).result()
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS parts (
+                    dk_part TEXT PRIMARY KEY,
+                    mfr_part TEXT,
+                    manufacturer TEXT,
+                    subcategory TEXT,
+                    stock INTEGER,
+                    page INTEGER,
+                    data TEXT NOT NULL,
+                    updated_at REAL
+                )
+                '''
+            )
+            for column in INDEXED_COLUMNS:
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS parts_{column} ON parts ({column})')
+
+    def add_page(self, subcategory, page_num, file_path):
+        """
+        Queue a downloaded page for ingestion, returns a future of the number of parsed rows.
+        """
+        return self.executor.submit(self.ingest_page, subcategory, page_num, file_path)
+
+    def ingest_page(self, subcategory, page_num, file_path):
+        # the same typed stock, price and quantity values as the combined output
+        df, _ = normalize_numeric(read_data(file_path))
+        part_col = find_column(df, DK_PART_COLUMNS)
+        mfr_part_col = self.optional_column(df, MFR_PART_COLUMNS)
+        manufacturer_col = self.optional_column(df, MANUFACTURER_COLUMNS)
+        stock_col = self.optional_column(df, STOCK.names)
+        stock = df[stock_col] if stock_col else pd.Series(index=df.index, dtype=float)
+
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        now = time.time()
+        for record, row_stock in zip(records, stock):
+            record['Subcategory'] = subcategory
+            self.pending_rows.append((
+                str(record[part_col]),
+                record[mfr_part_col] if mfr_part_col else None,
+                record[manufacturer_col] if manufacturer_col else None,
+                subcategory,
+                None if pd.isna(row_stock) else int(row_stock),
+                page_num,
+                json.dumps(record, default=str),
+                now,
+            ))
+        if len(self.pending_rows) >= self.batch_size:
+            self.write_pending()
+        return len(records)
+
+    @staticmethod
+    def optional_column(df, candidates):
+        try:
+            return find_column(df, candidates)
+        except KeyError:
+            return None
+
+    def write_pending(self):
+        if len(self.pending_rows) == 0:
+            return
+        with self.conn:
+            self.conn.executemany(
+                '''
+                INSERT INTO parts (dk_part, mfr_part, manufacturer, subcategory, stock, page, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (dk_part) DO UPDATE SET
+                    mfr_part = excluded.mfr_part, manufacturer = excluded.manufacturer,
+                    subcategory = excluded.subcategory, stock = excluded.stock, page = excluded.page,
+                    data = excluded.data, updated_at = excluded.updated_at
+                ''' + self.conflict_condition(),
+                self.pending_rows
+            )
+        self.pending_rows = []
+
+    def conflict_condition(self):
+        if self.keep == 'first':
+            return 'WHERE parts.subcategory = excluded.subcategory AND parts.page IS excluded.page'
+        return ''
+
+    def flush(self):
+        self.executor.submit(self.write_pending).result()
+
+    def close(self):
+        self.flush()
+        self.executor.submit(self.conn.close).result()
+        self.executor.shutdown()
+
+    def query(self, where='1', params=()):
+        """
+        Parts matching an SQL condition on the indexed columns, with their full rows.
+        """
+        def run_query():
+            rows = self.conn.execute(f'SELECT data FROM parts WHERE {where}', params).fetchall()
+            return pd.DataFrame([json.loads(row[0]) for row in rows])
+        self.flush()
+        return self.executor.submit(run_query).result()
+
+    def find_mfr_part(self, mfr_part):
+        return self.query('mfr_part = ?', (mfr_part,))
+
+    def find_dk_part(self, dk_part):
+        return self.query('dk_part = ?', (dk_part,))
+
+    def count(self, subcategory=None):
+        def run_count():
+            if subcategory is None:
+                return self.conn.execute('SELECT COUNT(*) FROM parts').fetchone()[0]
+            return self.conn.execute('SELECT COUNT(*) FROM parts WHERE subcategory = ?', (subcategory,)).fetchone()[0]
+        self.flush()
+        return self.executor.submit(run_count).result()
+
+    def export(self, out_path, subcategory=None):
+        """
+        Write all parts, or the parts of one subcategory, to an xlsx or parquet file.
+        """
+        if subcategory is None:
+            df = self.query()
+        else:
+            df = self.query('subcategory = ?', (subcategory,))
+        write_data(df, os.path.realpath(out_path))
+        return {'out_path': os.path.realpath(out_path), 'row_count': len(df)}
@@ -0,0 +1,200 @@
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# rows per sheet including the header, data beyond it continues on the next sheet
+EXCEL_MAX_ROWS = 1048576
+# rows converted to cells at a time, bounds the memory of a write independent of the chunk size
+XLSX_WRITE_BATCH_ROWS = 10000
+
+
+def excel_columns(header):
+    # an empty header cell, like the one above an index, is named as by pd.read_excel
+    return [f'Unnamed: {i}' if value is None else str(value) for i, value in enumerate(header)]
+
+
+def read_header(file):
+    if file.endswith('.parquet'):
+        return list(pyarrow.parquet.read_schema(file).names)
+    if file.endswith('.xlsx'):
+        workbook = load_workbook(file, read_only=True)
+        try:
+            header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return excel_columns(header)
+    return list(pd.read_csv(file, nrows=0).columns)
+
+
+def iter_xlsx_chunks(file, chunk_size):
+    """
+    Read every sheet of a workbook in chunks of at most chunk_size rows, rows are streamed by a read-only workbook.
+    """
+    workbook = load_workbook(file, read_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            columns = excel_columns(next(rows, ()))
+            batch = []
+            for row in rows:
+                # like pd.read_excel, skip empty rows
+                if all(value is None for value in row):
+                    continue
+                batch.append(row[:len(columns)])
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if len(batch) > 0:
+                yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(file, chunk_size):
+    """
+    Read a file in chunks of at most chunk_size rows, all CSV columns as strings.
+    """
+    if file.endswith('.parquet'):
+        parquet_file = pyarrow.parquet.ParquetFile(file)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif file.endswith('.xlsx'):
+        yield from iter_xlsx_chunks(file, chunk_size)
+    else:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunk_size)
+
+
+def iter_chunks(in_files, chunk_size):
+    """
+    Concatenated chunks of roughly chunk_size rows over all in_files, columns not aligned.
+    """
+    frames = []
+    row_count = 0
+    for file in in_files:
+        try:
+            for df in iter_file_chunks(file, chunk_size):
+                frames.append(df)
+                row_count += len(df)
+                if row_count >= chunk_size:
+                    yield pd.concat(frames, ignore_index=True)
+                    frames = []
+                    row_count = 0
+        except pd.errors.EmptyDataError:
+            print(f'"{file}" is empty')
+    if len(frames) > 0:
+        yield pd.concat(frames, ignore_index=True)
+
+
+def cell_rows(df):
+    # openpyxl can't write NaN or pandas NA
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class XlsxStreamWriter:
+    """
+    Appends chunks to a write-only workbook, rows are flushed to a temporary file instead of kept in memory.
+    Data beyond max_rows of a sheet continues on a new sheet with the same header.
+    The header and index are styled like DataFrame.to_excel.
+    With sheet_name, sheets are named after the table, and start_table adds further tables on sheets of their own.
+    """
+
+    header_font = Font(bold=True)
+    header_border = Border(*(Side(style='thin') for _ in range(4)))
+    header_alignment = Alignment(horizontal='center', vertical='top')
+
+    def __init__(self, out_path, columns, index=False, max_rows=EXCEL_MAX_ROWS, sheet_name=None):
+        self.out_path = out_path
+        self.columns = list(columns)
+        self.index = index
+        self.max_rows = max_rows
+        self.sheet_name = sheet_name
+        self.table_sheet_count = 0
+        self.row_count = 0
+        self.sheet_row_count = 0
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.add_sheet()
+
+    def header_cell(self, value):
+        cell = WriteOnlyCell(self.sheet, value)
+        cell.font = self.header_font
+        cell.border = self.header_border
+        cell.alignment = self.header_alignment
+        return cell
+
+    def sheet_title(self):
+        if self.sheet_name is None:
+            return f'Sheet{len(self.workbook.worksheets) + 1}'
+        if self.table_sheet_count == 1:
+            return self.sheet_name
+        return f'{self.sheet_name} {self.table_sheet_count}'
+
+    def add_sheet(self):
+        self.table_sheet_count += 1
+        self.sheet = self.workbook.create_sheet(self.sheet_title())
+        self.sheet.append([self.header_cell(value) for value in ([None] if self.index else []) + self.columns])
+        self.sheet_row_count = 1
+
+    def write(self, df):
+        df = df[self.columns]
+        for start in range(0, len(df), XLSX_WRITE_BATCH_ROWS):
+            for row in cell_rows(df.iloc[start:start + XLSX_WRITE_BATCH_ROWS]):
+                if self.sheet_row_count >= self.max_rows:
+                    self.add_sheet()
+                if self.index:
+                    row = (self.header_cell(self.row_count),) + row
+                self.sheet.append(row)
+                self.sheet_row_count += 1
+                self.row_count += 1
+
+    def start_table(self, columns, sheet_name):
+        """
+        Continue the workbook with another table, starting on a sheet of its own.
+        """
+        self.columns = list(columns)
+        self.sheet_name = sheet_name
+        self.table_sheet_count = 0
+        self.add_sheet()
+
+    def close(self):
+        self.workbook.save(self.out_path)
+
+
+class ParquetStreamWriter:
+    """
+    Writes every chunk as a row group of one parquet file with a fixed schema.
+    """
+
+    def __init__(self, out_path, columns, categorical_columns=(), numeric_columns=(), integer_columns=()):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for parquet output, install it with "pip install pyarrow". ')
+        self.out_path = out_path
+        self.columns = list(columns)
+        fields = []
+        for column in self.columns:
+            if column in categorical_columns:
+                fields.append(pyarrow.field(column, pyarrow.dictionary(pyarrow.int32(), pyarrow.string())))
+            elif column in numeric_columns:
+                fields.append(pyarrow.field(column, pyarrow.float64()))
+            elif column in integer_columns:
+                fields.append(pyarrow.field(column, pyarrow.int64()))
+            else:
+                fields.append(pyarrow.field(column, pyarrow.string()))
+        self.schema = pyarrow.schema(fields)
+        self.writer = pyarrow.parquet.ParquetWriter(out_path, self.schema)
+        self.row_count = 0
+
+    def write(self, df):
+        table = pyarrow.Table.from_pandas(df[self.columns], schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.row_count += len(df)
+
+    def close(self):
+        self.writer.close()
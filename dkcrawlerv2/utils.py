@@ -1,11 +1,11 @@
 import os
 import re
 import json
+import atexit
 import logging
-import pandas as pd
-from pandas.errors import EmptyDataError, ParserError
-import functools
-from playwright.async_api import Page
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 
 def get_batches(seq, batch_size=1):
@@ -29,48 +29,133 @@ def get_latest_session_index(root):
     dirs = [os.path.join(root, _dir) for _dir in dirs if re.search(r'session\d+$', _dir, re.IGNORECASE)]
     try:
         latest_dir = max(dirs, key=os.path.getctime)
-        latest_index = int(latest_dir.split('\\')[-1].replace('session', ''))
+        latest_index = int(os.path.basename(latest_dir).lower().replace('session', ''))
         return latest_index
     except ValueError:
         return 0
 
 
-def concat_data(in_files):
+# pandas is imported by the readers only, so that discovery and the command line start without it
+def read_excel(file):
+    import pandas as pd
+    # outputs above the row limit of a sheet continue on further sheets
+    sheets = pd.read_excel(file, engine='openpyxl', sheet_name=None)
+    return pd.concat(sheets.values(), ignore_index=True)
+
+
+def read_data(file):
+    import pandas as pd
+    from pandas.errors import ParserError
+    if file.endswith('.parquet'):
+        return pd.read_parquet(file)
+    if file.endswith('.xlsx'):
+        return read_excel(file)
+    try:
+        return pd.read_csv(file)
+    except (ParserError, UnicodeDecodeError):
+        return pd.read_excel(file, engine='openpyxl')
+
+
+def concat_data(in_files, join='inner'):
+    import pandas as pd
+    from pandas.errors import EmptyDataError
     dfs = []
     for file in in_files:
         try:
-            try:
-                df = pd.read_csv(file)
-            except (ParserError, UnicodeDecodeError):
-                df = pd.read_excel(file, engine='openpyxl')
+            df = read_data(file)
             dfs.append(df)
         except EmptyDataError:
             print(f'"{file}" is empty')
-    combined_df = pd.concat(dfs, join='inner', ignore_index=True)
+    combined_df = pd.concat(dfs, join=join, ignore_index=True)
     return combined_df
 
 
-def set_up_logger(logger_name, log_file_path=None):
-    formatter = logging.Formatter(
+class LogRouter(logging.Handler):
+    """
+    Passes every record to the handlers set up for its logger name.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.handlers = {}
+
+    def handle(self, record):
+        for handler in self.handlers.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+# one listener writes the records of all loggers from a background thread, so disk writes never block the event loop
+_log_queue = SimpleQueue()
+_log_router = LogRouter()
+_log_listener = None
+
+
+def flush_logs():
+    """
+    Wait until every queued record has been written.
+    """
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener.start()
+
+
+def close_log_handlers(logger_name):
+    """
+    Close the handlers of a logger, its later records are dropped until it is set up again.
+    """
+    for handler in _log_router.handlers.pop(logger_name, ()):
+        handler.close()
+
+
+@atexit.register
+def stop_log_listener():
+    global _log_listener
+    if _log_listener is not None:
+        # writes the queued records before stopping
+        _log_listener.stop()
+        _log_listener = None
+    for logger_name in list(_log_router.handlers):
+        close_log_handlers(logger_name)
+
+
+def set_up_logger(logger_name, log_file_path=None, append=False, formatter=None, console=True):
+    global _log_listener
+    formatter = formatter or logging.Formatter(
         '[%(asctime)s] [%(name)s] [%(levelname)s]: %(message)s',
         "%Y-%m-%d %H:%M:%S"
     )
     logger = logging.getLogger(logger_name)
     if len(logger.handlers) > 0:
         logger.handlers.clear()
+    if logger_name in _log_router.handlers:
+        # records queued before the new setup belong to the old handlers
+        flush_logs()
+    close_log_handlers(logger_name)
     logger.setLevel(logging.INFO)
-    console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    console.setFormatter(formatter)
-    logger.addHandler(console)
+
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
 
     if log_file_path is not None:
-        with open(log_file_path, 'w+') as f:
-            f.write('')
+        if not append:
+            with open(log_file_path, 'w+') as f:
+                f.write('')
         file_handler = logging.FileHandler(log_file_path)
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    _log_router.handlers[logger_name] = handlers
+    logger.addHandler(QueueHandler(_log_queue))
+    if _log_listener is None:
+        _log_listener = QueueListener(_log_queue, _log_router)
+        _log_listener.start()
     return logger
 
 
@@ -93,31 +178,12 @@ def remove_url_qs(url):
     return url.split('?')[0]
 
 
-def parse_int(s):
-    return int(re.sub(r'\D', '', s))
-
+def update_url_qs(url, **params):
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    query_params = dict(parse_qsl(query, keep_blank_values=True))
+    query_params.update({key: str(value) for key, value in params.items()})
+    return urlunsplit((scheme, netloc, path, urlencode(query_params), fragment))
 
-def retry_on_exception(attempts: int = 5, delay: float = 10.0):
-    """
-    Decorator for retrying function on Exception
-    """
 
-    def decorator(func):
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            page: Page = kwargs["page"]
-            logger = kwargs["logger"]
-
-            exception = None
-            for cur_attempt in range(attempts):
-                try:
-                    return await func(*args, **kwargs)
-                except Exception as ex:
-                    logger.info(f"retried {cur_attempt + 1} times")
-                    exception = ex
-                    await page.goto(page.url, timeout=60000)
-                    logger.info(f"reload page")
-                await page.wait_for_timeout(delay * 1000)
-            raise exception
-        return wrapper
-    return decorator
+def parse_int(s):
+    return int(re.sub(r'\D', '', s))
@@ -0,0 +1,55 @@
+import math
+import pandas as pd
+from dkcrawlerv2.postprocess import find_column, DK_PART_COLUMNS
+from dkcrawlerv2.schema import normalize_numeric, STOCK
+
+
+class PageValidator:
+    """
+    Checks a downloaded page as it arrives: row count expected from the product count, header equal to
+    the header of page 1, a part number in every row and numeric columns that fit the schema.
+    """
+
+    def __init__(self, item_count: int, page_size=100):
+        self.item_count = item_count
+        self.page_size = page_size
+        self.max_page = math.ceil(item_count / page_size)
+        self.header = None
+
+    def expected_rows(self, page_num: int):
+        if page_num < self.max_page:
+            return self.page_size
+        return self.item_count - (self.max_page - 1) * self.page_size
+
+    def validate(self, page_num: int, df: pd.DataFrame):
+        """
+        Returns the problems found in the page, empty if it is fine.
+        """
+        problems = []
+        expected_rows = self.expected_rows(page_num)
+        if len(df) != expected_rows:
+            problems.append(f'{len(df)} rows instead of {expected_rows}')
+
+        header = list(df.columns)
+        # until page 1 arrives, the first page seen stands in for it
+        if self.header is None or page_num == 1:
+            self.header = header
+        elif header != self.header:
+            missing = [column for column in self.header if column not in header]
+            extra = [column for column in header if column not in self.header]
+            problems.append(f'header differs from page 1, missing {missing}, extra {extra}')
+
+        try:
+            part_col = find_column(df, DK_PART_COLUMNS)
+            if df[part_col].isna().any():
+                problems.append(f'empty "{part_col}"')
+        except KeyError:
+            problems.append('no DigiKey part number column')
+
+        if STOCK.find(df.columns) is None:
+            problems.append(f'none of the stock columns {STOCK.names}')
+        # rows shifted by one cell are realigned by the combine, only the others need a new download
+        misaligned_rows = normalize_numeric(df)[1]['misaligned_rows']
+        if misaligned_rows > 0:
+            problems.append(f'{misaligned_rows} rows with misaligned numeric columns')
+        return problems
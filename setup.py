@@ -16,6 +16,13 @@ setuptools.setup(
         'openpyxl',
         'xlrd',
     ],
+    entry_points={
+        'console_scripts': ['dkcrawler=dkcrawlerv2.cli:main'],
+    },
+    extras_require={
+        'memory': ['psutil'],
+        'parquet': ['pyarrow'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,130 @@
+import asyncio
+from dkcrawlerv2.browser_pool import BrowserPool, BrowserSlot
+
+
+class FakeContext:
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, fail_new_context=False):
+        self.fail_new_context = fail_new_context
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        if self.fail_new_context:
+            raise OSError('storage state unreadable')
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserPool(BrowserPool):
+    """
+    Pool of fake browsers, launched without Playwright.
+    """
+
+    async def launch_browser(self):
+        return FakeBrowser()
+
+    async def start(self):
+        self.slots = [BrowserSlot(index, await self.launch_browser()) for index in range(self.size)]
+
+
+def test_release_slot_when_new_context_fails():
+    async def run():
+        pool = FakeBrowserPool(size=1)
+        await pool.start()
+        pool.slots[0].browser.fail_new_context = True
+        try:
+            async with pool.new_context():
+                pass
+        except OSError:
+            pass
+        assert pool.slots[0].active_contexts == 0
+
+    asyncio.run(run())
+
+
+def test_replace_disconnected_browser():
+    async def run():
+        pool = FakeBrowserPool(size=1)
+        await pool.start()
+        crashed_browser = pool.slots[0].browser
+        crashed_browser.connected = False
+        async with pool.new_context() as context:
+            assert isinstance(context, FakeContext)
+        assert crashed_browser.closed
+        assert pool.slots[0].browser is not crashed_browser
+        assert pool.slots[0].active_contexts == 0
+
+    asyncio.run(run())
+
+
+class FakeProcess:
+    def __init__(self, pid, name, rss_mb, children=()):
+        self.pid = pid
+        self.process_name = name
+        self.rss = rss_mb * 1024 * 1024
+        self.child_processes = list(children)
+
+    def name(self):
+        return self.process_name
+
+    def memory_info(self):
+        return self
+
+    def children(self, recursive=False):
+        descendants = []
+        for child in self.child_processes:
+            descendants.append(child)
+            if recursive:
+                descendants.extend(child.children(recursive=True))
+        return descendants
+
+
+class FakeProcessPool(FakeBrowserPool):
+    def __init__(self, processes, **kwargs):
+        super().__init__(**kwargs)
+        self.processes = processes
+
+    def child_processes(self):
+        # children(recursive=True) of the crawler process lists the descendants too
+        return [p for process in self.processes for p in [process] + process.children(recursive=True)]
+
+
+def test_memory_counts_browser_processes_only():
+    content = FakeProcess(3, 'Web Content', 300)
+    browser = FakeProcess(2, 'firefox', 200, [content])
+    # the Playwright driver and a combine worker holding a large subcategory
+    driver = FakeProcess(1, 'node', 100, [browser])
+    combine_worker = FakeProcess(4, 'python', 4000)
+
+    async def run():
+        pool = FakeProcessPool([driver, combine_worker], size=1, max_memory_mb=1000)
+        await pool.start()
+        assert pool.browser_memory_mb() == 500
+        pool.check_memory()
+        assert not pool.slots[0].retired
+
+        content.rss = 900 * 1024 * 1024
+        pool.check_memory()
+        assert pool.slots[0].retired
+
+    asyncio.run(run())
+
+
+def main():
+    test_release_slot_when_new_context_fails()
+    test_replace_disconnected_browser()
+    test_memory_counts_browser_processes_only()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+from dkcrawlerv2.cache import DiscoveryCache
+from dkcrawlerv2.crawlers.vendor_subcat_crawler import VendorSubCategoryCrawler
+
+VENDOR_URL = 'https://www.digikey.com/en/supplier-centers/acme'
+SUBCAT_URL_INFO = [
+    {'url': 'https://www.digikey.com/en/products/filter/resistors/52', 'product_count': 1200},
+    {'url': 'https://www.digikey.com/en/products/filter/capacitors/60', 'product_count': 80},
+]
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(ttl=3600):
+    clock = FakeClock()
+    return DiscoveryCache(tempfile.mkdtemp(), ttl=ttl, clock=clock), clock
+
+
+def test_key_by_url_and_flags():
+    cache, _ = make_cache()
+    cache.set(VENDOR_URL, SUBCAT_URL_INFO, in_stock_only=True, target_vendor_only=True)
+    assert cache.get(VENDOR_URL, in_stock_only=True, target_vendor_only=True) == SUBCAT_URL_INFO
+    # the order of the flags doesn't matter, their values and the URL do
+    assert cache.get(VENDOR_URL, target_vendor_only=True, in_stock_only=True) == SUBCAT_URL_INFO
+    assert cache.get(VENDOR_URL, in_stock_only=False, target_vendor_only=True) is None
+    assert cache.get(f'{VENDOR_URL}-corp', in_stock_only=True, target_vendor_only=True) is None
+
+
+def test_ttl_expiry():
+    cache, clock = make_cache(ttl=3600)
+    cache.set(VENDOR_URL, SUBCAT_URL_INFO)
+    clock.now += 3600
+    assert cache.get(VENDOR_URL) == SUBCAT_URL_INFO
+    clock.now += 1
+    assert cache.get(VENDOR_URL) is None
+    # a new discovery refreshes the entry
+    cache.set(VENDOR_URL, SUBCAT_URL_INFO[:1])
+    assert cache.get(VENDOR_URL) == SUBCAT_URL_INFO[:1]
+
+
+def make_crawler(cache):
+    return VendorSubCategoryCrawler(VENDOR_URL, cache=cache)
+
+
+def test_crawl_from_cache():
+    cache, _ = make_cache()
+    crawler = make_crawler(cache)
+    cache.set(VENDOR_URL, SUBCAT_URL_INFO, **crawler.cache_flags())
+    # a cache hit returns before a browser is launched
+    assert asyncio.run(crawler.crawl()) == [item['url'] for item in SUBCAT_URL_INFO]
+    assert crawler.subcat_url_info == SUBCAT_URL_INFO
+
+
+def test_skip_cache_when_nodes_failed():
+    cache, _ = make_cache()
+    crawler = make_crawler(cache)
+    crawler.subcat_url_info = SUBCAT_URL_INFO[:1]
+    crawler.failed_urls = ['https://www.digikey.com/en/products/category/capacitors/3']
+    crawler.cache_result()
+    assert cache.get(VENDOR_URL, **crawler.cache_flags()) is None
+    assert os.listdir(cache.cache_dir) == []
+
+    crawler.failed_urls = []
+    crawler.cache_result()
+    assert cache.get(VENDOR_URL, **crawler.cache_flags()) == SUBCAT_URL_INFO[:1]
+
+
+def main():
+    test_key_by_url_and_flags()
+    test_ttl_expiry()
+    test_crawl_from_cache()
+    test_skip_cache_when_nodes_failed()
+
+
+if __name__ == '__main__':
+    main()
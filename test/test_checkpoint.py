@@ -0,0 +1,95 @@
+import os
+import tempfile
+from dkcrawlerv2.checkpoint import CrawlManifest, MANIFEST_FILE_NAME
+
+URL = 'https://example.com/en/products/filter/resistors/52'
+
+
+def write_page(session_dir, key, page_num):
+    job_dir = os.path.join(session_dir, key)
+    os.makedirs(job_dir, exist_ok=True)
+    file_path = os.path.join(job_dir, f'resistors_{page_num}.csv')
+    with open(file_path, 'w') as f:
+        f.write('DK Part #\nA-1\n')
+    return file_path
+
+
+def started_manifest(session_dir, page_nums, item_count=250):
+    manifest = CrawlManifest(session_dir)
+    manifest.record_start('resistors_52', URL, item_count, 3)
+    for page_num in page_nums:
+        manifest.record_page('resistors_52', page_num, write_page(session_dir, 'resistors_52', page_num))
+    manifest.record_crawled('resistors_52')
+    manifest.flush()
+    return manifest
+
+
+def test_resume_pages():
+    session_dir = tempfile.mkdtemp()
+    started_manifest(session_dir, [1, 2])
+    manifest = CrawlManifest(session_dir)
+    assert not manifest.record_start('resistors_52', URL, 250, 3)
+    assert sorted(manifest.downloaded_pages('resistors_52')) == [1, 2]
+    assert manifest.is_crawled('resistors_52')
+
+
+def test_discard_pages_when_count_changed():
+    session_dir = tempfile.mkdtemp()
+    started_manifest(session_dir, [1, 2])
+    manifest = CrawlManifest(session_dir)
+    assert manifest.record_start('resistors_52', URL, 251, 3)
+    assert manifest.downloaded_pages('resistors_52') == {}
+    assert not manifest.is_crawled('resistors_52')
+    assert manifest.item_count('resistors_52') == 251
+
+
+def test_discard_pages_when_not_resuming():
+    session_dir = tempfile.mkdtemp()
+    started_manifest(session_dir, [1, 2])
+    manifest = CrawlManifest(session_dir)
+    assert manifest.record_start('resistors_52', URL, 250, 3, resume=False)
+    assert manifest.downloaded_pages('resistors_52') == {}
+    # a job seen for the first time has nothing to discard
+    assert not manifest.record_start('capacitors_60', URL, 250, 3, resume=False)
+
+
+def test_skip_pages_without_file():
+    session_dir = tempfile.mkdtemp()
+    manifest = started_manifest(session_dir, [1, 2])
+    os.remove(manifest.downloaded_pages('resistors_52')[2])
+    assert sorted(CrawlManifest(session_dir).downloaded_pages('resistors_52')) == [1]
+
+
+def test_debounce_page_writes():
+    session_dir = tempfile.mkdtemp()
+    manifest = CrawlManifest(session_dir, save_interval=3600)
+    manifest.record_start('resistors_52', URL, 250, 3)
+    manifest.record_page('resistors_52', 1, write_page(session_dir, 'resistors_52', 1))
+    assert CrawlManifest(session_dir).downloaded_pages('resistors_52') == {}
+    manifest.flush('resistors_52')
+    assert sorted(CrawlManifest(session_dir).downloaded_pages('resistors_52')) == [1]
+
+
+def test_one_manifest_per_job():
+    session_dir = tempfile.mkdtemp()
+    manifest = CrawlManifest(session_dir)
+    manifest.record_start('resistors_52', URL, 250, 3)
+    manifest.record_start('resistors_52/shard_0', URL, 120, 2)
+    manifest.record_start('capacitors_60', URL, 80, 1)
+    assert os.path.exists(os.path.join(session_dir, 'resistors_52', 'shard_0', MANIFEST_FILE_NAME))
+    assert CrawlManifest(session_dir).keys() == ['capacitors_60', 'resistors_52', 'resistors_52/shard_0']
+    # shards are counted by their subcategory
+    assert CrawlManifest(session_dir).total_item_count() == 330
+
+
+def main():
+    test_resume_pages()
+    test_discard_pages_when_count_changed()
+    test_discard_pages_when_not_resuming()
+    test_skip_pages_without_file()
+    test_debounce_page_writes()
+    test_one_manifest_per_job()
+
+
+if __name__ == '__main__':
+    main()
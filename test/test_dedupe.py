@@ -0,0 +1,68 @@
+from dkcrawlerv2.dedupe import PartDeduplicator
+
+
+def test_count_duplicates():
+    deduplicator = PartDeduplicator()
+    assert not deduplicator.add_page('resistors', 1, ['A-1', 'A-2', 'A-3'])
+    assert not deduplicator.add_page('resistors', 2, ['A-3', 'A-4'])
+    assert not deduplicator.add_page('capacitors', 1, ['A-1', 'C-1'])
+    report = deduplicator.report()
+    assert report['unique_parts'] == 5
+    assert report['subcategories'] == {
+        'resistors': {'rows': 5, 'duplicates': 1, 'cross_subcategory_duplicates': 0, 'duplicate_pages': []},
+        'capacitors': {'rows': 2, 'duplicates': 1, 'cross_subcategory_duplicates': 1, 'duplicate_pages': []},
+    }
+
+
+def test_flag_reserved_page():
+    deduplicator = PartDeduplicator()
+    deduplicator.add_page('resistors', 1, ['A-1', 'A-2'])
+    assert deduplicator.add_page('resistors', 2, ['A-1', 'A-2'])
+    assert deduplicator.counts['resistors']['duplicate_pages'] == [2]
+    # parts of another subcategory are not a re-served page
+    assert not deduplicator.add_page('capacitors', 1, ['A-1', 'A-2'])
+
+
+def test_readd_page_replaces_counts():
+    deduplicator = PartDeduplicator()
+    deduplicator.add_page('resistors', 1, ['A-1', 'A-2'])
+    deduplicator.add_page('resistors', 2, ['A-1', 'A-2'])
+    assert not deduplicator.add_page('resistors', 2, ['A-3', 'A-4'])
+    assert not deduplicator.add_page('resistors', 2, ['A-3', 'A-4'])
+    assert deduplicator.counts['resistors'] == {
+        'rows': 4, 'duplicates': 0, 'cross_subcategory_duplicates': 0, 'duplicate_pages': [],
+    }
+
+
+def test_readd_page_releases_its_parts():
+    deduplicator = PartDeduplicator()
+    deduplicator.add_page('resistors', 1, ['A-1', 'A-2'])
+    deduplicator.add_page('resistors', 2, ['X-1', 'X-2'])
+    deduplicator.add_page('resistors', 2, ['A-3', 'A-4'])
+    # the parts of the replaced download belong to no page any more
+    assert not deduplicator.add_page('resistors', 3, ['X-1', 'X-2'])
+    assert deduplicator.counts['resistors']['duplicates'] == 0
+
+
+def test_keep_latest():
+    deduplicator = PartDeduplicator(keep='latest')
+    deduplicator.add_page('resistors', 1, ['A-1', 'A-2'])
+    deduplicator.add_page('capacitors', 1, ['A-1'])
+    assert deduplicator.pages[deduplicator.seen['A-1']] == ('capacitors', 1)
+
+    # a re-served page takes no parts, so the page it repeats is not flagged when added again
+    assert deduplicator.add_page('resistors', 2, ['A-2'])
+    assert not deduplicator.add_page('resistors', 1, ['A-2'])
+    assert deduplicator.pages[deduplicator.seen['A-2']] == ('resistors', 1)
+
+
+def main():
+    test_count_duplicates()
+    test_flag_reserved_page()
+    test_readd_page_replaces_counts()
+    test_readd_page_releases_its_parts()
+    test_keep_latest()
+
+
+if __name__ == '__main__':
+    main()
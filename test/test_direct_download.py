@@ -0,0 +1,61 @@
+import asyncio
+import json
+from playwright.async_api import Page
+from dkcrawlerv2.direct_download import DownloadRequestRecorder, DownloadTemplate
+
+
+class FakePageImpl:
+    """
+    Stands in for the browser side of a Playwright Page, so that the real Page wrapper registers the handlers.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, *args):
+        for handler in list(self.handlers.get(event, [])):
+            handler(*args)
+
+
+class FakeRequest:
+    def __init__(self, url):
+        self.url = url
+
+
+def test_recorder_on_page():
+    impl = FakePageImpl()
+    page = Page(impl)
+    with DownloadRequestRecorder(page) as recorder:
+        impl.emit('request', FakeRequest('https://example.com/download?page=1'))
+    impl.emit('request', FakeRequest('https://example.com/after'))
+    impl._loop.close()
+    assert [request.url for request in recorder.requests] == ['https://example.com/download?page=1']
+    assert impl.handlers['request'] == []
+
+
+def test_template_for_page():
+    template = DownloadTemplate(
+        'POST', 'https://example.com/download?page=1&pageSize=100',
+        headers={'Cookie': 'a=1', 'Accept': 'text/csv', ':authority': 'example.com'},
+        post_data=json.dumps({'page': 1, 'sort': 'asc'}),
+    )
+    url, post_data = template.for_page(7)
+    assert url == 'https://example.com/download?page=7&pageSize=100'
+    assert json.loads(post_data) == {'page': 7, 'sort': 'asc'}
+    assert template.headers == {'Accept': 'text/csv'}
+
+
+def main():
+    test_recorder_on_page()
+    test_template_for_page()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+from dkcrawlerv2.crawlers.data_crawler import AsyncDataCrawler, get_job_key
+
+group_facet_options = AsyncDataCrawler.group_facet_options
+
+
+def test_group_options_up_to_max_items():
+    # five manufacturers of about 345 products, shards of at most 700
+    counts = [346, 345, 345, 346, 345]
+    groups = group_facet_options(counts, 700)
+    assert groups == [[0, 3], [1, 2], [4]]
+    assert all(sum(counts[i] for i in group) <= 700 for group in groups)
+
+
+def test_every_option_in_one_group():
+    counts = [5, 900, 120, 40, 300, 75, 10]
+    groups = group_facet_options(counts, 400)
+    options = [i for group in groups for i in group]
+    assert sorted(options) == list(range(len(counts)))
+    assert sum(counts[i] for group in groups for i in group) == sum(counts)
+
+
+def test_oversized_option_is_its_own_group():
+    groups = group_facet_options([1500, 200, 100], 1000)
+    assert groups == [[0], [1, 2]]
+
+
+def test_single_group_when_all_fit():
+    assert group_facet_options([100, 200, 300], 1000) == [[0, 1, 2]]
+
+
+def test_job_key():
+    assert get_job_key('https://www.digikey.com/en/products/filter/film-capacitors/62?s=N4IgTCBcDaIA') == \
+        'film_capacitors_62'
+
+
+def main():
+    test_group_options_up_to_max_items()
+    test_every_option_in_one_group()
+    test_oversized_option_is_its_own_group()
+    test_single_group_when_all_fit()
+    test_job_key()
+
+
+if __name__ == '__main__':
+    main()
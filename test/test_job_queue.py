@@ -0,0 +1,180 @@
+import asyncio
+import os
+import tempfile
+import time
+from dkcrawlerv2.checkpoint import CrawlManifest
+import logging
+from dkcrawlerv2.crawlers.data_crawler import get_job_key, ShardJob
+from dkcrawlerv2.pacing import AdaptiveController
+from dkcrawlerv2.scheduler import WorkQueue
+from dkcrawlerv2.sharding import JobQueue, ShardWorker, PENDING, LEASED, DONE, FAILED
+
+URLS = [
+    'https://example.com/en/products/filter/resistors/52',
+    'https://example.com/en/products/filter/capacitors/60',
+    'https://example.com/en/products/filter/inductors/71',
+]
+
+
+def make_queue(**kwargs):
+    return JobQueue(os.path.join(tempfile.mkdtemp(), 'jobs.sqlite'), **kwargs)
+
+
+def status(job_queue, url):
+    return job_queue.conn.execute('SELECT status FROM jobs WHERE url = ?', (url,)).fetchone()[0]
+
+
+def expire_leases(job_queue):
+    job_queue.conn.execute('UPDATE jobs SET lease_expires = ?', (time.time() - 1,))
+
+
+def test_lease_by_priority():
+    job_queue = make_queue()
+    job_queue.add(URLS, {URLS[1]: 500, URLS[2]: 100})
+    assert [job_queue.lease('w1') for _ in URLS] == [URLS[1], URLS[2], URLS[0]]
+    assert job_queue.lease('w1') is None
+    assert job_queue.counts() == {PENDING: 0, LEASED: 3, DONE: 0, FAILED: 0}
+    job_queue.close()
+
+
+def test_add_keeps_status():
+    job_queue = make_queue()
+    job_queue.add(URLS[:1])
+    url = job_queue.lease('w1')
+    job_queue.complete('w1', url)
+    job_queue.add(URLS[:1])
+    assert status(job_queue, url) == DONE
+    assert job_queue.is_drained()
+    job_queue.close()
+
+
+def test_requeue_expired_lease():
+    job_queue = make_queue(max_attempts=2)
+    job_queue.add(URLS[:1])
+    url = job_queue.lease('w1')
+    assert job_queue.heartbeat('w1', url)
+
+    expire_leases(job_queue)
+    assert job_queue.lease('w2') == url
+    # the first worker lost its lease and must not complete the job
+    assert not job_queue.heartbeat('w1', url)
+    job_queue.complete('w1', url)
+    assert status(job_queue, url) == LEASED
+
+    expire_leases(job_queue)
+    job_queue.requeue_expired()
+    assert status(job_queue, url) == FAILED
+    assert job_queue.is_drained()
+    job_queue.close()
+
+
+def test_fail_and_requeue_failed():
+    job_queue = make_queue(max_attempts=2)
+    job_queue.add(URLS[:1])
+    url = job_queue.lease('w1')
+    job_queue.fail('w1', url, 'crawl incomplete')
+    assert status(job_queue, url) == PENDING
+    assert job_queue.lease('w1') == url
+    job_queue.fail('w1', url, 'crawl incomplete')
+    assert status(job_queue, url) == FAILED
+
+    job_queue.requeue_failed()
+    assert status(job_queue, url) == PENDING
+    assert job_queue.lease('w1') == url
+    job_queue.close()
+
+
+def test_settings():
+    job_queue = make_queue()
+    job_queue.set_setting('runner', {'session_name': 'session1', 'output_formats': ['xlsx']})
+    assert job_queue.get_setting('runner') == {'session_name': 'session1', 'output_formats': ['xlsx']}
+    assert job_queue.get_setting('missing', {}) == {}
+    job_queue.close()
+
+
+class FakeRunner:
+    def __init__(self, manifest):
+        self.manifest = manifest
+
+
+def test_finish_job_by_manifest():
+    job_queue = make_queue(max_attempts=3)
+    job_queue.add(URLS)
+    manifest = CrawlManifest(tempfile.mkdtemp())
+    worker = ShardWorker(job_queue.path, worker_name='w1')
+    worker.job_queue = job_queue
+    worker.runner = FakeRunner(manifest)
+
+    async def finish(url, crawled, combined):
+        job_key = get_job_key(url)
+        if crawled:
+            manifest.record_crawled(job_key)
+        if combined:
+            manifest.record_combined(job_key)
+        heartbeat = asyncio.ensure_future(asyncio.sleep(60))
+        await worker.finish_job(url, None, heartbeat)
+
+    async def run():
+        leased = [job_queue.lease('w1') for _ in URLS]
+        await finish(leased[0], crawled=True, combined=True)
+        await finish(leased[1], crawled=True, combined=False)
+        await finish(leased[2], crawled=False, combined=False)
+        return leased
+
+    leased = asyncio.run(run())
+    assert status(job_queue, leased[0]) == DONE
+    assert status(job_queue, leased[1]) == PENDING
+    assert status(job_queue, leased[2]) == PENDING
+    errors = dict(job_queue.conn.execute('SELECT url, error FROM jobs').fetchall())
+    assert errors[leased[1]] == 'combine failed'
+    assert errors[leased[2]] == 'crawl incomplete'
+    job_queue.close()
+
+
+class FakeShardRunner:
+    def __init__(self, job_queue, other_url):
+        self.job_queue = job_queue
+        self.other_url = other_url
+        self.work_queue = None
+        self.shard_started_after = None
+        self.start_time = time.perf_counter()
+
+    async def create_shard_job(self, job):
+        self.shard_started_after = time.perf_counter() - self.start_time
+        # the other worker finishes, so the idle slot finds the queue drained at its next poll
+        self.job_queue.complete('w2', self.other_url)
+
+
+def test_idle_slot_does_not_block_shards():
+    job_queue = make_queue()
+    job_queue.add(URLS[:1])
+    # leased by another worker, so the queue is not drained while w1 has nothing to lease
+    other_url = job_queue.lease('w2')
+    worker = ShardWorker(job_queue.path, worker_name='w1', poll_interval=0.5)
+    worker.job_queue = job_queue
+    worker.runner = FakeShardRunner(job_queue, other_url)
+    logger = logging.getLogger('test_job_queue')
+    controller = AdaptiveController(min_concurrency=1, max_concurrency=1, initial_concurrency=1, logger=logger)
+    worker.runner.work_queue = WorkQueue(worker.crawl_next_job, logger=logger, controller=controller)
+
+    shard_job = ShardJob(URLS[1], '0', get_job_key(URLS[0]))
+    asyncio.run(worker.runner.work_queue.run([0, shard_job]))
+    # the idle slot waits for its next poll outside the only pacer slot
+    assert worker.runner.shard_started_after < worker.poll_interval
+    assert worker.runner.work_queue.finished_count == 3
+    assert job_queue.is_drained()
+    job_queue.close()
+
+
+def main():
+    test_lease_by_priority()
+    test_add_keeps_status()
+    test_requeue_expired_lease()
+    test_fail_and_requeue_failed()
+    test_settings()
+    test_finish_job_by_manifest()
+    test_idle_slot_does_not_block_shards()
+
+
+if __name__ == '__main__':
+    main()
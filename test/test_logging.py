@@ -0,0 +1,79 @@
+import os
+import tempfile
+from dkcrawlerv2.utils import set_up_logger, flush_logs, stop_log_listener, _log_router
+
+
+def read_lines(file_path):
+    with open(file_path, 'r') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def test_route_records_by_logger_name():
+    log_dir = tempfile.mkdtemp()
+    resistors_path = os.path.join(log_dir, 'resistors.log')
+    capacitors_path = os.path.join(log_dir, 'capacitors.log')
+    resistors_logger = set_up_logger('test_resistors', resistors_path, console=False)
+    capacitors_logger = set_up_logger('test_capacitors', capacitors_path, console=False)
+    for i in range(3):
+        resistors_logger.info(f'resistors page {i}')
+        capacitors_logger.info(f'capacitors page {i}')
+    # below the INFO level of the handlers
+    resistors_logger.debug('not written')
+    flush_logs()
+
+    resistors_lines = read_lines(resistors_path)
+    capacitors_lines = read_lines(capacitors_path)
+    assert [line.split(': ', 1)[1] for line in resistors_lines] == [f'resistors page {i}' for i in range(3)]
+    assert [line.split(': ', 1)[1] for line in capacitors_lines] == [f'capacitors page {i}' for i in range(3)]
+    assert all('[test_resistors] [INFO]' in line for line in resistors_lines)
+
+
+def test_set_up_again_closes_old_handlers():
+    log_dir = tempfile.mkdtemp()
+    first_path = os.path.join(log_dir, 'first.log')
+    second_path = os.path.join(log_dir, 'second.log')
+    logger = set_up_logger('test_resumed', first_path, console=False)
+    logger.info('first run')
+    old_handlers = list(_log_router.handlers['test_resumed'])
+
+    logger = set_up_logger('test_resumed', second_path, console=False)
+    logger.info('second run')
+    flush_logs()
+    # records queued before the new setup still go to the old file
+    assert [line.split(': ', 1)[1] for line in read_lines(first_path)] == ['first run']
+    assert [line.split(': ', 1)[1] for line in read_lines(second_path)] == ['second run']
+    assert all(handler.stream is None for handler in old_handlers)
+    assert len(logger.handlers) == 1
+
+    # appending keeps the records of the earlier run
+    logger = set_up_logger('test_resumed', second_path, append=True, console=False)
+    logger.info('resumed run')
+    flush_logs()
+    assert [line.split(': ', 1)[1] for line in read_lines(second_path)] == ['second run', 'resumed run']
+
+
+def test_flush_at_exit():
+    log_path = os.path.join(tempfile.mkdtemp(), 'exit.log')
+    logger = set_up_logger('test_exit', log_path, console=False)
+    for i in range(100):
+        logger.info(f'record {i}')
+    # registered with atexit, writes the queued records and closes every handler
+    stop_log_listener()
+    assert len(read_lines(log_path)) == 100
+    assert 'test_exit' not in _log_router.handlers
+
+    # a logger set up afterwards starts the listener again
+    logger = set_up_logger('test_exit', log_path, append=True, console=False)
+    logger.info('after restart')
+    flush_logs()
+    assert read_lines(log_path)[-1].endswith('after restart')
+
+
+def main():
+    test_route_records_by_logger_name()
+    test_set_up_again_closes_old_handlers()
+    test_flush_at_exit()
+
+
+if __name__ == '__main__':
+    main()
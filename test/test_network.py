@@ -0,0 +1,97 @@
+import asyncio
+from dkcrawlerv2.network import RequestBlocker, NetworkProfile, DEFAULT_PROFILE, NO_BLOCKING_PROFILE
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = f'abort:{error_code}'
+
+    async def continue_(self):
+        self.outcome = 'continue'
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def route(blocker, resource_type, url):
+    fake_route = FakeRoute(resource_type, url)
+    asyncio.run(blocker.handle_route(fake_route))
+    return fake_route.outcome
+
+
+def test_default_profile():
+    blocker = RequestBlocker(DEFAULT_PROFILE)
+    listing_url = 'https://www.digikey.com/en/products/filter/resistors/52'
+    assert route(blocker, 'document', listing_url) == 'continue'
+    assert route(blocker, 'xhr', 'https://www.digikey.com/api/v1/products') == 'continue'
+    assert route(blocker, 'fetch', 'https://www.digikey.com/api/v1/download') == 'continue'
+    assert route(blocker, 'script', 'https://www.digikey.com/static/app.js') == 'continue'
+    assert route(blocker, 'stylesheet', 'https://www.digikey.com/static/app.css') == 'continue'
+    assert route(blocker, 'image', 'https://mm.digikey.com/part.jpg') == 'abort:blockedbyclient'
+    assert route(blocker, 'font', 'https://www.digikey.com/static/font.woff2') == 'abort:blockedbyclient'
+    assert route(blocker, 'script', 'https://www.googletagmanager.com/gtm.js') == 'abort:blockedbyclient'
+    # subdomains of a tracker domain are blocked too
+    assert route(blocker, 'xhr', 'https://dpm.demdex.net/id') == 'abort:blockedbyclient'
+
+    stats = blocker.stats()
+    assert stats['blocked_requests'] == 4
+    assert stats['allowed_requests'] == 5
+    assert stats['blocked_by_type'] == {'image': 1, 'font': 1, 'script': 1, 'xhr': 1}
+    assert stats['blocked_top_domains']['www.googletagmanager.com'] == 1
+
+
+def test_consent_scripts_are_kept():
+    # the cookie banner answered by dismiss_popups may come from these scripts
+    blocker = RequestBlocker(DEFAULT_PROFILE)
+    assert route(blocker, 'script', 'https://cdn.cookielaw.org/scripttemplates/otSDKStub.js') == 'continue'
+    assert route(blocker, 'xhr', 'https://geolocation.onetrust.com/cookieconsentpub/v1/geo/location') == 'continue'
+
+
+def test_allow_rules_win():
+    profile = NetworkProfile(
+        blocked_resource_types=['image'], blocked_domains=['example.com'],
+        allowed_resource_types=['document'], allowed_domains=['img.example.com'],
+    )
+    blocker = RequestBlocker(profile)
+    assert route(blocker, 'document', 'https://example.com/') == 'continue'
+    assert route(blocker, 'image', 'https://img.example.com/logo.png') == 'continue'
+    assert route(blocker, 'script', 'https://example.com/app.js') == 'abort:blockedbyclient'
+    # a domain only matches itself and its subdomains
+    assert route(blocker, 'script', 'https://notexample.com/app.js') == 'continue'
+
+
+def test_no_blocking_profile():
+    blocker = RequestBlocker(NO_BLOCKING_PROFILE)
+    assert route(blocker, 'image', 'https://www.google-analytics.com/collect') == 'continue'
+
+
+def test_count_response_bytes():
+    blocker = RequestBlocker()
+    blocker.handle_response(FakeResponse({'content-length': '1024'}))
+    blocker.handle_response(FakeResponse({}))
+    blocker.handle_response(FakeResponse({'content-length': 'unknown'}))
+    assert blocker.stats()['allowed_bytes'] == 1024
+
+
+def main():
+    test_default_profile()
+    test_consent_scripts_are_kept()
+    test_allow_rules_win()
+    test_no_blocking_profile()
+    test_count_response_bytes()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from dkcrawlerv2.pacing import AdaptiveController
+from dkcrawlerv2.crawlers.vendor_subcat_crawler import VendorSubCategoryCrawler
+
+logger = logging.getLogger('test_pacing')
+
+
+def make_controller(**kwargs):
+    options = dict(min_concurrency=1, max_concurrency=6, initial_concurrency=3, min_delay=0.2, max_delay=10.0,
+                   initial_delay=1.0, target_latency=5.0, window=4, logger=logger)
+    options.update(kwargs)
+    return AdaptiveController(**options)
+
+
+def record_many(controller, latency, count, ok=True):
+    for _ in range(count):
+        controller.record(latency, ok)
+
+
+def test_additive_increase():
+    controller = make_controller()
+    record_many(controller, 1.0, 2)
+    assert controller.concurrency == 4
+    assert controller.delay == 0.75
+    record_many(controller, 1.0, 20)
+    assert controller.concurrency == 6
+    assert controller.delay == 0.2
+
+
+def test_multiplicative_decrease_on_latency():
+    controller = make_controller(initial_concurrency=6)
+    record_many(controller, 11.0, 2)
+    assert controller.concurrency == 3
+    assert controller.delay == 2.0
+    record_many(controller, 11.0, 20)
+    assert controller.concurrency == 1
+    assert controller.delay == 10.0
+
+
+def test_multiplicative_decrease_on_errors():
+    controller = make_controller(initial_concurrency=4)
+    record_many(controller, 1.0, 1)
+    record_many(controller, 1.0, 1, ok=False)
+    assert controller.concurrency == 2
+    assert controller.delay == 2.0
+
+
+def test_hold_between_target_and_twice_target():
+    controller = make_controller()
+    record_many(controller, 7.0, 10)
+    assert controller.concurrency == 3
+    assert controller.delay == 1.0
+
+
+def test_recover_after_slow_spell():
+    # latencies of single requests don't include the delay, so backing off can't slow the samples down
+    controller = make_controller()
+    record_many(controller, 12.0, 20)
+    assert (controller.concurrency, controller.delay) == (1, 10.0)
+    record_many(controller, 1.0, 20)
+    assert controller.concurrency == 6
+    assert controller.delay < 1.0
+
+
+def test_slot_limits_concurrency():
+    controller = make_controller(initial_concurrency=2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with controller.slot():
+            peak = max(peak, controller.active)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[job() for _ in range(6)])
+
+    asyncio.run(run())
+    assert peak == 2
+    assert controller.active == 0
+
+
+def test_raised_concurrency_wakes_waiters():
+    controller = make_controller(initial_concurrency=1)
+    entered_after = {}
+
+    async def job(i, start_time, hold):
+        async with controller.slot():
+            entered_after[i] = asyncio.get_running_loop().time() - start_time
+            await asyncio.sleep(hold)
+
+    async def run():
+        start_time = asyncio.get_running_loop().time()
+        slow_job = asyncio.ensure_future(job(0, start_time, 1.0))
+        waiting_job = asyncio.ensure_future(job(1, start_time, 0.0))
+        await asyncio.sleep(0.05)
+        assert list(entered_after) == [0]
+        record_many(controller, 1.0, 2)
+        assert controller.concurrency == 2
+        await waiting_job
+        slow_job.cancel()
+
+    asyncio.run(run())
+    # the raise is used right away, not once the slow job releases its slot
+    assert entered_after[1] < 0.5
+
+
+class FakePage:
+    async def goto(self, url):
+        await asyncio.sleep(0.01)
+
+
+def test_discovery_paces_on_navigation_only():
+    # the pacer's own delay must not count as site latency, otherwise backing off feeds on itself
+    controller = make_controller(initial_delay=10.0)
+    crawler = VendorSubCategoryCrawler('https://www.digikey.com/en/supplier-centers/acme', pacer=controller)
+    asyncio.run(crawler.paced_goto(FakePage(), 'https://www.digikey.com/en/products/category/resistors/2'))
+    assert len(controller.samples) == 1
+    latency, ok = controller.samples[0]
+    assert ok and latency < 1.0
+
+
+def main():
+    test_additive_increase()
+    test_multiplicative_decrease_on_latency()
+    test_multiplicative_decrease_on_errors()
+    test_hold_between_target_and_twice_target()
+    test_recover_after_slow_spell()
+    test_slot_limits_concurrency()
+    test_raised_concurrency_wakes_waiters()
+    test_discovery_paces_on_navigation_only()
+
+
+if __name__ == '__main__':
+    main()
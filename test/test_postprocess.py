@@ -0,0 +1,114 @@
+import os
+import tempfile
+import pandas as pd
+from dkcrawlerv2.postprocess import combine_pages, diff_parts
+from dkcrawlerv2.utils import read_data
+
+PAGES = [
+    pd.DataFrame({
+        'DK Part #': ['A-1', 'A-2', 'A-3'],
+        'Manufacturer': ['Acme', 'Acme', 'Bolt'],
+        'Stock': ['1,000', '20', '-'],
+        'Price': ['$0.10', '$1.50', 'Call'],
+    }),
+    # A-2 is downloaded again, with a new stock
+    pd.DataFrame({
+        'DK Part #': ['A-2', 'A-4', 'A-5'],
+        'Manufacturer': ['Acme', 'Bolt', 'Bolt'],
+        'Stock': ['25', '3', '0'],
+        'Price': ['$1.50', '$2.00', '$0.05'],
+    }),
+    # a later version of the download adds a column
+    pd.DataFrame({
+        'DK Part #': ['A-6', 'A-7'],
+        'Manufacturer': ['Acme', 'Cord'],
+        'Stock': ['7', '8'],
+        'Price': ['$3.00', '$4.00'],
+        'Series': ['RC', 'RT'],
+    }),
+]
+
+
+def write_pages(download_dir):
+    os.makedirs(download_dir)
+    for page_num, df in enumerate(PAGES, start=1):
+        file_path = os.path.join(download_dir, f'resistors_{page_num}.csv')
+        df.to_csv(file_path, index=False)
+        # pages are combined in download order
+        os.utime(file_path, (page_num, page_num))
+
+
+def combine(dedupe, chunk_size):
+    download_dir = os.path.join(tempfile.mkdtemp(), 'resistors_52')
+    write_pages(download_dir)
+    report = combine_pages(download_dir, 'resistors', ('xlsx', 'parquet'), dedupe, chunk_size)
+    return report, read_data(report['out_paths']['xlsx'])
+
+
+def sorted_rows(df):
+    df = df[sorted(df.columns)].sort_values('DK Part #', ignore_index=True)
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def test_chunked_combine_matches_in_memory():
+    for dedupe in (None, 'first', 'latest'):
+        report, df = combine(dedupe, chunk_size=None)
+        # chunks of two rows split every page, duplicates are found across chunks
+        chunked_report, chunked_df = combine(dedupe, chunk_size=2)
+        assert chunked_report['row_count'] == report['row_count'] == len(df)
+        assert chunked_report['duplicate_count'] == report['duplicate_count']
+        assert sorted(chunked_df.columns) == sorted(df.columns)
+        assert sorted_rows(chunked_df) == sorted_rows(df)
+
+
+def test_chunked_combine_rows():
+    report, df = combine('latest', chunk_size=2)
+    assert report['duplicate_count'] == 1
+    assert sorted(df['DK Part #']) == ['A-1', 'A-2', 'A-3', 'A-4', 'A-5', 'A-6', 'A-7']
+    assert df.loc[df['DK Part #'] == 'A-2', 'Stock'].tolist() == [25]
+    # columns of all pages and the constant subcategory column
+    assert set(df.columns) == {'DK Part #', 'Manufacturer', 'Stock', 'Price', 'Series', 'Subcategory'}
+    assert (df['Subcategory'] == 'resistors').all()
+    assert df.loc[df['DK Part #'] == 'A-1', 'Series'].isna().all()
+
+    parquet_df = read_data(report['out_paths']['parquet'])
+    assert isinstance(parquet_df['Manufacturer'].dtype, pd.CategoricalDtype)
+    assert isinstance(parquet_df['Subcategory'].dtype, pd.CategoricalDtype)
+    # with dedupe='latest' the pages are streamed newest first
+    assert parquet_df['DK Part #'].tolist() == ['A-6', 'A-7', 'A-2', 'A-4', 'A-5', 'A-1', 'A-3']
+    assert parquet_df['Stock'].tolist()[:-1] == [7, 8, 25, 3, 0, 1000]
+    assert parquet_df['Price'].tolist()[:-1] == [3.0, 4.0, 1.5, 2.0, 0.05, 0.1]
+    assert parquet_df.iloc[-1][['Stock', 'Price']].isna().all()
+
+
+def test_diff_parts():
+    work_dir = tempfile.mkdtemp()
+    new_path = os.path.join(work_dir, 'resistors_all.parquet')
+    old_path = os.path.join(work_dir, 'resistors_all_previous.parquet')
+    out_path = os.path.join(work_dir, 'resistors_diff.xlsx')
+    pd.DataFrame({'DK Part #': ['A-1', 'A-2', 'A-4'], 'Stock': [10, 20, None]}).to_parquet(new_path)
+    # an older version of the download named the stock column differently
+    pd.DataFrame({'DK Part #': ['A-1', 'A-2', 'A-3'], 'Quantity Available': [10, 25, 5]}).to_parquet(old_path)
+
+    report = diff_parts(new_path, old_path, out_path)
+    assert report['added'] == 1
+    assert report['removed'] == 1
+    assert report['stock_changed'] == 1
+
+    sheets = pd.read_excel(out_path, sheet_name=None)
+    assert list(sheets) == ['Added', 'Removed', 'Stock Changed']
+    assert sheets['Added']['DK Part #'].tolist() == ['A-4']
+    assert sheets['Added']['Stock'].isna().all()
+    assert sheets['Removed'].values.tolist() == [['A-3', 5]]
+    assert list(sheets['Stock Changed'].columns) == ['DK Part #', 'Stock', 'Stock Previous']
+    assert sheets['Stock Changed'].values.tolist() == [['A-2', 20, 25]]
+
+
+def main():
+    test_chunked_combine_matches_in_memory()
+    test_chunked_combine_rows()
+    test_diff_parts()
+
+
+if __name__ == '__main__':
+    main()
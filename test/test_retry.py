@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from playwright.async_api import Error as PlaywrightError
+from dkcrawlerv2.retry import RetryPolicy, RetryBudget, CircuitBreaker, retry_on_exception
+
+logger = logging.getLogger('test_retry')
+
+
+def test_classify_errors():
+    policy = RetryPolicy(breaker=CircuitBreaker(logger=logger))
+    assert policy.is_retryable(PlaywrightError('Timeout 30000ms exceeded.'))
+    assert policy.is_retryable(asyncio.TimeoutError())
+    assert policy.is_retryable(ValueError('invalid literal for int()'))
+    # the browser is gone, a retry can't help
+    assert not policy.is_retryable(PlaywrightError('Target page, context or browser has been closed'))
+    assert not policy.is_retryable(KeyError('Stock'))
+
+
+def test_should_retry_within_attempts():
+    policy = RetryPolicy(attempts=3, breaker=CircuitBreaker(logger=logger))
+    ex = PlaywrightError('Timeout 30000ms exceeded.')
+    assert policy.should_retry(ex, 0)
+    assert policy.should_retry(ex, 1)
+    assert not policy.should_retry(ex, 2)
+    assert not policy.should_retry(KeyError('Stock'), 0)
+    assert policy.budget.used == 2
+
+
+def test_budget_exhaustion():
+    budget = RetryBudget(max_retries=2)
+    policy = RetryPolicy(attempts=10, budget=budget, breaker=CircuitBreaker(logger=logger))
+    ex = PlaywrightError('Timeout 30000ms exceeded.')
+    assert policy.should_retry(ex, 0)
+    assert policy.should_retry(ex, 0)
+    assert not policy.should_retry(ex, 0)
+    assert budget.remaining == 0
+    assert policy.stats() == {'retries_used': 2, 'retries_remaining': 0, 'circuit_opened': 0}
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(base_delay=2.0, max_delay=5.0, breaker=CircuitBreaker(logger=logger))
+    assert all(0 <= policy.backoff(0) <= 2.0 for _ in range(50))
+    assert all(0 <= policy.backoff(10) <= 5.0 for _ in range(50))
+
+
+def test_breaker_opens_and_closes():
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, window=4, min_calls=4, cooldown=0.0, logger=logger)
+    for ok in (True, False, True):
+        breaker.record(ok)
+    # too few calls to judge
+    assert not breaker.is_open
+    breaker.record(False)
+    # a failure rate of exactly the threshold keeps it closed
+    assert not breaker.is_open
+    breaker.record(False)
+    assert breaker.is_open
+    assert breaker.open_count == 1
+
+    asyncio.run(breaker.wait_until_closed())
+    assert not breaker.is_open
+    # the window starts over after the cooldown
+    assert len(breaker.results) == 0
+
+
+class FakePage:
+    url = 'https://www.digikey.com/en/products/filter/resistors/52'
+
+    def __init__(self):
+        self.reloads = 0
+
+    async def goto(self, url, timeout=None):
+        self.reloads += 1
+
+
+class FlakyCrawler:
+    def __init__(self, failures, retry_policy=None):
+        self.failures = failures
+        self.calls = 0
+        self.logger = logger
+        self.retry_policy = retry_policy
+
+    @retry_on_exception(attempts=3, delay=0.0)
+    async def step(self, page):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise PlaywrightError('Timeout 30000ms exceeded.')
+        return self.calls
+
+
+def test_decorator_retries_and_reloads():
+    crawler = FlakyCrawler(failures=2)
+    page = FakePage()
+    assert asyncio.run(crawler.step(page=page)) == 3
+    assert page.reloads == 2
+
+
+def test_decorator_caps_session_policy_attempts():
+    # the session policy allows more attempts than the decorated method
+    policy = RetryPolicy(attempts=10, base_delay=0.0, breaker=CircuitBreaker(logger=logger))
+    crawler = FlakyCrawler(failures=5, retry_policy=policy)
+    try:
+        asyncio.run(crawler.step(page=FakePage()))
+    except PlaywrightError:
+        pass
+    else:
+        raise AssertionError('expected the last failure to be raised')
+    assert crawler.calls == 3
+    assert policy.budget.used == 2
+
+
+def main():
+    test_classify_errors()
+    test_should_retry_within_attempts()
+    test_budget_exhaustion()
+    test_backoff_is_capped()
+    test_breaker_opens_and_closes()
+    test_decorator_retries_and_reloads()
+    test_decorator_caps_session_policy_attempts()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from dkcrawlerv2.scheduler import WorkQueue
+
+logger = logging.getLogger('test_scheduler')
+
+
+def test_sliding_window():
+    running = 0
+    peak = 0
+    started = []
+    finished = []
+
+    async def handler(item):
+        nonlocal running, peak
+        started.append(item)
+        running += 1
+        peak = max(peak, running)
+        # short items finish first and free their worker for the next item, without waiting for the batch
+        await asyncio.sleep(0.2 if item == 0 else 0.01)
+        running -= 1
+        finished.append(item)
+
+    work_queue = WorkQueue(handler, max_concurrency=2, logger=logger)
+    asyncio.run(work_queue.run(range(5)))
+    assert peak == 2
+    assert sorted(started) == list(range(5))
+    # the other worker went through all remaining items while the slow one ran
+    assert finished == [1, 2, 3, 4, 0]
+    assert work_queue.finished_count == 5
+    assert work_queue.failed_count == 0
+
+
+def test_count_failed_items():
+    async def handler(item):
+        if item % 2:
+            raise ValueError(f'item {item} failed')
+
+    work_queue = WorkQueue(handler, max_concurrency=2, logger=logger)
+    asyncio.run(work_queue.run(range(5)))
+    assert work_queue.finished_count == 3
+    assert work_queue.failed_count == 2
+
+
+def test_put_from_handler():
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+        # a handler may queue follow-up items, and put an item back, before the queue drains
+        if item < 3:
+            work_queue.put(item + 1)
+
+    work_queue = WorkQueue(handler, max_concurrency=3, logger=logger)
+    asyncio.run(work_queue.run([0]))
+    assert handled == [0, 1, 2, 3]
+    assert work_queue.finished_count == 4
+
+
+def test_put_later():
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+        if item == 'poll':
+            work_queue.put_later('polled again', 0.05)
+
+    work_queue = WorkQueue(handler, max_concurrency=1, logger=logger)
+    asyncio.run(work_queue.run(['poll', 'job']))
+    # the delayed item doesn't hold the only worker, and the queue waits for it
+    assert handled == ['poll', 'job', 'polled again']
+    assert len(work_queue.delayed_puts) == 0
+
+
+def main():
+    test_sliding_window()
+    test_count_failed_items()
+    test_put_from_handler()
+    test_put_later()
+
+
+if __name__ == '__main__':
+    main()
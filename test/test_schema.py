@@ -0,0 +1,112 @@
+import pandas as pd
+from dkcrawlerv2.schema import normalize_numeric
+
+COLUMNS = ['DK Part #', 'Description', 'Stock', 'Price', '@ qty', 'Min Qty', 'Series']
+
+
+def make_page(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def test_parse_numbers():
+    df, report = normalize_numeric(make_page([
+        ['A-1', 'Resistor', '1,234 - Immediate', '$1,000.50', '1', '10', 'RC'],
+    ]))
+    assert report == {'realigned_rows': 0, 'misaligned_rows': 0}
+    assert df.loc[0, 'Stock'] == 1234
+    assert df.loc[0, 'Price'] == 1000.5
+    assert df.loc[0, '@ qty'] == 1
+    assert df.loc[0, 'Min Qty'] == 10
+
+
+def test_dtypes():
+    df, _ = normalize_numeric(make_page([
+        ['A-1', 'Resistor', '1,234', '$0.50', '1', '1', 'RC'],
+        ['A-2', 'Resistor', '-', 'Call', '-', '-', 'RC'],
+    ]))
+    assert str(df['Stock'].dtype) == 'Int64'
+    assert str(df['@ qty'].dtype) == 'Int64'
+    assert str(df['Min Qty'].dtype) == 'Int64'
+    assert str(df['Price'].dtype) == 'float64'
+
+
+def test_placeholders_are_empty_not_misaligned():
+    df, report = normalize_numeric(make_page([
+        ['A-1', 'Resistor', '-', 'Call', '--', 'N/A', 'RC'],
+        ['A-2', 'Resistor', '', 'See Page', '-', '-', 'RC'],
+    ]))
+    assert report == {'realigned_rows': 0, 'misaligned_rows': 0}
+    assert df[['Stock', 'Price', '@ qty', 'Min Qty']].isna().all().all()
+    assert list(df['Series']) == ['RC', 'RC']
+
+
+def test_site_text_is_empty_not_misaligned():
+    df, report = normalize_numeric(make_page([
+        ['A-1', 'Resistor', '0', 'Obsolete', '1', 'Non-Stock', 'RC'],
+        ['A-2', 'Resistor', '0', '$0.50', '1', 'Non-Stock', 'RC'],
+        # unknown text without a number next to it
+        ['A-3', 'Resistor', 'Ask us', '$0.50', '1', '1', 'RC'],
+    ]))
+    assert report == {'realigned_rows': 0, 'misaligned_rows': 0}
+    assert df.loc[[0, 1], 'Min Qty'].isna().all()
+    assert pd.isna(df.loc[0, 'Price'])
+    assert pd.isna(df.loc[2, 'Stock'])
+    assert df.loc[2, 'Price'] == 0.5
+
+
+def test_realign_extra_cell():
+    # an unquoted comma in the description pushed every later cell one column to the right
+    df, report = normalize_numeric(make_page([
+        ['A-1', 'Resistor, 1%', ' 5%', '2,000', '$0.10', '10', '5'],
+    ]))
+    assert report == {'realigned_rows': 1, 'misaligned_rows': 0}
+    assert df.loc[0, 'Stock'] == 2000
+    assert df.loc[0, 'Price'] == 0.1
+    assert df.loc[0, '@ qty'] == 10
+    assert df.loc[0, 'Min Qty'] == 5
+
+
+def test_realign_lost_cell():
+    # a lost description cell pulled the stock into the description column
+    df, report = normalize_numeric(make_page([
+        ['A-1', '5,000', '$1.25', '1', '1', 'RC', None],
+    ]))
+    assert report == {'realigned_rows': 1, 'misaligned_rows': 0}
+    assert df.loc[0, 'Stock'] == 5000
+    assert df.loc[0, 'Price'] == 1.25
+    assert df.loc[0, 'Series'] == 'RC'
+
+
+def test_keep_rows_that_cant_be_realigned():
+    df, report = normalize_numeric(make_page([
+        ['A-1', 'Resistor', '1,234', '$0.50', '1', '1', 'RC'],
+        # shifted left by one the stock fits, but the quantity then doesn't
+        ['A-2', 'Resistor', 'many', '2', '0.5', '?', 'RC'],
+    ]))
+    assert report == {'realigned_rows': 0, 'misaligned_rows': 1}
+    assert len(df) == 2
+    assert df.loc[0, 'Stock'] == 1234
+    assert df.loc[1, ['Stock', '@ qty', 'Min Qty']].isna().all()
+    assert df.loc[1, 'Description'] == 'Resistor'
+
+
+def test_without_numeric_columns():
+    df = pd.DataFrame({'DK Part #': ['A-1'], 'Description': ['Resistor']})
+    normalized_df, report = normalize_numeric(df)
+    assert report == {'realigned_rows': 0, 'misaligned_rows': 0}
+    assert normalized_df.equals(df)
+
+
+def main():
+    test_parse_numbers()
+    test_dtypes()
+    test_placeholders_are_empty_not_misaligned()
+    test_site_text_is_empty_not_misaligned()
+    test_realign_extra_cell()
+    test_realign_lost_cell()
+    test_keep_rows_that_cant_be_realigned()
+    test_without_numeric_columns()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+import warnings
+
+# seconds to import the package and the command line in a fresh interpreter, about 0.05 on a laptop,
+# only reported when exceeded since slow and Windows machines take longer
+STARTUP_BUDGET_SECONDS = 0.25
+HEAVY_MODULES = ['pandas', 'playwright', 'openpyxl', 'pyarrow']
+
+MEASURE_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import dkcrawlerv2
+import dkcrawlerv2.cli
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'modules': [m for m in %r if m in sys.modules]}))
+'''
+
+
+def measure_startup():
+    output = subprocess.check_output([sys.executable, '-c', MEASURE_SCRIPT % HEAVY_MODULES])
+    return json.loads(output)
+
+
+def test_no_heavy_imports():
+    startup = measure_startup()
+    assert startup['modules'] == [], f'Heavy modules imported at startup: {startup["modules"]}'
+    if startup['elapsed'] > STARTUP_BUDGET_SECONDS:
+        warnings.warn(
+            f'Imported dkcrawlerv2 and its command line in {startup["elapsed"]:.3f} s, '
+            f'more than {STARTUP_BUDGET_SECONDS} s'
+        )
+
+
+def test_cli_help():
+    subprocess.check_call([sys.executable, '-m', 'dkcrawlerv2.cli', '--help'], stdout=subprocess.DEVNULL)
+
+
+def main():
+    test_no_heavy_imports()
+    test_cli_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from dkcrawlerv2.storage import PartStore
+
+
+def write_page(download_dir, name, stock, price='$0.50'):
+    file_path = os.path.join(download_dir, name)
+    with open(file_path, 'w') as f:
+        f.write(f'DK Part #,Mfr Part #,Manufacturer,Stock,Price\nA-1,M-1,Acme,"{stock:,}","{price}"\n')
+    return file_path
+
+
+def stored_stock(part_store):
+    download_dir = tempfile.mkdtemp()
+    part_store.add_page('resistors', 1, write_page(download_dir, 'resistors_1.csv', 1000)).result()
+    part_store.add_page('resistors', 2, write_page(download_dir, 'resistors_2.csv', 2000)).result()
+    first_stock = part_store.find_dk_part('A-1')['Stock'].iloc[0]
+    # the same page downloaded again
+    part_store.add_page('resistors', 1, write_page(download_dir, 'resistors_1.csv', 3000)).result()
+    refetched_stock = part_store.find_dk_part('A-1')['Stock'].iloc[0]
+    return first_stock, refetched_stock
+
+
+def test_keep_first():
+    part_store = PartStore(os.path.join(tempfile.mkdtemp(), 'parts.sqlite'), keep='first')
+    assert stored_stock(part_store) == (1000, 3000)
+    part_store.close()
+
+
+def test_keep_latest():
+    part_store = PartStore(os.path.join(tempfile.mkdtemp(), 'parts.sqlite'), keep='latest')
+    assert stored_stock(part_store) == (2000, 3000)
+    assert part_store.count() == 1
+    part_store.close()
+
+
+def test_store_parsed_numbers():
+    download_dir = tempfile.mkdtemp()
+    part_store = PartStore(os.path.join(download_dir, 'parts.sqlite'))
+    part_store.add_page('resistors', 1, write_page(download_dir, 'resistors_1.csv', 1234, price='$1,000.50')).result()
+    part = part_store.find_dk_part('A-1').iloc[0]
+    assert part['Stock'] == 1234
+    assert part['Price'] == 1000.5
+    assert part_store.conn.execute('SELECT stock FROM parts').fetchone()[0] == 1234
+    part_store.close()
+
+
+def main():
+    test_keep_first()
+    test_keep_latest()
+    test_store_parsed_numbers()
+
+
+if __name__ == '__main__':
+    main()
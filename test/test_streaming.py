@@ -0,0 +1,89 @@
+import os
+import tempfile
+import pandas as pd
+from openpyxl import load_workbook
+from dkcrawlerv2.streaming import XlsxStreamWriter, iter_chunks, iter_file_chunks, read_header
+from dkcrawlerv2.utils import read_excel
+
+COLUMNS = ['DK Part #', 'Stock', 'Price']
+
+
+def make_chunk(start, row_count):
+    return pd.DataFrame({
+        'DK Part #': [f'A-{i}' for i in range(start, start + row_count)],
+        'Stock': pd.array([i if i % 3 else None for i in range(start, start + row_count)], dtype='Int64'),
+        'Price': [i / 10 for i in range(start, start + row_count)],
+    })
+
+
+def test_split_sheets():
+    out_path = os.path.join(tempfile.mkdtemp(), 'parts_all.xlsx')
+    # a header and three rows per sheet
+    writer = XlsxStreamWriter(out_path, COLUMNS, max_rows=4)
+    writer.write(make_chunk(0, 5))
+    writer.write(make_chunk(5, 2))
+    writer.close()
+    assert writer.row_count == 7
+
+    workbook = load_workbook(out_path, read_only=True)
+    sheets = [list(sheet.values) for sheet in workbook.worksheets]
+    workbook.close()
+    assert [len(rows) for rows in sheets] == [4, 4, 2]
+    assert all(rows[0] == tuple(COLUMNS) for rows in sheets)
+
+    df = read_excel(out_path)
+    assert list(df['DK Part #']) == [f'A-{i}' for i in range(7)]
+    assert df['Stock'].isna().tolist() == [i % 3 == 0 for i in range(7)]
+
+
+def test_index_column():
+    out_path = os.path.join(tempfile.mkdtemp(), 'parts_all.xlsx')
+    writer = XlsxStreamWriter(out_path, COLUMNS, index=True, max_rows=3)
+    writer.write(make_chunk(0, 3))
+    writer.close()
+    workbook = load_workbook(out_path, read_only=True)
+    sheets = [list(sheet.values) for sheet in workbook.worksheets]
+    workbook.close()
+    # the index keeps counting across sheets
+    assert [row[0] for rows in sheets for row in rows[1:]] == [0, 1, 2]
+    assert sheets[0][0] == (None, *COLUMNS)
+
+
+def test_iter_chunks():
+    download_dir = tempfile.mkdtemp()
+    in_files = []
+    for page_num in range(3):
+        file_path = os.path.join(download_dir, f'parts_{page_num}.csv')
+        make_chunk(page_num * 4, 4).to_csv(file_path, index=False)
+        in_files.append(file_path)
+    chunks = list(iter_chunks(in_files, chunk_size=5))
+    assert [len(chunk) for chunk in chunks] == [8, 4]
+    assert sum(len(chunk) for chunk in chunks) == 12
+
+
+def test_iter_xlsx_chunks():
+    out_path = os.path.join(tempfile.mkdtemp(), 'parts_all.xlsx')
+    writer = XlsxStreamWriter(out_path, COLUMNS, max_rows=5)
+    writer.write(make_chunk(0, 10))
+    writer.close()
+    assert read_header(out_path) == COLUMNS
+
+    # rows are read in batches of chunk_size within each of the three sheets
+    chunks = list(iter_file_chunks(out_path, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1, 3, 1, 2]
+    df = pd.concat(chunks, ignore_index=True)
+    assert list(df.columns) == COLUMNS
+    assert list(df['DK Part #']) == [f'A-{i}' for i in range(10)]
+    assert df['Stock'].isna().tolist() == [i % 3 == 0 for i in range(10)]
+    assert df['Price'].tolist() == read_excel(out_path)['Price'].tolist()
+
+
+def main():
+    test_split_sheets()
+    test_index_column()
+    test_iter_chunks()
+    test_iter_xlsx_chunks()
+
+
+if __name__ == '__main__':
+    main()
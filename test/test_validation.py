@@ -0,0 +1,108 @@
+import asyncio
+import tempfile
+import pandas as pd
+from dkcrawlerv2.validation import PageValidator
+from dkcrawlerv2.crawlers.data_crawler import AsyncDataCrawler
+
+URL = 'https://www.digikey.com/en/products/filter/resistors/52'
+
+
+def make_page(row_count, start=0, stock_column='Stock'):
+    return pd.DataFrame({
+        'DK Part #': [f'A-{i}' for i in range(start, start + row_count)],
+        stock_column: ['1,000'] * row_count,
+        'Price': ['$0.10'] * row_count,
+    })
+
+
+def test_valid_pages():
+    validator = PageValidator(250)
+    assert validator.validate(1, make_page(100)) == []
+    assert validator.validate(2, make_page(100, start=100)) == []
+    # the last page holds the remainder
+    assert validator.validate(3, make_page(50, start=200)) == []
+
+
+def test_row_count():
+    validator = PageValidator(250)
+    assert validator.validate(2, make_page(99)) == ['99 rows instead of 100']
+    assert validator.validate(3, make_page(100)) == ['100 rows instead of 50']
+
+
+def test_header_differs_from_page_1():
+    validator = PageValidator(200)
+    validator.validate(1, make_page(100))
+    page = make_page(100).rename(columns={'Price': 'Unit Price'})
+    assert validator.validate(2, page) == [
+        "header differs from page 1, missing ['Price'], extra ['Unit Price']"
+    ]
+
+
+def test_part_numbers_and_stock():
+    validator = PageValidator(3)
+    page = make_page(3)
+    page.loc[1, 'DK Part #'] = None
+    assert validator.validate(1, page) == ['empty "DK Part #"']
+    assert PageValidator(3).validate(1, page.drop(columns=['DK Part #'])) == ['no DigiKey part number column']
+    # other versions of the download name the stock column differently
+    assert PageValidator(3).validate(1, make_page(3, stock_column='Quantity Available')) == []
+    assert PageValidator(3).validate(1, make_page(3).drop(columns=['Stock'])) == [
+        "none of the stock columns ['Stock', 'Quantity Available']"
+    ]
+
+
+def test_misaligned_rows():
+    page = make_page(2)
+    page.loc[1, ['Stock', 'Price']] = ['many', '2']
+    page['Series'] = ['RC', '?']
+    assert PageValidator(2).validate(1, page) == ['1 rows with misaligned numeric columns']
+
+
+class FakePage:
+    url = URL
+
+
+class RepairingCrawler(AsyncDataCrawler):
+    """
+    Downloads nothing, a jump to a page listed in fixable_pages repairs it.
+    """
+
+    def __init__(self, *args, fixable_pages=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fixable_pages = set(fixable_pages)
+        self.jumps = []
+
+    async def crawl_page_range(self, page, configured_url, page_nums):
+        for page_num in page_nums:
+            self.jumps.append(page_num)
+            if page_num in self.fixable_pages:
+                self.invalid_pages.pop(page_num, None)
+                self.duplicate_pages.discard(page_num)
+                self.downloaded_pages.add(page_num)
+
+
+def test_repair_pages():
+    crawler = RepairingCrawler(URL, tempfile.mkdtemp(), fixable_pages=[2], max_repairs=2, storage_state_path=None)
+    crawler.downloaded_pages = {1, 2, 3, 4}
+    crawler.invalid_pages = {2: ['99 rows instead of 100'], 3: ['99 rows instead of 100']}
+    crawler.duplicate_pages = {4}
+    asyncio.run(crawler.repair_pages(FakePage()))
+    # pages that stay bad are tried max_repairs times
+    assert crawler.jumps == [2, 3, 4, 3, 4]
+    assert crawler.repair_attempts == {2: 1, 3: 2, 4: 2}
+    assert crawler.invalid_pages == {3: ['99 rows instead of 100']}
+    assert crawler.duplicate_pages == {4}
+    assert crawler.downloaded_pages == {1, 2, 3, 4}
+
+
+def main():
+    test_valid_pages()
+    test_row_count()
+    test_header_differs_from_page_1()
+    test_part_numbers_and_stock()
+    test_misaligned_rows()
+    test_repair_pages()
+
+
+if __name__ == '__main__':
+    main()